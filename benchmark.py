@@ -0,0 +1,501 @@
+"""
+LangExtract MCP Server - Benchmark Harness
+Measure the server's own overhead with a deterministic local fake model
+
+Drives the MCP tools through the FastMCP in-process client at several
+document sizes and concurrency levels and reports latency percentiles,
+throughput and peak RSS as JSON. A run can be compared against a saved
+baseline; regressions make the script exit with status 1.
+
+Usage:
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.2
+    python benchmark.py --latency-ms 50 --jitter-ms 20 --sizes 2000,50000
+    python benchmark.py --latency-ms 50 --capacity 8 --throttle-rate 0.02
+    python benchmark.py --compare-passes 5 --recall 0.5 --sizes 20000,100000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+FAKE_MODEL_ID = "bench-fake"
+
+# Words the fake model extracts are copied from the chunk, so alignment,
+# CSV export and visualization see realistic char intervals
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+
+CATEGORIES = [
+    'DOMAIN_CONTEXT', 'CURRENT_APPROACHES', 'CONSTRAINTS', 'REQUIREMENTS',
+    'RESOURCES', 'TRADE_OFFS', 'PROBLEM_DEFINITION', 'CITATIONS_AND_REFERENCES'
+]
+
+SENTENCES = [
+    "Transformer models dominate sequence modelling across language and vision tasks.",
+    "Training compute grows quadratically with context length under dense attention.",
+    "Sparse attention variants trade exactness for memory efficiency on long inputs.",
+    "Benchmarks such as LongBench measure retrieval over extended documents.",
+    "Practitioners report that latency budgets constrain deployment on edge devices.",
+    "Smith et al. (2023) showed that retrieval augmentation reduces hallucination.",
+    "Data quality remains a bottleneck for specialised scientific domains.",
+    "The proposed method requires labelled examples from each target domain.",
+]
+
+BENCH_EXAMPLES = [{
+    "text": "Sparse attention reduces memory use on long documents.",
+    "extractions": [{
+        "extraction_class": "method",
+        "extraction_text": "Sparse attention",
+        "attributes": {"category": "CURRENT_APPROACHES"}
+    }]
+}]
+
+
+# ============================================================================
+# FAKE MODEL
+# ============================================================================
+
+FAKE_MODEL_SETTINGS = {
+    'latency_ms': 0.0, 'jitter_ms': 0.0, 'extractions_per_chunk': 5, 'seed': 0,
+    'capacity': 0, 'throttle_rate': 0.0, 'recall': 1.0
+}
+
+# How often each chunk prompt has been answered, so repeated passes over a
+# chunk can return different (partial-recall) extractions
+_PROMPT_CALLS: Dict[int, int] = {}
+_PROMPT_CALLS_LOCK = threading.Lock()
+
+
+class FakeRateLimitError(RuntimeError):
+    """What the fake model raises instead of answering when it throttles."""
+
+    status_code = 429
+
+
+class FakeRateLimiter:
+    """
+    Simulated provider quota.
+
+    Calls beyond `capacity` in flight (0 = unlimited) are rejected with a 429,
+    and any call is rejected with probability `throttle_rate`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rng = random.Random(0)
+        self.accepted = 0
+        self.throttled = 0
+        self.peak_in_flight = 0
+
+    def reset(self, seed: int):
+        with self._lock:
+            self._rng = random.Random(seed)
+            self.accepted = self.throttled = self.peak_in_flight = 0
+
+    @contextlib.contextmanager
+    def call(self):
+        with self._lock:
+            capacity = FAKE_MODEL_SETTINGS['capacity']
+            if (capacity and self._in_flight >= capacity) or \
+                    self._rng.random() < FAKE_MODEL_SETTINGS['throttle_rate']:
+                self.throttled += 1
+                raise FakeRateLimitError('429 Too Many Requests (fake model quota exceeded)')
+            self._in_flight += 1
+            self.accepted += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'accepted': self.accepted, 'throttled': self.throttled, 'peak_in_flight': self.peak_in_flight}
+
+
+FAKE_RATE_LIMITER = FakeRateLimiter()
+
+
+def register_fake_model():
+    """Register the fake provider with LangExtract's router."""
+    import langextract as lx
+    from langextract.core import base_model, types
+
+    @lx.providers.router.register(rf"^{FAKE_MODEL_ID}", priority=100)
+    class BenchFakeModel(base_model.BaseLanguageModel):
+        """Returns fenced JSON extractions built from the chunk's own words."""
+
+        def __init__(self, model_id: str = FAKE_MODEL_ID, **kwargs):
+            super().__init__()
+            self.model_id = model_id
+
+        def infer(self, batch_prompts, **kwargs):
+            for prompt in batch_prompts:
+                with FAKE_RATE_LIMITER.call():
+                    output = fake_output(prompt)
+                yield [types.ScoredOutput(score=1.0, output=output)]
+
+    return BenchFakeModel
+
+
+def fake_output(prompt: str) -> str:
+    """Deterministic output (and simulated latency) for one chunk prompt."""
+    question = prompt.rsplit("Q: ", 1)[-1]
+    # Seeded per prompt so runs are repeatable regardless of scheduling
+    rng = random.Random(zlib.crc32(question.encode('utf-8')) ^ FAKE_MODEL_SETTINGS['seed'])
+
+    delay = FAKE_MODEL_SETTINGS['latency_ms'] + rng.uniform(0, FAKE_MODEL_SETTINGS['jitter_ms'])
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+    words = WORD_PATTERN.findall(question)[:FAKE_MODEL_SETTINGS['extractions_per_chunk']]
+    if FAKE_MODEL_SETTINGS['recall'] < 1.0:
+        # Each answer finds every word with probability `recall`, so later
+        # passes over the same chunk keep finding some new ones
+        key = zlib.crc32(question.encode('utf-8'))
+        with _PROMPT_CALLS_LOCK:
+            occurrence = _PROMPT_CALLS.get(key, 0)
+            _PROMPT_CALLS[key] = occurrence + 1
+        pick = random.Random(key ^ FAKE_MODEL_SETTINGS['seed'] ^ (occurrence * 0x9E3779B1))
+        words = [word for word in words if pick.random() < FAKE_MODEL_SETTINGS['recall']]
+    extractions = [
+        {
+            "method": word,
+            "method_attributes": {
+                "category": rng.choice(CATEGORIES),
+                "element_name": word,
+                "source_context": question[:80],
+                "confidence": "medium"
+            }
+        }
+        for word in words
+    ]
+    return "```json\n" + json.dumps({"extractions": extractions}) + "\n```"
+
+
+def reset_fake_recall():
+    with _PROMPT_CALLS_LOCK:
+        _PROMPT_CALLS.clear()
+
+
+def make_document(size: int, salt: int) -> str:
+    """Deterministic research-like text of roughly `size` characters."""
+    rng = random.Random(size * 7919 + salt)
+    parts = []
+    total = 0
+    while total < size:
+        sentence = rng.choice(SENTENCES)
+        if rng.random() < 0.15:
+            sentence += "\n"
+        parts.append(sentence)
+        total += len(sentence) + 1
+    return " ".join(parts)[:size]
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    calls = len(latencies) + errors
+    return {
+        'calls': calls,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        'throughput_per_sec': round(calls / wall_seconds, 3) if wall_seconds else None
+    }
+
+
+async def timed_calls(client, tool: str, arguments: List[Dict[str, Any]], concurrency: int):
+    """Run one call per argument dict with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    responses = []
+
+    async def one(args):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await client.call_tool(tool, args, raise_on_error=False)
+            except Exception:
+                # e.g. a response the client cannot validate against the tool's schema
+                errors += 1
+                return
+            elapsed = time.perf_counter() - started
+        data = result.structured_content or {}
+        if result.is_error or data.get('success') is False:
+            errors += 1
+        else:
+            latencies.append(elapsed)
+        responses.append(data)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(args) for args in arguments))
+    return summarize(latencies, errors, time.perf_counter() - started), responses
+
+
+async def run_scenario(client, size: int, concurrency: int, iterations: int, salt: int) -> Dict[str, Any]:
+    """Benchmark every tool for one (document size, concurrency) pair."""
+    calls = max(iterations, concurrency)
+    docs = [make_document(size, salt + i) for i in range(calls)]
+    metrics = {}
+
+    metrics['extract_structured_data'], structured = await timed_calls(client, 'extract_structured_data', [
+        {
+            'text': doc,
+            'prompt_description': 'Extract methods and approaches',
+            'examples': BENCH_EXAMPLES,
+            'model_id': FAKE_MODEL_ID,
+            'use_cache': False
+        }
+        for doc in docs
+    ], concurrency)
+
+    metrics['extract_research_context'], research = await timed_calls(client, 'extract_research_context', [
+        {'text': doc, 'model_id': FAKE_MODEL_ID, 'extraction_passes': 1, 'use_cache': False}
+        for doc in docs
+    ], concurrency)
+
+    result_ids = [r['result_id'] for r in research + structured if r.get('result_id')][:calls]
+    if result_ids:
+        metrics['export_to_research_csv'], _ = await timed_calls(client, 'export_to_research_csv', [
+            {'result_id': rid, 'output_name': f'bench_{rid}.csv'} for rid in result_ids
+        ], concurrency)
+        metrics['get_extraction_details'], _ = await timed_calls(client, 'get_extraction_details', [
+            {'result_id': rid} for rid in result_ids
+        ], concurrency)
+        metrics['generate_visualization'], _ = await timed_calls(client, 'generate_visualization', [
+            {'result_id': rid, 'output_name': f'bench_{rid}.html'} for rid in result_ids
+        ], concurrency)
+    metrics['list_stored_results'], _ = await timed_calls(client, 'list_stored_results', [
+        {} for _ in range(calls)
+    ], concurrency)
+
+    return {'size': size, 'concurrency': concurrency, 'tools': metrics, 'peak_rss_mb': peak_rss_mb()}
+
+
+async def compare_passes(client, size: int, passes: int, min_pass_yield: int, salt: int) -> Dict[str, Any]:
+    """Model calls and extractions of fixed versus adaptive passes on one document."""
+    doc = make_document(size, salt)
+    modes = {}
+    for mode, adaptive in (('fixed', False), ('adaptive', True)):
+        reset_fake_recall()  # Both modes see the same sequence of answers
+        started = time.perf_counter()
+        result = await client.call_tool('extract_research_context', {
+            'text': doc,
+            'model_id': FAKE_MODEL_ID,
+            'extraction_passes': passes,
+            'use_cache': False,
+            'adaptive_passes': adaptive,
+            'min_pass_yield': min_pass_yield
+        }, raise_on_error=False)
+        data = result.structured_content or {}
+        metadata = data.get('metadata') or {}
+        modes[mode] = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'model_calls': (metadata.get('chunk_cache') or {}).get('model_calls'),
+            'total_extractions': data.get('total_extractions'),
+            'passes_run': (metadata.get('passes') or {}).get('passes_run'),
+            'error': data.get('error')
+        }
+    fixed_calls = modes['fixed']['model_calls'] or 0
+    fixed_found = modes['fixed']['total_extractions'] or 0
+    return {
+        'size': size,
+        'max_passes': passes,
+        'min_pass_yield': min_pass_yield,
+        **modes,
+        'model_calls_saved_ratio': round(1 - (modes['adaptive']['model_calls'] or 0) / fixed_calls, 4)
+        if fixed_calls else None,
+        'recall_vs_fixed': round((modes['adaptive']['total_extractions'] or 0) / fixed_found, 4)
+        if fixed_found else None
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    os.environ.setdefault('LANGEXTRACT_API_KEY', 'benchmark')
+    register_fake_model()
+    FAKE_RATE_LIMITER.reset(FAKE_MODEL_SETTINGS['seed'])
+
+    import server
+    from fastmcp import Client
+
+    scenarios = []
+    pass_comparisons = []
+    started = time.perf_counter()
+    async with Client(server.mcp) as client:
+        salt = 0
+        for size in args.sizes:
+            if args.compare_passes:
+                pass_comparisons.append(
+                    await compare_passes(client, size, args.compare_passes, args.min_pass_yield, salt)
+                )
+                salt += 1000
+                continue
+            for concurrency in args.concurrency:
+                scenarios.append(await run_scenario(client, size, concurrency, args.iterations, salt))
+                salt += 1000
+
+    return {
+        'benchmark': 'langextract-mcp-server',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'settings': {
+            'sizes': args.sizes,
+            'concurrency': args.concurrency,
+            'iterations': args.iterations,
+            **FAKE_MODEL_SETTINGS
+        },
+        'total_seconds': round(time.perf_counter() - started, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'fake_model_quota': FAKE_RATE_LIMITER.stats(),
+        'model_scheduler': server.MODEL_SCHEDULER.stats(),
+        'scenarios': scenarios,
+        **({'pass_comparisons': pass_comparisons} if args.compare_passes else {})
+    }
+
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Regressions of `report` against `baseline`.
+
+    A tool regresses when its p95 latency grows, or its throughput drops, by
+    more than `tolerance` (a fraction). New errors are always regressions.
+    """
+    previous = {
+        (s['size'], s['concurrency'], tool): m
+        for s in baseline.get('scenarios', [])
+        for tool, m in s['tools'].items()
+    }
+    regressions = []
+    for scenario in report['scenarios']:
+        for tool, metrics in scenario['tools'].items():
+            before = previous.get((scenario['size'], scenario['concurrency'], tool))
+            if before is None:
+                continue
+            checks = []
+            if before.get('p95_ms') and metrics.get('p95_ms') is not None:
+                checks.append(('p95_ms', metrics['p95_ms'] > before['p95_ms'] * (1 + tolerance)))
+            if before.get('throughput_per_sec') and metrics.get('throughput_per_sec') is not None:
+                checks.append((
+                    'throughput_per_sec',
+                    metrics['throughput_per_sec'] < before['throughput_per_sec'] * (1 - tolerance)
+                ))
+            checks.append(('errors', metrics['errors'] > before.get('errors', 0)))
+            for metric, regressed in checks:
+                if regressed:
+                    regressions.append({
+                        'tool': tool,
+                        'size': scenario['size'],
+                        'concurrency': scenario['concurrency'],
+                        'metric': metric,
+                        'baseline': before.get(metric),
+                        'current': metrics.get(metric)
+                    })
+    return regressions
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int_list, default=[2000, 20000, 100000],
+                        help='Document sizes in characters (comma separated)')
+    parser.add_argument('--concurrency', type=int_list, default=[1, 4, 16],
+                        help='Concurrent tool calls (comma separated)')
+    parser.add_argument('--iterations', type=int, default=8, help='Calls per tool per scenario')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fake model latency per chunk')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Extra uniform random latency per chunk')
+    parser.add_argument('--extractions-per-chunk', type=int, default=5, help='Fake model output size')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for jitter and attribute choices')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='Concurrent fake model calls allowed before it answers 429 (0 = unlimited)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Probability that any fake model call answers 429')
+    parser.add_argument('--recall', type=float, default=1.0,
+                        help='Probability the fake model finds each extraction on one pass')
+    parser.add_argument('--compare-passes', type=int, default=0, metavar='N',
+                        help='Instead of the tool scenarios, compare N fixed passes with adaptive passes')
+    parser.add_argument('--min-pass-yield', type=int, default=1,
+                        help='Adaptive threshold used by --compare-passes')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Compare against a saved report')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown before a metric counts as a regression')
+    args = parser.parse_args(argv)
+
+    FAKE_MODEL_SETTINGS.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        extractions_per_chunk=args.extractions_per_chunk,
+        seed=args.seed,
+        capacity=args.capacity,
+        throttle_rate=args.throttle_rate,
+        recall=args.recall
+    )
+
+    # Tools write exports under ./output; keep them out of the working tree
+    workdir = tempfile.mkdtemp(prefix='langextract-bench-')
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    output = Path(args.output).resolve() if args.output else None
+    os.chdir(workdir)
+
+    # LangExtract prints save/load progress; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run_benchmark(args))
+
+    status = 0
+    if baseline is not None:
+        report['regressions'] = compare(report, baseline, args.tolerance)
+        status = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,9 @@ Deploy: Push to GitHub and deploy on fastmcp.cloud
 """
 
 from fastmcp import FastMCP, Context
-from typing import List, Dict, Any, Optional
+from fastmcp.tools import ToolResult
+from mcp.types import TextContent
+from typing import Iterable, List, Dict, Any, Optional, Union
 from pydantic import BaseModel, Field
 import langextract as lx
 import os
@@ -14,14 +16,95 @@ import tempfile
 from pathlib import Path
 from datetime import datetime
 import hashlib
-import pandas as pd
+import html.parser
+import importlib.metadata
+import httpx
+import itertools
 import json
+import random
+import re
+import sqlite3
+import sys
+import zlib
+import abc
+import asyncio
+import atexit
+import bisect
+import codecs
+import contextlib
+import contextvars
+import csv
+import functools
+import gzip
+import heapq
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from collections.abc import MutableMapping
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 # Initialize FastMCP server
 mcp = FastMCP("LangExtract-ResearchContext")
 
-# Result storage
-RESULTS_STORE: Dict[str, lx.data.AnnotatedDocument] = {}
+# ============================================================================
+# LANGEXTRACT COMPATIBILITY
+# ============================================================================
+
+# ExtractionPipeline composes langextract's provider factory, format handler,
+# resolver and annotator itself (as lx.extract does), replaces the
+# annotator's private prompt generator with a prefix-cached one and (opt-in) cuts
+# documents into content-defined segments before lx chunking. That ties it
+# to the internals of the release it was tested with, pinned in
+# requirements.txt and pyproject.toml; they are checked at import so another
+# release fails on startup rather than mid-extraction.
+LANGEXTRACT_TESTED_VERSION = '1.7.1'
+
+_LANGEXTRACT_INTERNALS = (
+    'annotation.Annotator', 'chunking.ChunkIterator', 'core.base_model.BaseLanguageModel',
+    'core.format_handler.FormatHandler', 'core.types.ScoredOutput', 'data_lib.dict_to_annotated_document',
+    'factory.ModelConfig', 'factory.create_model', 'prompting.PromptTemplateStructured',
+    'prompting.QAPromptGenerator', 'resolver.Resolver', 'resolver.WordAligner', 'tokenizer.RegexTokenizer'
+)
+
+
+def check_langextract_compatibility():
+    """Raise ImportError if langextract lacks an internal the extraction pipeline relies on."""
+    try:
+        version = importlib.metadata.version('langextract')
+    except importlib.metadata.PackageNotFoundError:
+        version = 'unknown'
+    missing = []
+    for name in _LANGEXTRACT_INTERNALS:
+        obj = lx
+        for part in name.split('.'):
+            obj = getattr(obj, part, None)
+        if obj is None:
+            missing.append(name)
+    if not missing:
+        fields = getattr(lx.prompting.QAPromptGenerator, '__dataclass_fields__', {})
+        missing += [
+            f'prompting.QAPromptGenerator.{field}'
+            for field in ('template', 'format_handler', 'question_prefix', 'answer_prefix')
+            if field not in fields
+        ]
+        annotator = lx.annotation.Annotator(
+            language_model=None, prompt_template=lx.prompting.PromptTemplateStructured(description='')
+        )
+        if not isinstance(getattr(annotator, '_prompt_generator', None), lx.prompting.QAPromptGenerator):
+            missing.append('annotation.Annotator._prompt_generator')
+    if missing:
+        raise ImportError(
+            f"langextract {version} lacks internals this server relies on ({', '.join(missing)}); "
+            f"install langextract=={LANGEXTRACT_TESTED_VERSION}"
+        )
+    if version != LANGEXTRACT_TESTED_VERSION:
+        print(f"langextract {version} is untested (tested with {LANGEXTRACT_TESTED_VERSION})", file=sys.stderr)
+
+
+check_langextract_compatibility()
 
 # ============================================================================
 # RESEARCH CONTEXT EXTRACTION EXAMPLES
@@ -285,187 +368,7 @@ RESEARCH_CONTEXT_EXAMPLES = [
     }
 ]
 
-# ============================================================================
-# CORE EXTRACTION TOOLS
-# ============================================================================
-
-@mcp.tool
-async def extract_structured_data(
-    ctx: Context,
-    text: str,
-    prompt_description: str,
-    examples: List[Dict[str, Any]],
-    model_id: str = "gemini-2.5-flash",
-    extraction_passes: int = 1,
-    max_workers: int = 10,
-    max_char_buffer: int = 8000,
-    api_key: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Extract structured information from text using LangExtract.
-    
-    Args:
-        text: The input text to extract from
-        prompt_description: Clear instructions for what to extract
-        examples: List of example extractions (few-shot learning)
-        model_id: Model to use (gemini-2.5-flash recommended)
-        extraction_passes: Number of passes (1-5, more = higher recall)
-        max_workers: Parallel workers (1-50, more = faster)
-        max_char_buffer: Chunk size (1000-10000, smaller = more accurate)
-        api_key: Optional API key (defaults to LANGEXTRACT_API_KEY env var)
-    
-    Example format:
-    {
-        "text": "Dr. Smith prescribed 50mg aspirin.",
-        "extractions": [{
-            "extraction_class": "medication",
-            "extraction_text": "aspirin",
-            "attributes": {"dosage": "50mg"}
-        }]
-    }
-    """
-    
-    try:
-        await ctx.info(f"🔍 Starting extraction with {model_id}")
-        
-        # Validate inputs
-        if not text or not text.strip():
-            return {'success': False, 'error': 'Text cannot be empty'}
-        
-        if not prompt_description or not prompt_description.strip():
-            return {'success': False, 'error': 'Prompt description required'}
-        
-        if not examples or len(examples) == 0:
-            return {
-                'success': False, 
-                'error': 'At least one example required',
-                'hint': 'Use create_example_template or get_research_examples for examples'
-            }
-        
-        # Convert examples to LangExtract format
-        lx_examples = []
-        for idx, ex in enumerate(examples):
-            try:
-                if 'text' not in ex or 'extractions' not in ex:
-                    return {'success': False, 'error': f'Example {idx} missing text or extractions'}
-                
-                extractions = []
-                for e in ex['extractions']:
-                    if 'extraction_class' not in e or 'extraction_text' not in e:
-                        return {'success': False, 'error': f'Example {idx} extraction missing required fields'}
-                    
-                    extractions.append(
-                        lx.data.Extraction(
-                            extraction_class=e['extraction_class'],
-                            extraction_text=e['extraction_text'],
-                            attributes=e.get('attributes', {})
-                        )
-                    )
-                
-                lx_examples.append(lx.data.ExampleData(text=ex['text'], extractions=extractions))
-                
-            except Exception as e:
-                return {'success': False, 'error': f'Error parsing example {idx}: {str(e)}'}
-        
-        await ctx.info(f"✅ Parsed {len(lx_examples)} examples")
-        
-        # Get API key
-        final_api_key = api_key or os.environ.get('LANGEXTRACT_API_KEY')
-        if not final_api_key:
-            return {
-                'success': False, 
-                'error': 'LANGEXTRACT_API_KEY not set',
-                'hint': 'Set environment variable or pass api_key parameter'
-            }
-        
-        await ctx.info("🚀 Calling LangExtract API...")
-        
-        # Run extraction
-        result = lx.extract(
-            text_or_documents=text,
-            prompt_description=prompt_description,
-            examples=lx_examples,
-            model_id=model_id,
-            api_key=final_api_key,
-            extraction_passes=extraction_passes,
-            max_workers=max_workers,
-            max_char_buffer=max_char_buffer
-        )
-        
-        # Convert results - safely extract all attributes
-        extractions_list = []
-        for e in result.extractions:
-            extraction_dict = {
-                'extraction_class': e.extraction_class,
-                'extraction_text': e.extraction_text,
-                'attributes': e.attributes if hasattr(e, 'attributes') else {}
-            }
-            
-            # Handle char_interval
-            if hasattr(e, 'char_interval') and e.char_interval is not None:
-                try:
-                    if hasattr(e.char_interval, '__iter__'):
-                        interval_list = list(e.char_interval)
-                        extraction_dict['char_start'] = interval_list[0]
-                        extraction_dict['char_end'] = interval_list[1]
-                    elif hasattr(e.char_interval, 'start') and hasattr(e.char_interval, 'end'):
-                        extraction_dict['char_start'] = e.char_interval.start
-                        extraction_dict['char_end'] = e.char_interval.end
-                except:
-                    pass
-            
-            extractions_list.append(extraction_dict)
-        
-        # Store result
-        result_id = hashlib.md5(f"{text[:100]}{datetime.now().isoformat()}".encode()).hexdigest()
-        RESULTS_STORE[result_id] = result
-        
-        await ctx.info(f"✨ Found {len(extractions_list)} entities")
-        
-        return {
-            'success': True,
-            'result_id': result_id,
-            'total_extractions': len(extractions_list),
-            'extractions': extractions_list,
-            'metadata': {
-                'model_id': model_id,
-                'extraction_passes': extraction_passes,
-                'text_length': len(text)
-            }
-        }
-        
-    except Exception as e:
-        await ctx.error(f"Extraction failed: {str(e)}")
-        return {'success': False, 'error': str(e), 'error_type': type(e).__name__}
-
-
-@mcp.tool
-async def extract_research_context(
-    ctx: Context,
-    text: str,
-    model_id: str = "gemini-2.5-pro",
-    extraction_passes: int = 5,
-    max_workers: int = 30,
-    api_key: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Extract comprehensive research context with full preservation of nuances and relationships.
-    
-    This is a specialized tool for research papers/documentation that:
-    - Extracts all 10 categories (domains, methods, constraints, citations, etc.)
-    - Preserves source context and relationships
-    - Surfaces implicit assumptions
-    - Maintains semantic connections
-    
-    Args:
-        text: Research text to extract from
-        model_id: Model to use (gemini-2.5-pro recommended for accuracy)
-        extraction_passes: Number of passes (5 recommended)
-        max_workers: Parallel workers (30 recommended)
-        api_key: Optional API key
-    """
-    
-    prompt = """
+RESEARCH_CONTEXT_PROMPT = """
     Extract ALL research context elements from this text:
     - Domain hierarchies and interdisciplinary connections (DOMAIN_CONTEXT)
     - Methods, approaches, and techniques with citations (CURRENT_APPROACHES)
@@ -490,166 +393,4824 @@ async def extract_research_context(
     Think of this as building a knowledge graph where every node (extraction) 
     retains its original context and edges (relationships) to other nodes.
     """
+
+# ============================================================================
+# EXTRACTION RECORDS
+# ============================================================================
+
+# Results are kept as columns rather than lx.data.Extraction objects: class
+# names and attribute keys are interned, offsets are int32 arrays, and each
+# tool serves its dicts from these columns instead of probing objects.
+_ALIGNMENT_STATUSES = list(lx.data.AlignmentStatus)
+_ALIGNMENT_CODES = {status: code for code, status in enumerate(_ALIGNMENT_STATUSES)}
+
+# Attribute values up to this length are interned (categories, levels, ...)
+_INTERN_MAX_CHARS = 64
+
+
+def _intern_value(value: Any) -> Any:
+    if isinstance(value, str) and len(value) <= _INTERN_MAX_CHARS:
+        return sys.intern(value)
+    return value
+
+
+def _int_array(values: List[int]) -> array:
+    try:
+        return array('i', values)
+    except OverflowError:  # offsets past 2**31 in very large files
+        return array('q', values)
+
+
+class ExtractionRecords:
+    """
+    The extractions of one result as parallel columns.
     
-    await ctx.info("🔬 Starting comprehensive research context extraction...")
-    await ctx.info(f"📝 Text length: {len(text)} characters")
-    await ctx.info(f"🎯 Using {len(RESEARCH_CONTEXT_EXAMPLES)} specialized examples")
+    Row i is classes[class_ids[i]], texts[i], starts[i]:ends[i] (-1 when the
+    extraction was not aligned to the text) and attributes[i] (None when
+    empty). Built once per extraction with `extend`; `record`/`records`
+    produce the dicts tools return and `to_extractions` rebuilds lx objects
+    for langextract's own writers.
+    """
     
-    # Call the main extraction function
-    result = await extract_structured_data(
-        ctx=ctx,
-        text=text,
-        prompt_description=prompt,
-        examples=RESEARCH_CONTEXT_EXAMPLES,
-        model_id=model_id,
-        extraction_passes=extraction_passes,
-        max_workers=max_workers,
-        max_char_buffer=10000,  # Large buffer to preserve context
-        api_key=api_key
-    )
+    __slots__ = ('classes', '_class_index', 'class_ids', 'texts', 'starts', 'ends',
+                 'alignments', 'extraction_indexes', 'group_indexes', 'attributes', 'descriptions',
+                 '_index', '_fingerprint')
     
-    if result.get('success'):
-        await ctx.info("✅ Research context extraction complete")
-        await ctx.info(f"📊 Total extractions: {result['total_extractions']}")
-        
-        # Count by category
-        categories = {}
-        for ext in result['extractions']:
-            cat = ext.get('attributes', {}).get('category', 'Unknown')
-            categories[cat] = categories.get(cat, 0) + 1
-        
-        await ctx.info(f"📁 Categories found: {list(categories.keys())}")
-        result['category_breakdown'] = categories
+    def __init__(self):
+        self.classes: List[str] = []
+        self._class_index: Dict[str, int] = {}
+        self.class_ids = array('i')
+        self.texts: List[str] = []
+        self.starts = array('i')
+        self.ends = array('i')
+        self.alignments = array('b')
+        self.extraction_indexes = array('i')
+        self.group_indexes = array('i')
+        self.attributes: List[Optional[Dict[str, Any]]] = []
+        self.descriptions: Dict[int, str] = {}  # sparse; row -> description
+        self._index: Optional["ExtractionIndex"] = None
+        self._fingerprint: Optional[str] = None
     
-    return result
+    @classmethod
+    def from_extractions(cls, extractions: Optional[List[lx.data.Extraction]]) -> "ExtractionRecords":
+        records = cls()
+        records.extend(extractions or [])
+        return records
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def _class_id(self, name: str) -> int:
+        class_id = self._class_index.get(name)
+        if class_id is None:
+            class_id = self._class_index[name] = len(self.classes)
+            self.classes.append(sys.intern(name))
+        return class_id
+    
+    def extend(self, extractions: List[lx.data.Extraction]):
+        """Append extractions, converting each one exactly once."""
+        self._index = None
+        self._fingerprint = None
+        starts, ends = [], []
+        class_index = self._class_index
+        intern = sys.intern
+        for e in extractions:
+            interval = e.char_interval
+            if interval is not None and interval.start_pos is not None and interval.end_pos is not None:
+                starts.append(interval.start_pos)
+                ends.append(interval.end_pos)
+            else:
+                starts.append(-1)
+                ends.append(-1)
+            if e.description is not None:
+                self.descriptions[len(self.texts)] = e.description
+            class_id = class_index.get(e.extraction_class)
+            self.class_ids.append(self._class_id(e.extraction_class) if class_id is None else class_id)
+            self.texts.append(e.extraction_text)
+            self.alignments.append(_ALIGNMENT_CODES.get(e.alignment_status, -1))
+            self.extraction_indexes.append(-1 if e.extraction_index is None else e.extraction_index)
+            self.group_indexes.append(-1 if e.group_index is None else e.group_index)
+            attributes = e.attributes
+            if attributes:
+                attributes = {
+                    intern(k): intern(v) if isinstance(v, str) and len(v) <= _INTERN_MAX_CHARS else v
+                    for k, v in attributes.items()
+                }
+            self.attributes.append(attributes or None)
+        try:
+            starts, ends = array(self.starts.typecode, starts), array(self.ends.typecode, ends)
+        except OverflowError:  # offsets past 2**31 in very large files
+            self.starts, self.ends = array('q', self.starts.tolist()), array('q', self.ends.tolist())
+            starts, ends = array('q', starts), array('q', ends)
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+    
+    def index(self) -> "ExtractionIndex":
+        """Query index over these records, created on first use."""
+        if self._index is None:
+            self._index = ExtractionIndex(self)
+        return self._index
+    
+    def fingerprint(self) -> str:
+        """Digest of every column, computed on first use; equal records give equal digests."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256('\x1f'.join(self.classes).encode('utf-8'))
+            for column in (self.class_ids, self.starts, self.ends, self.alignments,
+                           self.extraction_indexes, self.group_indexes):
+                digest.update(column.tobytes())
+            digest.update('\x1f'.join(self.texts).encode('utf-8'))
+            digest.update(json.dumps(
+                [self.attributes, sorted(self.descriptions.items())], sort_keys=True, default=str
+            ).encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
+    def record(self, i: int) -> Dict[str, Any]:
+        """Extraction i as returned by the tools."""
+        record = {
+            'extraction_class': self.classes[self.class_ids[i]],
+            'extraction_text': self.texts[i],
+            'attributes': self.attributes[i] or {}
+        }
+        if self.starts[i] >= 0:
+            record['char_start'] = self.starts[i]
+            record['char_end'] = self.ends[i]
+        return record
+    
+    def records(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Extractions start:stop as returned by the tools."""
+        classes = self.classes
+        records = []
+        for class_id, text, attributes, char_start, char_end in zip(
+            self.class_ids[start:stop], self.texts[start:stop], self.attributes[start:stop],
+            self.starts[start:stop], self.ends[start:stop]
+        ):
+            record = {
+                'extraction_class': classes[class_id],
+                'extraction_text': text,
+                'attributes': attributes or {}
+            }
+            if char_start >= 0:
+                record['char_start'] = char_start
+                record['char_end'] = char_end
+            records.append(record)
+        return records
+    
+    def to_extractions(self, rows: Optional[Iterable[int]] = None, shift: int = 0) -> List[lx.data.Extraction]:
+        """lx extractions of `rows` (default all), with offsets moved back by `shift`."""
+        extractions = []
+        for i in range(len(self)) if rows is None else rows:
+            start = self.starts[i]
+            alignment = self.alignments[i]
+            extractions.append(lx.data.Extraction(
+                extraction_class=self.classes[self.class_ids[i]],
+                extraction_text=self.texts[i],
+                char_interval=lx.data.CharInterval(
+                    start_pos=start - shift, end_pos=self.ends[i] - shift
+                ) if start >= 0 else None,
+                alignment_status=_ALIGNMENT_STATUSES[alignment] if alignment >= 0 else None,
+                extraction_index=self.extraction_indexes[i] if self.extraction_indexes[i] >= 0 else None,
+                group_index=self.group_indexes[i] if self.group_indexes[i] >= 0 else None,
+                description=self.descriptions.get(i),
+                attributes=dict(self.attributes[i]) if self.attributes[i] else None
+            ))
+        return extractions
+    
+    def to_lx_dicts(self) -> List[Dict[str, Any]]:
+        """Extractions in the layout langextract's JSONL files use."""
+        classes, class_ids, texts = self.classes, self.class_ids, self.texts
+        starts, ends, alignments = self.starts, self.ends, self.alignments
+        extraction_indexes, group_indexes = self.extraction_indexes, self.group_indexes
+        dicts = []
+        for i in range(len(self)):
+            start, alignment = starts[i], alignments[i]
+            dicts.append({
+                'extraction_class': classes[class_ids[i]],
+                'extraction_text': texts[i],
+                'char_interval': {'start_pos': start, 'end_pos': ends[i]} if start >= 0 else None,
+                'alignment_status': _ALIGNMENT_STATUSES[alignment].value if alignment >= 0 else None,
+                'extraction_index': extraction_indexes[i] if extraction_indexes[i] >= 0 else None,
+                'group_index': group_indexes[i] if group_indexes[i] >= 0 else None,
+                'description': self.descriptions.get(i),
+                'attributes': self.attributes[i]
+            })
+        return dicts
+    
+    def select(self, rows: Iterable[int]) -> "ExtractionRecords":
+        """New records holding `rows` in the given order (attribute dicts are shared)."""
+        rows = list(rows)
+        selected = ExtractionRecords()
+        class_ids, classes = self.class_ids, self.classes
+        remap: Dict[int, int] = {}
+        for i in rows:
+            if class_ids[i] not in remap:
+                remap[class_ids[i]] = selected._class_id(classes[class_ids[i]])
+        selected.class_ids = array('i', [remap[class_ids[i]] for i in rows])
+        selected.texts = [self.texts[i] for i in rows]
+        selected.starts = array(self.starts.typecode, [self.starts[i] for i in rows])
+        selected.ends = array(self.ends.typecode, [self.ends[i] for i in rows])
+        selected.alignments = array('b', [self.alignments[i] for i in rows])
+        selected.extraction_indexes = array('i', [self.extraction_indexes[i] for i in rows])
+        selected.group_indexes = array('i', [self.group_indexes[i] for i in rows])
+        selected.attributes = [self.attributes[i] for i in rows]
+        if self.descriptions:
+            selected.descriptions = {
+                j: self.descriptions[i] for j, i in enumerate(rows) if i in self.descriptions
+            }
+        return selected
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns."""
+        size = sum(len(c) for c in self.classes)
+        for column in (self.class_ids, self.starts, self.ends, self.alignments,
+                       self.extraction_indexes, self.group_indexes):
+            size += column.itemsize * len(column)
+        # list slot plus str header and payload per text
+        size += sum(57 + len(t) for t in self.texts)
+        for attributes in self.attributes:
+            size += 8
+            if attributes:
+                size += sys.getsizeof(attributes)
+                for v in attributes.values():
+                    if not (isinstance(v, str) and len(v) <= _INTERN_MAX_CHARS):
+                        size += len(str(v))
+        return size
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'classes': self.classes,
+            'class_ids': self.class_ids.tolist(),
+            'texts': self.texts,
+            'starts': self.starts.tolist(),
+            'ends': self.ends.tolist(),
+            'alignments': [_ALIGNMENT_STATUSES[a].value if a >= 0 else None for a in self.alignments],
+            'extraction_indexes': self.extraction_indexes.tolist(),
+            'group_indexes': self.group_indexes.tolist(),
+            'attributes': self.attributes,
+            'descriptions': {str(i): d for i, d in self.descriptions.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExtractionRecords":
+        records = cls()
+        for name in data['classes']:
+            records._class_id(name)
+        records.class_ids = array('i', data['class_ids'])
+        records.texts = data['texts']
+        records.starts = _int_array(data['starts'])
+        records.ends = _int_array(data['ends'])
+        records.alignments = array('b', [
+            -1 if a is None else _ALIGNMENT_CODES[lx.data.AlignmentStatus(a)] for a in data['alignments']
+        ])
+        records.extraction_indexes = array('i', data['extraction_indexes'])
+        records.group_indexes = array('i', data['group_indexes'])
+        records.attributes = [
+            {sys.intern(k): _intern_value(v) for k, v in a.items()} if a else None
+            for a in data['attributes']
+        ]
+        records.descriptions = {int(i): d for i, d in data.get('descriptions', {}).items()}
+        return records
 
 
-@mcp.tool
-async def export_to_research_csv(
-    ctx: Context,
-    result_id: str,
-    output_name: str = "research_context.csv"
-) -> Dict[str, Any]:
+def _attribute_values(value: Any) -> List[str]:
+    """An attribute value as the strings a query can match (lists match per item)."""
+    if isinstance(value, list):
+        return [v if isinstance(v, str) else str(v) for v in value]
+    return [value if isinstance(value, str) else str(value)]
+
+
+class ExtractionIndex:
     """
-    Export extractions to 30-column research context CSV schema.
+    Per-result lookup structures for query_extractions, each built on first use.
     
-    This converts LangExtract results to the comprehensive research CSV format with:
-    - All 30 columns (id, category, subcategory, element_name, etc.)
-    - Source context preservation
-    - Relationship linking (converts names to IDs)
-    - Full bibliographic information
-    - Constraint metadata
+    - class name -> sorted row ids
+    - attribute key -> {value: sorted row ids}, plus the rows having the key
+      (built per key, the first time that key is queried)
+    - spans: rows with offsets sorted by start, with a running maximum of
+      their ends, so the rows overlapping [lo, hi) are found by two
+      bisections plus a scan of the candidates between them
+    - trigrams of the casefolded extraction texts -> sorted row ids
     
-    Args:
-        result_id: The extraction result ID
-        output_name: Output CSV filename
+    A query intersects the sorted row lists of its filters by leapfrogging
+    (bisecting each list forward to the largest current head), starting at
+    the cursor and stopping once a page is full, so its cost follows the
+    page rather than the result size.
     """
     
-    try:
-        if result_id not in RESULTS_STORE:
-            return {
-                'success': False, 
-                'error': f'Result not found: {result_id}',
-                'available_ids': list(RESULTS_STORE.keys())
-            }
+    SPAN_CACHE_ENTRIES = 16
+    
+    def __init__(self, records: ExtractionRecords):
+        self.records = records
+        self._by_class: Optional[List[array]] = None
+        self._by_attribute: Dict[str, tuple] = {}  # key -> (rows having key, {value: rows})
+        self._spans: Optional[tuple] = None  # (rows by start, starts, running max ends)
+        self._span_rows: "OrderedDict[tuple, List[int]]" = OrderedDict()  # recent (lo, hi) -> rows
+        self._trigrams: Optional[Dict[str, array]] = None
+        self._lock = threading.Lock()
+    
+    def class_rows(self, name: str) -> array:
+        if self._by_class is None:
+            by_class = [array('i') for _ in self.records.classes]
+            for row, class_id in enumerate(self.records.class_ids):
+                by_class[class_id].append(row)
+            self._by_class = by_class
+        class_id = self.records._class_index.get(name)
+        return self._by_class[class_id] if class_id is not None else array('i')
+    
+    def attribute_rows(self, key: str, value: Optional[str] = None) -> array:
+        entry = self._by_attribute.get(key)
+        if entry is None:
+            having, by_value = array('i'), {}
+            for row, attributes in enumerate(self.records.attributes):
+                if attributes and key in attributes:
+                    having.append(row)
+                    for v in set(_attribute_values(attributes[key])):
+                        rows = by_value.get(v)
+                        if rows is None:
+                            rows = by_value[v] = array('i')
+                        rows.append(row)
+            entry = self._by_attribute[key] = (having, by_value)
+        if value is None:
+            return entry[0]
+        return entry[1].get(value, array('i'))
+    
+    def _span_order(self) -> tuple:
+        if self._spans is None:
+            starts, ends = self.records.starts, self.records.ends
+            order = sorted((row for row in range(len(starts)) if starts[row] >= 0), key=starts.__getitem__)
+            self._spans = (
+                order,
+                [starts[row] for row in order],
+                list(itertools.accumulate((ends[row] for row in order), max))
+            )
+        return self._spans
+    
+    def span_rows(self, lo: int, hi: int) -> List[int]:
+        """Rows whose span overlaps [lo, hi), in row order."""
+        cached = self._span_rows.get((lo, hi))
+        if cached is not None:
+            return cached
+        order, starts, max_ends = self._span_order()
+        first = bisect.bisect_right(max_ends, lo)  # every earlier span ends at or before lo
+        stop = bisect.bisect_left(starts, hi)
+        ends = self.records.ends
+        rows = sorted(row for row in order[first:stop] if ends[row] > lo)
+        with self._lock:
+            self._span_rows[(lo, hi)] = rows  # Pages of one query reuse the rows
+            while len(self._span_rows) > self.SPAN_CACHE_ENTRIES:
+                self._span_rows.popitem(last=False)
+        return rows
+    
+    def start_rows(self, lo: int, hi: int) -> List[int]:
+        """Rows whose span starts in [lo, hi), in start order."""
+        order, starts, _ = self._span_order()
+        return order[bisect.bisect_left(starts, lo):bisect.bisect_left(starts, hi)]
+    
+    def text_rows(self, needle: str) -> Optional[List[array]]:
+        """
+        Row lists that every extraction containing `needle` (casefolded) is
+        in: the rarest few of its trigrams. None for needles under 3 chars.
+        """
+        if len(needle) < 3:
+            return None
+        if self._trigrams is None:
+            trigrams = {}
+            for row, text in enumerate(self.records.texts):
+                text = text.casefold()
+                for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                    rows = trigrams.get(gram)
+                    if rows is None:
+                        rows = trigrams[gram] = array('i')
+                    rows.append(row)
+            self._trigrams = trigrams
+        empty = array('i')
+        lists = sorted(
+            (self._trigrams.get(needle[i:i + 3], empty) for i in range(len(needle) - 2)), key=len
+        )
+        return lists[:3]
+    
+    def query(self, extraction_class: Optional[str] = None,
+              attributes: Optional[Dict[str, Optional[str]]] = None,
+              span: Optional[tuple] = None, text_contains: Optional[str] = None,
+              cursor: int = 0, limit: int = 50) -> tuple:
+        """
+        Rows matching every given filter, from row `cursor` on.
         
-        result = RESULTS_STORE[result_id]
+        Returns (rows, next_cursor); next_cursor is None once no candidate
+        rows remain.
+        """
+        records = self.records
+        lists = []
+        if extraction_class is not None:
+            lists.append(self.class_rows(extraction_class))
+        for key, value in (attributes or {}).items():
+            lists.append(self.attribute_rows(key, value))
+        if span is not None:
+            lists.append(self.span_rows(*span))
+        needle = text_contains.casefold() if text_contains else None
+        if needle is not None:
+            lists.extend(self.text_rows(needle) or [])
         
-        await ctx.info(f"📊 Converting {len(result.extractions)} extractions to CSV...")
+        if lists:
+            lists.sort(key=len)  # the shortest list moves the candidate furthest
+            candidates = _intersect_sorted(lists, cursor)
+        else:
+            candidates = iter(range(cursor, len(records)))
         
         rows = []
-        extraction_map = {}  # Map element_name to ID
-        
-        # First pass: Create rows and build ID map
-        for idx, e in enumerate(result.extractions, start=1):
-            attrs = e.attributes if hasattr(e, 'attributes') else {}
-            
-            # Build complete row
-            row = {
-                'id': idx,
-                'category': attrs.get('category', ''),
-                'subcategory': attrs.get('subcategory', ''),
-                'element_name': attrs.get('element_name', f"element_{idx}"),
-                'relationship_type': attrs.get('relationship_type', ''),
-                'relationship_target': attrs.get('relationship_target', ''),
-                'attribute_key': attrs.get('attribute_key', ''),
-                'attribute_value': attrs.get('attribute_value', ''),
-                'evidence_type': attrs.get('evidence_type', ''),
-                'confidence_level': attrs.get('confidence_level', ''),
-                'temporal_marker': attrs.get('temporal_marker', ''),
-                'impact_score': attrs.get('impact_score', ''),
-                'citation_key': attrs.get('citation_key', ''),
-                'citation_url': attrs.get('citation_url', ''),
-                'citation_authors': attrs.get('citation_authors', ''),
-                'citation_year': attrs.get('citation_year', ''),
-                'citation_type': attrs.get('citation_type', ''),
-                'resource_name': attrs.get('resource_name', ''),
-                'resource_url': attrs.get('resource_url', ''),
-                'resource_type': attrs.get('resource_type', ''),
-                'domain_hierarchy': attrs.get('domain_hierarchy', ''),
-                'domain_level': attrs.get('domain_level', ''),
-                'parent_domain': attrs.get('parent_domain', ''),
-                'child_domains': attrs.get('child_domains', ''),
-                'cross_domain_refs': attrs.get('cross_domain_refs', ''),
-                'constraint_type': attrs.get('constraint_type', ''),
-                'constraint_source': attrs.get('constraint_source', ''),
-                'constraint_enforcement': attrs.get('constraint_enforcement', ''),
-                'constraint_dependencies': attrs.get('constraint_dependencies', ''),
-                'source_context': attrs.get('source_context', e.extraction_text),
-                'related_to': attrs.get('related_to', ''),
-                'notes': attrs.get('notes', '')
-            }
-            
+        for row in candidates:
+            # Trigrams only narrow the candidates; the substring is checked here
+            if needle is not None and needle not in records.texts[row].casefold():
+                continue
             rows.append(row)
-            element_name = attrs.get('element_name', f"element_{idx}")
-            extraction_map[element_name] = idx
-        
-        # Second pass: Resolve relationships
-        for row in rows:
-            if row['related_to']:
-                related_names = [name.strip() for name in row['related_to'].split(',')]
-                related_ids = []
-                for name in related_names:
-                    if name in extraction_map:
-                        related_ids.append(str(extraction_map[name]))
-                
-                if related_ids:
-                    if row['relationship_target']:
-                        row['relationship_target'] += ',' + ','.join(related_ids)
-                    else:
-                        row['relationship_target'] = ','.join(related_ids)
-        
-        # Create DataFrame
-        df = pd.DataFrame(rows)
-        
-        # Save to CSV
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
-        output_path = output_dir / output_name
-        
-        df.to_csv(output_path, index=False, encoding='utf-8')
-        
-        await ctx.info(f"✅ Saved to {output_path}")
-        
-        # Validation stats
-        stats = {
-            'total_extractions': len(df),
-            'with_source_context': (df['source_context'].str.len() > 0).sum(),
-            'with_relationships': (df['relationship_target'].str.len() > 0).sum(),
-            'with_citations': (df['citation_key'].str.len() > 0).sum(),
-            'categories_covered': df['category'].nunique(),
-            'category_breakdown': df['category'].value_counts().to_dict()
-        }
-        
-        await ctx.info(f"📊 Context preserved: {stats['with_source_context']} ({stats['with_source_context']/stats['total_extractions']*100:.1f}%)")
-        await ctx.info(f"🔗 Relationships linked: {stats['with_relationships']}")
-        
-        return {
-            'success': True,
-            'file_path': str(output_path.absolute()),
-            'statistics': stats
-        }
-        
+            if len(rows) == limit:
+                break
+        return rows, next(candidates, None)
+
+
+def _intersect_sorted(lists: List[Any], start: int):
+    """Yield, in order, the values >= start present in every sorted list."""
+    positions = [0] * len(lists)
+    candidate = start
+    while True:
+        for k, values in enumerate(lists):
+            position = bisect.bisect_left(values, candidate, positions[k])
+            if position == len(values):
+                return
+            positions[k] = position
+            if values[position] != candidate:
+                candidate = values[position]
+                break
+        else:
+            yield candidate
+            candidate += 1
+
+
+def read_source_text(source: Dict[str, Any]) -> str:
+    """
+    Text of a file-backed result's source file.
+    
+    Raises if the file's size or mtime changed since extraction, as the
+    offsets would no longer match.
+    """
+    path = source['path']
+    stat = os.stat(path)
+    if stat.st_size != source['size'] or stat.st_mtime_ns != source['mtime_ns']:
+        raise ValueError(f'Source file changed since extraction: {path}')
+    # Same decoding as extraction: undecodable bytes replaced, newlines untranslated
+    with open(path, encoding=source['encoding'], errors='replace', newline='') as f:
+        return f.read()
+
+
+class StoredResult:
+    """
+    An extraction result as stored: document id, text and ExtractionRecords.
+    
+    Results of extract_from_file keep a `source` reference (path, encoding,
+    size, mtime_ns) instead of the text, which is read from the file on
+    access (for exports and visualization) and never kept.
+    """
+    
+    __slots__ = ('document_id', '_text', 'source', 'records')
+    
+    def __init__(self, document_id: Optional[str], records: ExtractionRecords,
+                 text: Optional[str] = None, source: Optional[Dict[str, Any]] = None):
+        self.document_id = document_id
+        self._text = text
+        self.source = source
+        self.records = records
+    
+    @classmethod
+    def from_document(cls, document: lx.data.AnnotatedDocument) -> "StoredResult":
+        return cls(document.document_id, ExtractionRecords.from_extractions(document.extractions),
+                   text=document.text)
+    
+    @property
+    def text(self) -> Optional[str]:
+        return read_source_text(self.source) if self.source is not None else self._text
+    
+    def to_annotated_document(self) -> lx.data.AnnotatedDocument:
+        """lx object for langextract's JSONL writer and visualizer."""
+        return lx.data.AnnotatedDocument(
+            document_id=self.document_id, extractions=self.records.to_extractions(), text=self.text
+        )
+    
+    def nbytes(self) -> int:
+        return len(self._text or '') + self.records.nbytes()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'document_id': self.document_id, 'records': self.records.to_dict()}
+        if self.source is not None:
+            data['source_file'] = self.source
+        else:
+            data['text'] = self._text
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StoredResult":
+        source = data.pop('source_file', None)
+        if 'records' in data:
+            records = ExtractionRecords.from_dict(data['records'])
+            return cls(data.get('document_id'), records, text=data.get('text'), source=source)
+        # Written before results were stored as records
+        document = lx.data_lib.dict_to_annotated_document(data)
+        result = cls.from_document(document)
+        if source is not None:
+            result._text, result.source = None, source
+        return result
+
+
+# ============================================================================
+# EXTRACTION MERGING
+# ============================================================================
+
+# langextract's multi-pass merge keeps the first pass and drops any later
+# extraction overlapping it at all, whatever its class or attributes, while
+# duplicates within one pass (or between overlapping windows) are all kept.
+# This stage merges stored records by overlap ratio instead, on demand.
+
+DEDUP_MIN_OVERLAP = float(os.environ.get('LANGEXTRACT_DEDUP_MIN_OVERLAP', '0.5'))
+
+
+def merge_overlapping_extractions(
+    records: ExtractionRecords,
+    min_overlap: float = DEDUP_MIN_OVERLAP,
+    match_class: bool = True,
+    merge_unaligned: bool = True
+) -> tuple:
+    """
+    Merge extractions that duplicate one another.
+    
+    Aligned rows are sorted by (start, -end) and swept left to right. An open
+    cluster is represented by its first row in that order (the earliest, then
+    longest span), which is the row kept. A row joins the open cluster whose
+    representative it overlaps best if the intersection over union of the
+    two spans is at least `min_overlap` (and the classes are equal when
+    `match_class`), and opens a cluster otherwise. Clusters close once the
+    sweep passes their end, so a row is only compared with the spans still
+    open at its start: O(n log n) for the sort and heap, plus the nesting
+    depth per row. Unaligned rows merge when their class (if `match_class`)
+    and casefolded text are equal.
+    
+    The kept row takes the attribute keys it lacks from the rows merged into
+    it, in row order so earlier passes win; keys it has keep their value.
+    
+    Returns the merged records, in row order, and statistics.
+    """
+    began = time.perf_counter()
+    n = len(records)
+    starts, ends, class_ids = records.starts, records.ends, records.class_ids
+    owner = list(range(n))  # row -> row it was merged into
+    
+    aligned = [i for i in range(n) if starts[i] >= 0]
+    aligned.sort(key=lambda i: (starts[i], -ends[i]))
+    open_ends: List[tuple] = []  # heap of (end, representative)
+    open_clusters: Dict[int, Dict[int, None]] = {}  # class id (0 if any class) -> representatives
+    for i in aligned:
+        start, end = starts[i], ends[i]
+        while open_ends and open_ends[0][0] < start:
+            _, closed = heapq.heappop(open_ends)
+            del open_clusters[class_ids[closed] if match_class else 0][closed]
+        cluster_key = class_ids[i] if match_class else 0
+        clusters = open_clusters.get(cluster_key)
+        if clusters is None:
+            clusters = open_clusters[cluster_key] = {}
+        best, best_overlap = -1, -1.0
+        for rep in clusters:
+            # rep starts at or before `start` and ends at or after it
+            rep_end = ends[rep]
+            union = max(end, rep_end) - starts[rep]
+            overlap = (min(end, rep_end) - start) / union if union else 1.0
+            if overlap > best_overlap:
+                best, best_overlap = rep, overlap
+        if best >= 0 and best_overlap >= min_overlap:
+            owner[i] = best
+        else:
+            clusters[i] = None
+            heapq.heappush(open_ends, (end, i))
+    
+    if merge_unaligned:
+        texts = records.texts
+        first_seen: Dict[tuple, int] = {}
+        for i in range(n):
+            if starts[i] < 0:
+                key = (class_ids[i] if match_class else 0, texts[i].strip().casefold())
+                owner[i] = first_seen.setdefault(key, i)
+    
+    attributes, classes = records.attributes, records.classes
+    merged_attributes: Dict[int, Dict[str, Any]] = {}
+    removed_by_class: Dict[str, int] = {}
+    kept, groups = [], set()
+    removed_unaligned = attributes_merged = 0
+    for i in range(n):
+        rep = owner[i]
+        if rep == i:
+            kept.append(i)
+            continue
+        groups.add(rep)
+        name = classes[class_ids[i]]
+        removed_by_class[name] = removed_by_class.get(name, 0) + 1
+        if starts[i] < 0:
+            removed_unaligned += 1
+        if attributes[i]:
+            target = merged_attributes.get(rep)
+            if target is None:
+                target = dict(attributes[rep] or ())
+            missing = {k: v for k, v in attributes[i].items() if k not in target}
+            if missing:
+                target.update(missing)
+                merged_attributes[rep] = target
+                attributes_merged += len(missing)
+    
+    merged = records.select(kept)
+    if merged_attributes:
+        for j, i in enumerate(kept):
+            if i in merged_attributes:
+                merged.attributes[j] = merged_attributes[i]
+    
+    removed = n - len(kept)
+    return merged, {
+        'input_extractions': n,
+        'output_extractions': len(kept),
+        'removed': removed,
+        'removed_aligned': removed - removed_unaligned,
+        'removed_unaligned': removed_unaligned,
+        'merged_groups': len(groups),
+        'attributes_merged': attributes_merged,
+        'removed_by_class': dict(sorted(removed_by_class.items(), key=lambda kv: -kv[1])),
+        'min_overlap': min_overlap,
+        'match_class': match_class,
+        'merge_unaligned': merge_unaligned,
+        'merge_ms': round((time.perf_counter() - began) * 1000, 3)
+    }
+
+# ============================================================================
+# RESULT STORAGE
+# ============================================================================
+
+# Results live in memory up to a byte budget; least recently used results
+# beyond it (or older than the TTL) move to the storage backend, not dropped.
+# The "memory" backend only spills to local files; the "sqlite" backend
+# persists every result so ids survive restarts and are shared by workers.
+RESULTS_MAX_MB = float(os.environ.get('LANGEXTRACT_RESULTS_MAX_MB', '256'))
+RESULTS_TTL_SECONDS = float(os.environ.get('LANGEXTRACT_RESULTS_TTL_SECONDS', '0'))
+RESULTS_BACKEND = os.environ.get('LANGEXTRACT_RESULTS_BACKEND', 'memory')
+RESULTS_SPILL_DIR = os.environ.get(
+    'LANGEXTRACT_RESULTS_SPILL_DIR',
+    os.path.join(tempfile.gettempdir(), 'langextract-results')
+)
+RESULTS_DB = os.environ.get('LANGEXTRACT_RESULTS_DB', 'output/results.db')
+
+def estimate_result_size(result: StoredResult) -> int:
+    """Rough in-memory footprint of a result in bytes (text plus records)."""
+    return result.nbytes()
+
+
+def _summarize_result(result: StoredResult) -> Dict[str, Any]:
+    return {
+        'total_extractions': len(result.records),
+        'classes': list(result.records.classes)
+    }
+
+
+def _encode_result(result: StoredResult) -> bytes:
+    return json.dumps(result.to_dict(), ensure_ascii=False).encode('utf-8')
+
+
+def _decode_result(payload: bytes) -> StoredResult:
+    return StoredResult.from_dict(json.loads(payload))
+
+
+class ResultBackend(abc.ABC):
+    """
+    Storage tier behind ResultStore.
+    
+    Write-through backends receive every result on insert and are the source
+    of truth for ids; the others only receive results evicted from memory.
+    """
+    
+    name = 'base'
+    write_through = False
+    
+    @abc.abstractmethod
+    def save(self, result_id: str, result: StoredResult, summary: Dict[str, Any]):
+        ...
+    
+    @abc.abstractmethod
+    def load(self, result_id: str) -> Optional[StoredResult]:
+        ...
+    
+    @abc.abstractmethod
+    def delete(self, result_id: str):
+        ...
+    
+    @abc.abstractmethod
+    def contains(self, result_id: str) -> bool:
+        ...
+    
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+    
+    def describe(self) -> Dict[str, Any]:
+        return {'backend': self.name}
+
+
+class SpillDirectoryBackend(ResultBackend):
+    """One JSON file per evicted result in a local directory (process-private)."""
+    
+    name = 'memory'
+    
+    def __init__(self, spill_dir: str):
+        self.spill_dir = Path(spill_dir)
+    
+    def _path(self, result_id: str) -> Path:
+        # Ids can come from outside (load_results_from_jsonl), so never use them as file names
+        return self.spill_dir / f"{hashlib.sha256(result_id.encode('utf-8')).hexdigest()}.json"
+    
+    def save(self, result_id, result, summary):
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._path(result_id).write_bytes(_encode_result(result))
+    
+    def load(self, result_id):
+        try:
+            return _decode_result(self._path(result_id).read_bytes())
+        except FileNotFoundError:
+            return None
+    
+    def delete(self, result_id):
+        self._path(result_id).unlink(missing_ok=True)
+    
+    def contains(self, result_id):
+        return self._path(result_id).exists()
+    
+    def describe(self):
+        return {'backend': self.name, 'spill_dir': str(self.spill_dir)}
+
+
+class SQLiteBackend(ResultBackend):
+    """
+    SQLite table of zlib-compressed results, safe to share between processes.
+    
+    WAL mode lets readers in other workers proceed while one worker writes;
+    each thread gets its own connection.
+    """
+    
+    name = 'sqlite'
+    write_through = True
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    result_id TEXT PRIMARY KEY,
+                    document BLOB NOT NULL,
+                    total_extractions INTEGER NOT NULL,
+                    classes TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def save(self, result_id, result, summary):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                (
+                    result_id,
+                    zlib.compress(_encode_result(result)),
+                    summary['total_extractions'],
+                    json.dumps(summary['classes']),
+                    time.time()
+                )
+            )
+    
+    def load(self, result_id):
+        row = self._connect().execute(
+            'SELECT document FROM results WHERE result_id = ?', (result_id,)
+        ).fetchone()
+        return _decode_result(zlib.decompress(row[0])) if row else None
+    
+    def delete(self, result_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM results WHERE result_id = ?', (result_id,))
+    
+    def contains(self, result_id):
+        return self._connect().execute(
+            'SELECT 1 FROM results WHERE result_id = ?', (result_id,)
+        ).fetchone() is not None
+    
+    def summaries(self):
+        rows = self._connect().execute(
+            'SELECT result_id, total_extractions, classes FROM results ORDER BY created_at'
+        ).fetchall()
+        return {
+            rid: {'total_extractions': total, 'classes': json.loads(classes)}
+            for rid, total, classes in rows
+        }
+    
+    def describe(self):
+        return {'backend': self.name, 'path': str(self.path.absolute())}
+
+
+def create_result_backend(kind: str) -> ResultBackend:
+    if kind == 'sqlite':
+        return SQLiteBackend(RESULTS_DB)
+    if kind == 'memory':
+        return SpillDirectoryBackend(RESULTS_SPILL_DIR)
+    raise ValueError(f'Unknown LANGEXTRACT_RESULTS_BACKEND: {kind}')
+
+
+class ResultStore(MutableMapping):
+    """
+    Dict-like store of extraction results with a memory budget.
+    
+    Each entry's size is estimated on insert. When the total exceeds
+    `max_bytes`, least recently used entries are evicted from memory, and
+    entries idle longer than `ttl_seconds` are evicted the same way (0
+    disables the TTL). Evicted entries are kept by the backend, and reading
+    one loads it back into memory, so callers never see the difference.
+    """
+    
+    def __init__(self, max_bytes: int, backend: ResultBackend, ttl_seconds: float = 0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (result, size, last_used)
+        self._persisted = set()
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._memory_bytes = 0
+        self._spills = 0
+        self._loads = 0
+        self._lock = threading.RLock()
+    
+    def __setitem__(self, result_id: str, result: StoredResult):
+        summary = _summarize_result(result)
+        with self._lock:
+            self._drop_memory(result_id)
+            if result_id in self._persisted and not self.backend.write_through:
+                self.backend.delete(result_id)
+                self._persisted.discard(result_id)
+            if self.backend.write_through:
+                self.backend.save(result_id, result, summary)
+                self._persisted.add(result_id)
+            self._insert(result_id, result)
+            self._summaries[result_id] = summary
+            self._evict()
+    
+    def __getitem__(self, result_id: str) -> StoredResult:
+        with self._lock:
+            entry = self._memory.get(result_id)
+            if entry is not None:
+                self._memory[result_id] = (entry[0], entry[1], time.time())
+                self._memory.move_to_end(result_id)
+                return entry[0]
+            if result_id not in self._persisted and not self.backend.write_through:
+                raise KeyError(result_id)
+            result = self.backend.load(result_id)
+            if result is None:
+                raise KeyError(result_id)
+            self._loads += 1
+            self._persisted.add(result_id)
+            self._summaries.setdefault(result_id, _summarize_result(result))
+            self._insert(result_id, result)
+            self._evict(keep=result_id)
+            return result
+    
+    def __delitem__(self, result_id: str):
+        with self._lock:
+            if result_id not in self:
+                raise KeyError(result_id)
+            self._drop_memory(result_id)
+            self._summaries.pop(result_id, None)
+            self._persisted.discard(result_id)
+            self.backend.delete(result_id)
+    
+    def __contains__(self, result_id: object) -> bool:
+        if result_id in self._summaries:
+            return True
+        return self.backend.write_through and self.backend.contains(result_id)
+    
+    def __iter__(self):
+        return iter(list(self.summaries()))
+    
+    def __len__(self) -> int:
+        return len(self.summaries())
+    
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        """Per-result counts and classes, without loading evicted results."""
+        with self._lock:
+            local = {rid: dict(summary) for rid, summary in self._summaries.items()}
+        if not self.backend.write_through:
+            return local
+        # Shared backends also know about results stored by other workers
+        merged = self.backend.summaries()
+        merged.update(local)
+        return merged
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'memory_bytes': self._memory_bytes,
+                'max_bytes': self.max_bytes,
+                'memory_entries': len(self._memory),
+                'evicted_entries': len(self._summaries) - len(self._memory),
+                'spills': self._spills,
+                'loads': self._loads,
+                **self.backend.describe()
+            }
+    
+    def _insert(self, result_id: str, result: StoredResult):
+        size = estimate_result_size(result)
+        self._memory[result_id] = (result, size, time.time())
+        self._memory_bytes += size
+    
+    def _drop_memory(self, result_id: str):
+        entry = self._memory.pop(result_id, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+    
+    def _evict(self, keep: Optional[str] = None):
+        now = time.time()
+        for result_id, (result, _, last_used) in list(self._memory.items()):
+            over_budget = self._memory_bytes > self.max_bytes
+            expired = self.ttl_seconds > 0 and now - last_used > self.ttl_seconds
+            if not (over_budget or expired):
+                break  # Remaining entries are more recently used
+            if result_id == keep:
+                continue
+            if result_id not in self._persisted:
+                self.backend.save(result_id, result, self._summaries[result_id])
+                self._persisted.add(result_id)
+                self._spills += 1
+            self._drop_memory(result_id)
+
+
+RESULTS_STORE = ResultStore(
+    int(RESULTS_MAX_MB * 1024 * 1024),
+    create_result_backend(RESULTS_BACKEND),
+    ttl_seconds=RESULTS_TTL_SECONDS
+)
+
+
+async def load_result(result_id: str) -> Optional[StoredResult]:
+    """Fetch a stored result, from memory or the backend, off the event loop."""
+    try:
+        return await asyncio.to_thread(RESULTS_STORE.__getitem__, result_id)
+    except KeyError:
+        return None
+
+
+async def store_result(result_id: str, result: StoredResult):
+    """Insert a result into RESULTS_STORE off the event loop; queue it for search and the JSONL sink."""
+    await asyncio.to_thread(RESULTS_STORE.__setitem__, result_id, result)
+    if SEARCH_ENABLED:
+        index = SEARCH_INDEX or await asyncio.to_thread(search_index)
+        index.add(result_id, result)
+    if JSONL_SINK is not None:
+        JSONL_SINK.submit(result_id, result)
+
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+# Every stored result's extractions go into an SQLite FTS5 index (extraction
+# text, attribute values, source_context) on a background thread, so
+# search_extractions can rank matches across all results. With the sqlite
+# results backend the index lives in the same database and persists with
+# the results; otherwise it is a private file removed at exit, since
+# memory-backend results don't outlive the process.
+SEARCH_ENABLED = os.environ.get('LANGEXTRACT_SEARCH', '1').lower() not in ('0', 'false', 'no')
+SEARCH_DB = os.environ.get('LANGEXTRACT_SEARCH_DB') or (RESULTS_DB if RESULTS_BACKEND == 'sqlite' else None)
+
+# BM25 weights of the extraction_text, attributes and source_context columns
+SEARCH_COLUMN_WEIGHTS = (4.0, 2.0, 1.0)
+
+
+def _search_terms(query: str, match_all: bool) -> Optional[str]:
+    """FTS5 query of the words in `query`, each quoted so none is read as syntax."""
+    terms = [f'"{term}"' for term in re.findall(r'\w+', query)]
+    if not terms:
+        return None
+    return (' ' if match_all else ' OR ').join(terms)
+
+
+class SearchIndex:
+    """
+    Incremental full-text and attribute index over all stored results.
+    
+    `add` queues a result; one background thread writes it in a single
+    transaction, replacing the rows of an earlier result with the same id
+    unless its extractions are unchanged. Searches read through per-thread
+    connections, which WAL mode lets run alongside the writer.
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lx-search')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._failed = 0
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                result_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                total_extractions INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS search_extractions (
+                id INTEGER PRIMARY KEY,
+                result_id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                extraction_class TEXT NOT NULL,
+                extraction_text TEXT NOT NULL,
+                attributes TEXT
+            );
+            CREATE INDEX IF NOT EXISTS search_extractions_result ON search_extractions (result_id);
+            CREATE INDEX IF NOT EXISTS search_extractions_class ON search_extractions (extraction_class);
+            CREATE TABLE IF NOT EXISTS search_attributes (
+                id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS search_attributes_value ON search_attributes (key, value);
+            CREATE INDEX IF NOT EXISTS search_attributes_id ON search_attributes (id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                extraction_text, attributes, source_context, tokenize='unicode61 remove_diacritics 2'
+            );
+        """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes open their own BEGIN IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def add(self, result_id: str, result: StoredResult):
+        """Queue a stored result for indexing (returns immediately)."""
+        with self._lock:
+            self._pending += 1
+        self._executor.submit(self._index, result_id, result)
+    
+    def flush(self):
+        """Block until every queued result is indexed."""
+        self._executor.submit(lambda: None).result()
+    
+    def _index(self, result_id: str, result: StoredResult):
+        try:
+            self.index_result(result_id, result)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            print(f"Search indexing failed for {result_id}: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    def index_result(self, result_id: str, result: StoredResult):
+        """Write one result's extractions to the index. Blocking."""
+        records = result.records
+        fingerprint = hashlib.sha256('\x1f'.join(records.texts).encode('utf-8')).hexdigest()
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT fingerprint, total_extractions FROM search_results WHERE result_id = ?', (result_id,)
+        ).fetchone()
+        if row == (fingerprint, len(records)):
+            return  # Same result stored again (cache hit)
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._delete(conn, result_id)
+            first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM search_extractions').fetchone()[0]
+            extraction_rows, attribute_rows, fts_rows = [], [], []
+            for i, record in enumerate(records.records()):
+                row_id = first_id + i
+                attributes = record['attributes']
+                indexed = []
+                for key, value in attributes.items():
+                    for v in _attribute_values(value):
+                        attribute_rows.append((row_id, key, v))
+                        if key != 'source_context':
+                            indexed.append(f"{key} {v}")
+                extraction_rows.append((
+                    row_id, result_id, i, record['extraction_class'], record['extraction_text'],
+                    json.dumps(attributes, ensure_ascii=False) if attributes else None
+                ))
+                fts_rows.append((
+                    row_id, record['extraction_text'], '\n'.join(indexed),
+                    str(attributes.get('source_context', ''))
+                ))
+            conn.executemany('INSERT INTO search_extractions VALUES (?, ?, ?, ?, ?, ?)', extraction_rows)
+            conn.executemany('INSERT INTO search_attributes VALUES (?, ?, ?)', attribute_rows)
+            conn.executemany(
+                'INSERT INTO search_fts (rowid, extraction_text, attributes, source_context) VALUES (?, ?, ?, ?)',
+                fts_rows
+            )
+            conn.execute(
+                'INSERT INTO search_results VALUES (?, ?, ?, ?)',
+                (result_id, fingerprint, len(records), time.time())
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, result_id: str):
+        ids = 'SELECT id FROM search_extractions WHERE result_id = ?'
+        conn.execute(f'DELETE FROM search_fts WHERE rowid IN ({ids})', (result_id,))
+        conn.execute(f'DELETE FROM search_attributes WHERE id IN ({ids})', (result_id,))
+        conn.execute('DELETE FROM search_extractions WHERE result_id = ?', (result_id,))
+        conn.execute('DELETE FROM search_results WHERE result_id = ?', (result_id,))
+    
+    def search(self, query: str = '', extraction_class: Optional[str] = None,
+               attributes: Optional[Dict[str, Optional[str]]] = None,
+               result_ids: Optional[List[str]] = None, match_all: bool = True,
+               limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Ranked hits (best BM25 score first) for the words of `query`; without
+        words, filter-only hits in index order. Blocking.
+        """
+        terms = _search_terms(query, match_all)
+        where, params = [], []
+        if terms:
+            source = 'search_fts JOIN search_extractions e ON e.id = search_fts.rowid'
+            weights = ', '.join(str(w) for w in SEARCH_COLUMN_WEIGHTS)
+            columns = f"-bm25(search_fts, {weights}), snippet(search_fts, 2, '[', ']', '…', 16)"
+            where.append('search_fts MATCH ?')
+            params.append(terms)
+            order = 'bm25(search_fts, ' + weights + ')'
+        else:
+            source = 'search_extractions e'
+            columns = 'NULL, NULL'
+            order = 'e.id'
+        if extraction_class is not None:
+            where.append('e.extraction_class = ?')
+            params.append(extraction_class)
+        for key, value in (attributes or {}).items():
+            if value is None:
+                where.append('e.id IN (SELECT id FROM search_attributes WHERE key = ?)')
+                params.append(key)
+            else:
+                where.append('e.id IN (SELECT id FROM search_attributes WHERE key = ? AND value = ?)')
+                params.extend([key, value])
+        if result_ids:
+            where.append(f"e.result_id IN ({', '.join('?' * len(result_ids))})")
+            params.extend(result_ids)
+        sql = (
+            f'SELECT e.result_id, e.row, e.extraction_class, e.extraction_text, e.attributes, {columns} '
+            f'FROM {source} {"WHERE " + " AND ".join(where) if where else ""} '
+            f'ORDER BY {order} LIMIT ? OFFSET ?'
+        )
+        hits = []
+        for result_id, row, extraction_class, text, attributes, score, snippet in self._connect().execute(
+            sql, params + [limit, offset]
+        ):
+            hit = {
+                'result_id': result_id,
+                'index': row,
+                'extraction_class': extraction_class,
+                'extraction_text': text,
+                'attributes': json.loads(attributes) if attributes else {}
+            }
+            if score is not None:
+                hit['score'] = round(score, 4)
+                hit['context_snippet'] = snippet or None
+            hits.append(hit)
+        return hits
+    
+    def stats(self) -> Dict[str, Any]:
+        results, extractions = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(total_extractions), 0) FROM search_results'
+        ).fetchone()
+        with self._lock:
+            pending, failed = self._pending, self._failed
+        return {
+            'indexed_results': results,
+            'indexed_extractions': extractions,
+            'pending_results': pending,
+            'failed_results': failed,
+            'path': str(self.path.absolute())
+        }
+
+
+def create_search_index() -> Optional[SearchIndex]:
+    if not SEARCH_ENABLED:
+        return None
+    if SEARCH_DB:
+        return SearchIndex(SEARCH_DB)
+    fd, path = tempfile.mkstemp(prefix='langextract-search-', suffix='.db')
+    os.close(fd)
+    
+    def remove():
+        for suffix in ('', '-wal', '-shm'):
+            with contextlib.suppress(OSError):
+                os.unlink(path + suffix)
+    atexit.register(remove)
+    return SearchIndex(path)
+
+
+# Created on first use (first stored result or search), so deployments that
+# never search don't open a database or start the writer thread
+SEARCH_INDEX: Optional[SearchIndex] = None
+_SEARCH_INDEX_LOCK = threading.Lock()
+
+
+def search_index() -> Optional[SearchIndex]:
+    """The process's search index (None when disabled), created on first call. Blocking."""
+    global SEARCH_INDEX
+    if SEARCH_INDEX is None and SEARCH_ENABLED:
+        with _SEARCH_INDEX_LOCK:
+            if SEARCH_INDEX is None:
+                SEARCH_INDEX = create_search_index()
+    return SEARCH_INDEX
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Per-request phase timings feed process-wide histograms. With metrics off and
+# no debug flag, requests get NULL_TIMER, whose phases are shared no-ops.
+METRICS_ENABLED = os.environ.get('LANGEXTRACT_METRICS', '1').lower() not in ('0', 'false', 'no')
+
+# Histogram bucket upper bounds in seconds (Prometheus `le` labels)
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class PhaseTimer:
+    """
+    Wall-clock time and call counts per phase of one extraction request.
+    
+    Phases run on the event loop and on the executor thread, but never
+    concurrently within one request, so no lock is needed.
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.perf_counter() if enabled else 0.0
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+    
+    @contextlib.contextmanager
+    def _timed(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+    
+    def phase(self, name: str):
+        """Context manager timing one phase; a shared no-op when disabled."""
+        return self._timed(name) if self.enabled else _NULL_PHASE
+    
+    def add(self, name: str, seconds: float, count: int = 1):
+        if self.enabled:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + count
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'phases_ms': {name: round(sec * 1000, 3) for name, sec in self.seconds.items()},
+            'phase_counts': dict(self.counts)
+        }
+
+
+NULL_TIMER = PhaseTimer(enabled=False)
+
+
+def request_timer(debug: bool = False) -> PhaseTimer:
+    return PhaseTimer() if debug or METRICS_ENABLED else NULL_TIMER
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+    
+    def __init__(self, buckets: tuple = METRIC_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'mean_seconds': round(self.sum / self.count, 6) if self.count else None,
+            'p50_le_seconds': self.quantile(0.5),
+            'p95_le_seconds': self.quantile(0.95),
+            'p99_le_seconds': self.quantile(0.99)
+        }
+
+
+class ServerMetrics:
+    """Process-wide tool latency and phase histograms plus counters."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tool_seconds: Dict[str, Histogram] = {}
+        self._phase_seconds: Dict[tuple, Histogram] = {}  # (tool, phase)
+        self._counters: Dict[tuple, int] = {}  # (name, tool)
+    
+    def observe(self, tool: str, timer: PhaseTimer, success: bool = True):
+        # Debug-only timers (metrics disabled) are returned but not aggregated
+        if not (timer.enabled and METRICS_ENABLED):
+            return
+        total = time.perf_counter() - timer.started
+        with self._lock:
+            self._tool_seconds.setdefault(tool, Histogram()).observe(total)
+            for phase, seconds in timer.seconds.items():
+                self._phase_seconds.setdefault((tool, phase), Histogram()).observe(seconds)
+            model_calls = timer.counts.get('model_call', 0)
+            if model_calls:
+                key = ('model_calls_total', tool)
+                self._counters[key] = self._counters.get(key, 0) + model_calls
+            key = ('requests_total' if success else 'errors_total', tool)
+            self._counters[key] = self._counters.get(key, 0) + 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tools': {tool: h.snapshot() for tool, h in self._tool_seconds.items()},
+                'phases': {
+                    f'{tool}.{phase}': h.snapshot() for (tool, phase), h in self._phase_seconds.items()
+                },
+                'counters': {f'{tool}.{name}': value for (name, tool), value in self._counters.items()}
+            }
+    
+    def prometheus(self, gauges: Dict[str, float]) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        
+        def histogram(name: str, help_text: str, series: Dict[str, Histogram]):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, h in series.items():
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {h.sum}')
+                lines.append(f'{name}_count{{{labels}}} {h.count}')
+        
+        with self._lock:
+            histogram(
+                'langextract_tool_duration_seconds', 'Extraction tool latency',
+                {f'tool="{tool}"': h for tool, h in self._tool_seconds.items()}
+            )
+            histogram(
+                'langextract_phase_duration_seconds', 'Time per extraction phase and request',
+                {f'tool="{tool}",phase="{phase}"': h for (tool, phase), h in self._phase_seconds.items()}
+            )
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f'# TYPE langextract_{name} counter')
+                for (counter, tool), value in self._counters.items():
+                    if counter == name:
+                        lines.append(f'langextract_{name}{{tool="{tool}"}} {value}')
+        
+        for name, value in gauges.items():
+            lines.append(f'# TYPE langextract_{name} gauge')
+            lines.append(f'langextract_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+SERVER_METRICS = ServerMetrics()
+
+# ============================================================================
+# EXTRACTION EXECUTOR
+# ============================================================================
+
+# lx.extract is blocking; it runs on this pool so the event loop stays free
+EXTRACTION_WORKERS = int(os.environ.get('LANGEXTRACT_EXTRACTION_WORKERS', '4'))
+EXTRACTION_QUEUE_LIMIT = int(os.environ.get('LANGEXTRACT_EXTRACTION_QUEUE_LIMIT', '16'))
+
+
+class ExtractionQueueFull(RuntimeError):
+    """Raised when the extraction executor cannot admit another request."""
+
+
+class ExtractionExecutor:
+    """
+    Bounded thread pool for blocking extraction calls.
+    
+    At most `max_workers` extractions run at once and at most `max_queued`
+    wait for a worker; anything beyond that is rejected immediately instead
+    of piling up behind long multi-pass extractions. `run_waiting` callers
+    (background pipelines that would rather wait than fail) instead queue
+    for admission in arrival order and are handed each freed slot.
+    """
+    
+    def __init__(self, max_workers: int, max_queued: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='lx-extract')
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._waiters: deque = deque()  # (loop, future) of run_waiting callers
+    
+    def _has_room(self) -> bool:
+        return self._running + self._queued < self.max_workers + self.max_queued
+    
+    def _hand_off(self):
+        """Reserve freed slots for the longest waiting callers. Holds the lock."""
+        while self._waiters and self._has_room():
+            loop, waiter = self._waiters.popleft()
+            self._queued += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, waiter)
+            except RuntimeError:  # the waiter's loop is closed
+                self._queued -= 1
+    
+    def _grant(self, waiter: asyncio.Future):
+        # On the waiter's loop, with its slot already reserved
+        if waiter.done():  # cancelled meanwhile: pass the slot on
+            with self._lock:
+                self._queued -= 1
+                self._hand_off()
+        else:
+            waiter.set_result(None)
+    
+    async def _admit_waiting(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._has_room():
+                self._queued += 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just before the cancellation arrived
+                    self._queued -= 1
+                    self._hand_off()
+                elif (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+                # else a grant is on its way and passes the slot on
+            raise
+    
+    def _admit(self):
+        with self._lock:
+            if self._running + self._queued >= self.max_workers + self.max_queued:
+                self._rejected += 1
+                raise ExtractionQueueFull(
+                    f'Extraction queue full ({self._running} running, {self._queued} queued)'
+                )
+            self._queued += 1
+    
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            with self._lock:
+                self._completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._hand_off()
+    
+    async def _submit(self, fn, args, kwargs):
+        future = self._pool.submit(self._call, fn, args, kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Release the queue slot if the work never reached a worker
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+                    self._hand_off()
+            raise
+    
+    async def run(self, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` on the pool and await its result."""
+        self._admit()
+        return await self._submit(fn, args, kwargs)
+    
+    async def run_waiting(self, fn, *args, **kwargs):
+        """Like `run`, but wait for room in the queue instead of raising ExtractionQueueFull."""
+        await self._admit_waiting()
+        return await self._submit(fn, args, kwargs)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'running': self._running,
+                'queue_depth': self._queued,
+                'waiting': len(self._waiters),
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected
+            }
+
+
+EXTRACTION_EXECUTOR = ExtractionExecutor(EXTRACTION_WORKERS, EXTRACTION_QUEUE_LIMIT)
+
+# ============================================================================
+# EXTRACTION RESULT CACHE
+# ============================================================================
+
+# Identical requests (same text, prompt, examples and model parameters) reuse
+# the stored result instead of paying for another multi-pass extraction
+CACHE_MAX_ENTRIES = int(os.environ.get('LANGEXTRACT_CACHE_MAX_ENTRIES', '128'))
+CACHE_TTL_SECONDS = float(os.environ.get('LANGEXTRACT_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+CACHE_DIR = os.environ.get('LANGEXTRACT_CACHE_DIR')  # unset = memory only
+CACHE_DISK_MAX_MB = float(os.environ.get('LANGEXTRACT_CACHE_DISK_MAX_MB', '512'))
+
+
+def extraction_cache_key(
+    text: str,
+    prompt_description: str,
+    examples_digest: str,
+    model_id: str,
+    extraction_passes: int,
+    max_char_buffer: int,
+    min_pass_yield: Optional[int] = None
+) -> str:
+    """
+    Stable content hash of everything that determines an extraction result.
+    
+    `min_pass_yield` is set only for adaptive passes, and content segments
+    only mark keys when enabled, so default keys are unchanged.
+    """
+    params = {
+        'text': text,
+        'prompt_description': prompt_description,
+        'examples': examples_digest,
+        'model_id': model_id,
+        'extraction_passes': extraction_passes,
+        'max_char_buffer': max_char_buffer
+    }
+    if min_pass_yield is not None:
+        params['min_pass_yield'] = min_pass_yield
+    if CONTENT_SEGMENTS:
+        params['content_segments'] = True
+    payload = json.dumps(
+        params,
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Two-tier cache of extraction results keyed on `extraction_cache_key`.
+    
+    The memory tier is an LRU bounded by entry count. The optional disk tier
+    stores one JSON file per key and is bounded by total size. Entries older
+    than `ttl_seconds` are treated as misses in both tiers (0 disables TTL).
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float,
+                 cache_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+    
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, key: str) -> Optional[StoredResult]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                del self._memory[key]
+        
+        result = self._disk_get(key)
+        with self._lock:
+            if result is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+        self._memory_put(key, result, time.time())
+        return result
+    
+    def put(self, key: str, result: StoredResult):
+        created_at = time.time()
+        self._memory_put(key, result, created_at)
+        self._disk_put(key, result, created_at)
+    
+    def _memory_put(self, key: str, result: StoredResult, created_at: float):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._memory[key] = (result, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._evictions += 1
+    
+    def _disk_get(self, key: str) -> Optional[StoredResult]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry.get('created_at', 0)):
+            path.unlink(missing_ok=True)
+            return None
+        # 'document' entries were written before results were stored as records
+        return StoredResult.from_dict(entry['result'] if 'result' in entry else entry['document'])
+    
+    def _disk_put(self, key: str, result: StoredResult, created_at: float):
+        if not self.cache_dir:
+            return
+        entry = {
+            'created_at': created_at,
+            'result': result.to_dict()
+        }
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = self._disk_path(key).with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._disk_path(key))
+        self._disk_evict()
+    
+    def _disk_evict(self):
+        if self.disk_max_bytes <= 0:
+            return
+        files = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_enabled': self.cache_dir is not None,
+                'cache_dir': str(self.cache_dir) if self.cache_dir else None
+            }
+
+
+EXTRACTION_CACHE = ExtractionCache(
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    cache_dir=CACHE_DIR,
+    disk_max_bytes=int(CACHE_DISK_MAX_MB * 1024 * 1024)
+)
+
+# Raw model outputs are also cached per chunk prompt, so a re-submitted
+# document with a small edit only sends its changed chunks to the model
+CHUNK_CACHE_MAX_MB = float(os.environ.get('LANGEXTRACT_CHUNK_CACHE_MAX_MB', '64'))
+
+
+def prompt_digest(model_id: str, prompt: str) -> str:
+    """Digest of a full chunk prompt (prompt description, examples and chunk text) for a model."""
+    return hashlib.sha256(f"{model_id}\0{prompt}".encode('utf-8')).hexdigest()
+
+
+def chunk_cache_key(digest: str, occurrence: int) -> str:
+    """
+    Key of one model output: the prompt's digest plus how often that prompt
+    was already sent in the same run, which separates extraction passes and
+    repeated chunks.
+    """
+    return f"{digest}:{occurrence}"
+
+
+class ChunkCache:
+    """
+    LRU of raw model outputs keyed on `chunk_cache_key`, bounded by size.
+    
+    Outputs are stored before alignment, so reused chunks are aligned
+    against their position in the new document and offsets stay correct.
+    """
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._outputs: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._outputs.get(key)
+            if entry is not None and not (
+                self.ttl_seconds > 0 and time.time() - entry[1] > self.ttl_seconds
+            ):
+                self._outputs.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self._misses += 1
+            return None
+    
+    def put(self, key: str, output: str):
+        size = len(output)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._outputs:
+                self._remove(key)
+            self._outputs[key] = (output, time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._outputs)))
+    
+    def _remove(self, key: str):
+        output, _ = self._outputs.pop(key)
+        self._bytes -= len(output)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'entries': len(self._outputs),
+                'memory_mb': round(self._bytes / (1024 * 1024), 3),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 3)
+            }
+
+
+CHUNK_CACHE = ChunkCache(int(CHUNK_CACHE_MAX_MB * 1024 * 1024), CACHE_TTL_SECONDS)
+
+# ============================================================================
+# PROMPT PREFIX CACHE
+# ============================================================================
+
+# The description and few-shot examples open every chunk's prompt and are the
+# same for every chunk and pass, so they are rendered once per
+# (prompt, example set, model) and each chunk only appends its question.
+PROMPT_PREFIX_CACHE_SIZE = int(os.environ.get('LANGEXTRACT_PROMPT_PREFIX_CACHE_SIZE', '64'))
+
+
+@dataclass
+class PrefixPromptGenerator(lx.prompting.QAPromptGenerator):
+    """
+    QAPromptGenerator that reuses a pre-rendered description + examples block.
+    
+    Output is identical to QAPromptGenerator.render. Prompts with additional
+    context (which sits between description and examples) fall back to a
+    full render.
+    """
+    
+    prefix: str = ''
+    
+    def render(self, question: str, additional_context: Optional[str] = None) -> str:
+        if additional_context:
+            return super().render(question, additional_context)
+        return f"{self.prefix}{self.question_prefix}{question}\n{self.answer_prefix}"
+
+
+class PromptPrefixCache:
+    """LRU of rendered prompt prefixes with hit/miss and render-time counters."""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._prefixes: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._render_seconds = 0.0
+    
+    def get(self, key: tuple, generator: lx.prompting.QAPromptGenerator) -> str:
+        with self._lock:
+            prefix = self._prefixes.get(key)
+            if prefix is not None:
+                self._prefixes.move_to_end(key)
+                self._hits += 1
+                return prefix
+            self._misses += 1
+        
+        started = time.perf_counter()
+        tail = f"{generator.question_prefix}\n{generator.answer_prefix}"
+        prefix = lx.prompting.QAPromptGenerator.render(generator, '')[:-len(tail)]
+        elapsed = time.perf_counter() - started
+        
+        with self._lock:
+            self._render_seconds += elapsed
+            self._prefixes[key] = prefix
+            while len(self._prefixes) > self.max_entries:
+                self._prefixes.popitem(last=False)
+        return prefix
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'entries': len(self._prefixes),
+                'max_entries': self.max_entries,
+                'render_seconds': round(self._render_seconds, 6)
+            }
+
+
+PROMPT_PREFIX_CACHE = PromptPrefixCache(PROMPT_PREFIX_CACHE_SIZE)
+
+
+class PrefixCachedAnnotator(lx.annotation.Annotator):
+    """Annotator whose prompts are built from a cached prefix."""
+    
+    def __init__(self, language_model, prompt_template, format_handler, prefix_key: tuple):
+        super().__init__(
+            language_model=language_model,
+            prompt_template=prompt_template,
+            format_handler=format_handler
+        )
+        generator = PrefixPromptGenerator(template=prompt_template, format_handler=format_handler)
+        generator.prefix = PROMPT_PREFIX_CACHE.get(prefix_key, generator)
+        self._prompt_generator = generator
+
+
+# ============================================================================
+# MODEL CALL SCHEDULER
+# ============================================================================
+
+# Every chunk prompt in the process is sent through one scheduler. A token
+# bucket caps requests/sec and tokens/min, an AIMD window grows concurrency
+# while calls succeed and halves it on throttling, and queued calls are served
+# round-robin across requests so one large extraction cannot starve the rest.
+MODEL_MAX_CONCURRENCY = int(os.environ.get('LANGEXTRACT_MODEL_MAX_CONCURRENCY', '64'))
+MODEL_MIN_CONCURRENCY = int(os.environ.get('LANGEXTRACT_MODEL_MIN_CONCURRENCY', '1'))
+MODEL_INITIAL_CONCURRENCY = int(os.environ.get('LANGEXTRACT_MODEL_INITIAL_CONCURRENCY', '16'))
+MODEL_RPS = float(os.environ.get('LANGEXTRACT_MODEL_RPS', '0'))  # 0 = unlimited
+MODEL_TPM = float(os.environ.get('LANGEXTRACT_MODEL_TPM', '0'))  # 0 = unlimited
+MODEL_THROTTLE_RETRIES = int(os.environ.get('LANGEXTRACT_MODEL_THROTTLE_RETRIES', '5'))
+
+# Smoothed latency above this multiple of the best seen stops window growth
+MODEL_LATENCY_FACTOR = 3.0
+# Token counts are estimated from text length
+CHARS_PER_TOKEN = 4
+
+_THROTTLE_PATTERN = re.compile(
+    r'\b429\b|rate.?limit|too many requests|resource.?exhausted|quota', re.IGNORECASE
+)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+def is_throttle_error(exc: Optional[BaseException]) -> bool:
+    """True if `exc`, or an exception it wraps, is a provider rate limit."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        for attr in ('status_code', 'code', 'status'):
+            if getattr(exc, attr, None) in (429, '429'):
+                return True
+        if _THROTTLE_PATTERN.search(str(exc)):
+            return True
+        exc = getattr(exc, 'original', None) or exc.__cause__ or exc.__context__
+    return False
+
+
+class TokenBucket:
+    """Budget refilled at `rate` units/sec up to `capacity`; rate 0 means unlimited."""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(0.0, rate)
+        self.capacity = max(1.0, capacity)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (capped at a full bucket)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self._level) / self.rate)
+    
+    def take(self, amount: float, now: float):
+        """Debit `amount`; the level may go negative, delaying later callers."""
+        if self.rate:
+            self._refill(now)
+            self._level -= amount
+    
+    @property
+    def level(self) -> Optional[float]:
+        return round(self._level, 2) if self.rate else None
+
+
+class _ModelCall:
+    __slots__ = ('client', 'fn', 'tokens', 'future', 'attempts', 'not_before')
+    
+    def __init__(self, client, fn, tokens: int):
+        self.client = client
+        self.fn = fn
+        self.tokens = tokens
+        self.future: Future = Future()
+        self.attempts = 0
+        self.not_before = 0.0
+
+
+class _Client:
+    __slots__ = ('queue', 'running', 'max_in_flight')
+    
+    def __init__(self, max_in_flight: int):
+        self.queue: deque = deque()
+        self.running = 0
+        self.max_in_flight = max_in_flight
+
+
+class ModelCallScheduler:
+    """
+    Process-wide admission control for model calls.
+    
+    Calls are queued per client (one client per extraction request) and a
+    dispatcher thread starts them on a shared pool while the AIMD window and
+    the request/token buckets allow. Each client is also capped at its own
+    `max_in_flight`. Throttled calls shrink the window and are retried with
+    jittered exponential backoff; other errors go straight to the caller.
+    """
+    
+    def __init__(self, max_concurrency: int, min_concurrency: int, initial_concurrency: int,
+                 requests_per_second: float, tokens_per_minute: float, max_retries: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = min(max(1, min_concurrency), self.max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self._limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self._requests = TokenBucket(requests_per_second, requests_per_second)
+        self._tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self._cond = threading.Condition()
+        self._clients: "OrderedDict[Any, _Client]" = OrderedDict()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._best_latency: Optional[float] = None
+        self._latency_ewma: Optional[float] = None
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._throttled = 0
+        self._retries = 0
+        self._decreases = 0
+    
+    def submit(self, client, fn, prompt_tokens: int = 0, max_in_flight: Optional[int] = None) -> Future:
+        """Queue `fn()` for `client`; the returned future holds its result."""
+        call = _ModelCall(client, fn, prompt_tokens)
+        with self._cond:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix='lx-model'
+                )
+                threading.Thread(target=self._dispatch_loop, name='lx-model-dispatch', daemon=True).start()
+            state = self._clients.get(client)
+            if state is None:
+                state = self._clients[client] = _Client(max_in_flight or self.max_concurrency)
+            state.queue.append(call)
+            self._submitted += 1
+            self._cond.notify()
+        return call.future
+    
+    def record_usage(self, tokens: int):
+        """Charge response tokens against the tokens/min budget."""
+        with self._cond:
+            self._tokens.take(tokens, time.monotonic())
+    
+    def _next_call(self):
+        """Pop the next runnable call round-robin; else (None, seconds to wait)."""
+        if self._in_flight >= int(self._limit):
+            return None, None
+        now = time.monotonic()
+        delay = None
+        idle = []
+        picked = None
+        for client, state in self._clients.items():
+            while state.queue and state.queue[0].future.cancelled():
+                state.queue.popleft()
+            if not state.queue:
+                if not state.running:
+                    idle.append(client)
+                continue
+            if state.running >= state.max_in_flight:
+                continue
+            call = state.queue[0]
+            if call.not_before > now:
+                delay = min(delay, call.not_before - now) if delay is not None else call.not_before - now
+                continue
+            wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(call.tokens, now))
+            if wait > 0:
+                delay = wait
+                break
+            picked = state.queue.popleft()
+            break
+        for client in idle:
+            del self._clients[client]
+        if picked is None:
+            return None, delay
+        # The client goes to the back of the line for its next call
+        self._clients.move_to_end(picked.client)
+        self._requests.take(1, now)
+        self._tokens.take(picked.tokens, now)
+        return picked, None
+    
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                call, delay = self._next_call()
+                while call is None:
+                    self._cond.wait(delay)
+                    call, delay = self._next_call()
+                self._in_flight += 1
+                self._clients[call.client].running += 1
+            self._pool.submit(self._run, call)
+    
+    def _release(self, call: _ModelCall):
+        self._in_flight -= 1
+        state = self._clients.get(call.client)
+        if state is not None:
+            state.running -= 1
+    
+    def _run(self, call: _ModelCall):
+        started = time.monotonic()
+        try:
+            result = call.fn()
+        except Exception as exc:
+            with self._cond:
+                self._release(call)
+                if is_throttle_error(exc):
+                    self._throttled += 1
+                    # One decrease per window: calls already in flight when the
+                    # window shrank were sent at the old rate
+                    if started >= self._last_decrease:
+                        self._limit = max(float(self.min_concurrency), self._limit / 2)
+                        self._last_decrease = time.monotonic()
+                        self._decreases += 1
+                    if call.attempts < self.max_retries and not call.future.cancelled():
+                        call.attempts += 1
+                        self._retries += 1
+                        backoff = min(30.0, 0.5 * 2 ** call.attempts) * (0.5 + random.random() / 2)
+                        call.not_before = time.monotonic() + backoff
+                        state = self._clients.get(call.client)
+                        if state is None:
+                            state = self._clients[call.client] = _Client(self.max_concurrency)
+                        state.queue.appendleft(call)
+                        self._cond.notify()
+                        return
+                self._failed += 1
+                self._cond.notify()
+            self._resolve(call.future.set_exception, exc)
+            return
+        
+        latency = time.monotonic() - started
+        with self._cond:
+            saturated = self._in_flight >= int(self._limit)
+            self._release(call)
+            self._completed += 1
+            self._best_latency = latency if self._best_latency is None else min(self._best_latency, latency)
+            self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+            congested = self._latency_ewma > MODEL_LATENCY_FACTOR * self._best_latency
+            # Additive increase (about +1 per window) only while the window is the bottleneck
+            if saturated and not congested:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._cond.notify()
+        self._resolve(call.future.set_result, result)
+    
+    @staticmethod
+    def _resolve(setter, value):
+        try:
+            setter(value)
+        except InvalidStateError:
+            pass  # Cancelled by the caller while running
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            self._requests.wait_time(0, now)
+            self._tokens.wait_time(0, now)
+            return {
+                'concurrency_limit': round(self._limit, 2),
+                'min_concurrency': self.min_concurrency,
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self._in_flight,
+                'queued': sum(len(state.queue) for state in self._clients.values()),
+                'active_clients': len(self._clients),
+                'requests_per_second': self._requests.rate or None,
+                'tokens_per_minute': round(self._tokens.rate * 60) or None,
+                'request_budget': self._requests.level,
+                'token_budget': self._tokens.level,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'throttled': self._throttled,
+                'retries': self._retries,
+                'window_decreases': self._decreases,
+                'latency_ewma_seconds': round(self._latency_ewma, 6) if self._latency_ewma is not None else None,
+                'best_latency_seconds': round(self._best_latency, 6) if self._best_latency is not None else None
+            }
+
+
+MODEL_SCHEDULER = ModelCallScheduler(
+    MODEL_MAX_CONCURRENCY, MODEL_MIN_CONCURRENCY, MODEL_INITIAL_CONCURRENCY,
+    MODEL_RPS, MODEL_TPM, MODEL_THROTTLE_RETRIES
+)
+
+
+# ============================================================================
+# MODEL CALL TRACKING
+# ============================================================================
+
+class ExtractionCancelled(RuntimeError):
+    """Raised inside a running extraction once its monitor is cancelled."""
+
+
+class ExtractionMonitor:
+    """
+    Progress counters, chunk layout and cancellation flag for one run.
+    
+    Updated from the executor thread as model outputs arrive; read from the
+    event loop by job status queries. Listeners are called (on the executor
+    thread) with a chunk event and the raw model output for every chunk.
+    
+    Model outputs arrive in the order of `schedule`: every chunk for each
+    pass, or with adaptive passes, the chunks each later pass is planned for.
+    `start` may be called again for the next batch of chunks (one window of
+    a file); call counters keep accumulating across batches.
+    """
+    
+    def __init__(self):
+        self.chunks: List[tuple] = []  # (document_id, char_start, char_end) per chunk of a pass
+        self.texts: Dict[Optional[str], str] = {}
+        self.resolver: Optional[lx.resolver.Resolver] = None
+        self.extraction_passes = 1
+        self.adaptive = False
+        self.schedule: List[tuple] = []  # (pass_index, chunk_index) per model output, in order
+        self._pass_starts: List[int] = []  # schedule index where each pass begins
+        self._base_calls = 0  # model_calls before the current batch of chunks
+        self.model_calls = 0
+        self.cached_calls = 0
+        self.started_at: Optional[float] = None
+        self._listeners = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def total_chunks(self) -> int:
+        return len(self.chunks)
+    
+    def start(self, chunks: List[tuple], texts: Dict[Optional[str], str], extraction_passes: int,
+              adaptive: bool = False):
+        with self._lock:
+            self.chunks = chunks
+            self.texts = texts
+            self.extraction_passes = max(1, extraction_passes)
+            self.adaptive = adaptive
+            self.schedule = []
+            self._pass_starts = []
+            self._base_calls = self.model_calls
+            self.started_at = self.started_at or time.time()
+        # Adaptive runs plan later passes once the previous one has finished
+        for pass_index in range(1 if adaptive else self.extraction_passes):
+            self.plan_pass(pass_index, range(len(chunks)))
+    
+    def plan_pass(self, pass_index: int, chunk_indices):
+        with self._lock:
+            self._pass_starts.append(len(self.schedule))
+            self.schedule.extend((pass_index, chunk_index) for chunk_index in chunk_indices)
+    
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+    
+    def cancel(self):
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise ExtractionCancelled('Extraction cancelled')
+    
+    def record_output(self, prompt: str, output: Optional[str], cached: bool = False):
+        with self._lock:
+            index = self.model_calls
+            self.model_calls += 1
+            self.cached_calls += cached
+        position = index - self._base_calls
+        if not self._listeners or not self.chunks or position >= len(self.schedule):
+            return
+        pass_index, chunk_index = self.schedule[position]
+        document_id, char_start, char_end = self.chunks[chunk_index]
+        event = {
+            'document_id': document_id,
+            'chunk_index': chunk_index,
+            'total_chunks': len(self.chunks),
+            'pass': pass_index + 1,
+            'extraction_passes': self.extraction_passes,
+            'char_start': char_start,
+            'char_end': char_end,
+            'model_calls': index + 1,
+            'total_model_calls': self._base_calls + len(self.schedule),
+            'cached': cached
+        }
+        for listener in self._listeners:
+            try:
+                listener(event, output)
+            except Exception:
+                pass  # Reporting must never break the extraction
+    
+    def parse_chunk(self, event: Dict[str, Any], output: Optional[str]) -> List[Dict[str, Any]]:
+        """Resolve and align one chunk's raw output against the source text."""
+        if not output or self.resolver is None:
+            return []
+        text = self.texts.get(event['document_id'], '')
+        extractions = self.resolver.align(
+            self.resolver.resolve(output, suppress_parse_errors=True),
+            text[event['char_start']:event['char_end']],
+            token_offset=0,
+            char_offset=event['char_start']
+        )
+        chunk_extractions = []
+        for e in extractions:
+            extraction_dict = {
+                'extraction_class': e.extraction_class,
+                'extraction_text': e.extraction_text,
+                'attributes': e.attributes or {}
+            }
+            if e.char_interval is not None:
+                extraction_dict['char_start'] = e.char_interval.start_pos
+                extraction_dict['char_end'] = e.char_interval.end_pos
+            chunk_extractions.append(extraction_dict)
+        return chunk_extractions
+    
+    def chunk_cache_summary(self) -> Dict[str, Any]:
+        """How many chunk outputs this run reused instead of calling the model."""
+        with self._lock:
+            calls, cached = self.model_calls, self.cached_calls
+        return {
+            'chunk_outputs': calls,
+            'chunks_reused': cached,
+            'model_calls': calls - cached,
+            'model_calls_saved': cached,
+            'reuse_ratio': round(cached / calls, 4) if calls else 0.0
+        }
+    
+    def pass_summary(self) -> Dict[str, Any]:
+        """Passes run per chunk of the current batch, and chunk calls saved versus every pass."""
+        with self._lock:
+            passes_per_chunk = [0] * len(self.chunks)
+            calls = self.model_calls - self._base_calls
+            for _, chunk_index in self.schedule[:calls]:
+                passes_per_chunk[chunk_index] += 1
+            fixed = len(self.chunks) * self.extraction_passes
+        return {
+            'mode': 'adaptive' if self.adaptive else 'fixed',
+            'max_passes': self.extraction_passes,
+            'passes_run': max(passes_per_chunk, default=0),
+            'passes_per_chunk': passes_per_chunk,
+            'chunk_calls': calls,
+            'fixed_pass_chunk_calls': fixed,
+            'chunk_calls_saved': max(0, fixed - calls)
+        }
+    
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            base = self._base_calls
+            calls, total, passes = self.model_calls - base, len(self.chunks), self.extraction_passes
+            planned, pass_starts = len(self.schedule), self._pass_starts
+            started_at = self.started_at
+        # The pass holding the next output (or the last one, once all are in)
+        current = max(0, bisect.bisect_right(pass_starts, min(calls, planned - 1)) - 1)
+        pass_end = pass_starts[current + 1] if current + 1 < len(pass_starts) else planned
+        chunks_done = calls - pass_starts[current] if pass_starts else 0
+        return {
+            'chunks_done': min(chunks_done, total),
+            'total_chunks': total,
+            'pass_chunks': pass_end - pass_starts[current] if pass_starts else total,
+            'current_pass': current + 1,
+            'extraction_passes': passes,
+            'model_calls': base + calls,
+            'total_model_calls': base + planned,
+            'elapsed_seconds': round(time.time() - started_at, 3) if started_at else 0.0
+        }
+
+
+class ProgressReporter:
+    """
+    Forwards monitor events from the executor thread to the MCP client.
+    
+    Every chunk becomes a progress notification. With `stream_chunks`, the
+    chunk's aligned extractions are also sent as a `langextract.chunks` log
+    message (in `extra`) so clients can consume results before the whole
+    document is done.
+    """
+    
+    def __init__(self, ctx: Context, monitor: ExtractionMonitor, stream_chunks: bool = False):
+        self._ctx = ctx
+        self._monitor = monitor
+        self._stream_chunks = stream_chunks
+        self._loop = asyncio.get_running_loop()
+        # Notifications need the request's context vars, not the worker thread's
+        self._context = contextvars.copy_context()
+        self._pending = []
+        monitor.add_listener(self._on_output)
+    
+    def _on_output(self, event: Dict[str, Any], output: Optional[str]):
+        if self._stream_chunks:
+            event = {**event, 'extractions': self._monitor.parse_chunk(event, output)}
+        self._loop.call_soon_threadsafe(self._schedule, event)
+    
+    def _schedule(self, event: Dict[str, Any]):
+        self._pending.append(self._loop.create_task(self._send(event), context=self._context))
+    
+    async def _send(self, event: Dict[str, Any]):
+        try:
+            await self._ctx.report_progress(
+                progress=event['model_calls'],
+                total=event['total_model_calls'],
+                message=f"Pass {event['pass']}/{event['extraction_passes']}: "
+                        f"chunk {event['chunk_index'] + 1}/{event['total_chunks']}"
+            )
+            if self._stream_chunks:
+                await self._ctx.log(
+                    message=f"Chunk {event['chunk_index'] + 1}/{event['total_chunks']} "
+                            f"(pass {event['pass']}): {len(event['extractions'])} extractions",
+                    level='info',
+                    logger_name='langextract.chunks',
+                    extra=event
+                )
+        except Exception:
+            pass  # The client may have gone away; the extraction carries on
+    
+    async def flush(self):
+        """Wait until every queued notification has been sent."""
+        # Let callbacks queued by the worker thread schedule their sends first
+        await asyncio.sleep(0)
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+
+class TrackedModel(lx.core.base_model.BaseLanguageModel):
+    """
+    Wraps a LangExtract provider so every model output is reported to an
+    ExtractionMonitor, cancellation takes effect between outputs, and
+    outputs for previously seen chunk prompts come from CHUNK_CACHE.
+    
+    Uncached prompts are sent one per provider call through MODEL_SCHEDULER,
+    at most `max_in_flight` at a time for this request.
+    """
+    
+    def __init__(self, inner: lx.core.base_model.BaseLanguageModel, monitor: ExtractionMonitor,
+                 use_chunk_cache: bool = True, timer: PhaseTimer = NULL_TIMER,
+                 max_in_flight: Optional[int] = None):
+        super().__init__()
+        self._inner = inner
+        self._monitor = monitor
+        self._use_chunk_cache = use_chunk_cache
+        self._timer = timer
+        self._max_in_flight = max_in_flight
+        self._occurrences: Dict[str, int] = {}  # keyed by prompt digest, not the prompt
+        self.model_id = getattr(inner, 'model_id', None)
+    
+    @property
+    def schema(self):
+        return self._inner.schema
+    
+    @property
+    def requires_fence_output(self) -> bool:
+        return self._inner.requires_fence_output
+    
+    def _cache_key(self, prompt: str) -> str:
+        digest = prompt_digest(self.model_id or '', prompt)
+        occurrence = self._occurrences.get(digest, 0)
+        self._occurrences[digest] = occurrence + 1
+        return chunk_cache_key(digest, occurrence)
+    
+    def reset_occurrences(self):
+        """Forget which prompts were seen (between independent windows of a file)."""
+        self._occurrences.clear()
+    
+    def infer(self, batch_prompts, **kwargs):
+        self._monitor.check_cancelled()
+        keys = [self._cache_key(prompt) for prompt in batch_prompts]
+        cached = [CHUNK_CACHE.get(key) if self._use_chunk_cache else None for key in keys]
+        futures = [
+            MODEL_SCHEDULER.submit(
+                self,
+                functools.partial(self._call, prompt, kwargs),
+                prompt_tokens=estimate_tokens(prompt),
+                max_in_flight=self._max_in_flight
+            )
+            for prompt, output in zip(batch_prompts, cached) if output is None
+        ]
+        pending = iter(futures)
+        
+        try:
+            for prompt, key, output in zip(batch_prompts, keys, cached):
+                self._monitor.check_cancelled()
+                if output is not None:
+                    self._monitor.record_output(prompt, output, cached=True)
+                    yield [lx.core.types.ScoredOutput(score=1.0, output=output)]
+                    continue
+                outputs, seconds = self._wait(next(pending))
+                self._timer.add('model_call', seconds)
+                output = outputs[0].output if outputs else None
+                MODEL_SCHEDULER.record_usage(estimate_tokens(output))
+                if output is not None:
+                    CHUNK_CACHE.put(key, output)
+                self._monitor.record_output(prompt, output)
+                yield outputs
+        finally:
+            # Drop queued calls once the batch is abandoned (error or cancellation)
+            for future in futures:
+                future.cancel()
+    
+    def _call(self, prompt: str, kwargs: Dict[str, Any]):
+        started = time.perf_counter()
+        outputs = list(next(iter(self._inner.infer([prompt], **kwargs))))
+        return outputs, time.perf_counter() - started
+    
+    def _wait(self, future: Future):
+        while True:
+            try:
+                return future.result(timeout=0.25)
+            except FutureTimeout:
+                self._monitor.check_cancelled()
+
+
+def chunk_spans(text: str, max_char_buffer: int) -> List[tuple]:
+    """Char spans of the chunks lx.extract will split `text` into per pass."""
+    chunk_iter = lx.chunking.ChunkIterator(
+        text, max_char_buffer, tokenizer_impl=lx.tokenizer.RegexTokenizer()
+    )
+    return [(chunk.char_interval.start_pos, chunk.char_interval.end_pos) for chunk in chunk_iter]
+
+
+# Opt-in: annotate documents as content-defined segments so chunk-cache hits
+# survive edits. Chunk boundaries (and so model output) then differ from
+# stock lx.extract for texts longer than one segment, so it is off by default.
+CONTENT_SEGMENTS = os.environ.get('LANGEXTRACT_CONTENT_SEGMENTS', '0').lower() in ('1', 'true', 'yes')
+
+# Segments hold at least this many chunks before a content-defined cut, which
+# keeps the extra partial chunk per segment a small share of model calls
+SEGMENT_MIN_CHUNKS = 8
+SEGMENT_CUT_DIVISOR = 4
+
+
+def content_segments(text: str, max_char_buffer: int) -> List[tuple]:
+    """
+    Split `text` at content-defined line boundaries.
+    
+    lx chunking packs sentences greedily, so an edit early in a document
+    shifts every later chunk boundary. Cutting where the hash of a line
+    matches (once a segment is long enough) makes boundaries depend on the
+    text around them only: after an edit, segments, and so their chunks and
+    chunk-cache keys, resynchronise at the next cut.
+    
+    Chunks never cross a segment cut, so on texts longer than one segment
+    the chunk boundaries (and model calls) differ from stock lx.extract's;
+    ExtractionPipeline only segments with LANGEXTRACT_CONTENT_SEGMENTS.
+    """
+    min_length = max_char_buffer * SEGMENT_MIN_CHUNKS
+    spans = []
+    start = 0
+    line_start = 0
+    while True:
+        newline = text.find('\n', line_start)
+        if newline == -1:
+            break
+        line = text[line_start:newline].strip()
+        line_start = newline + 1
+        if (line and line_start - start >= min_length
+                and zlib.crc32(line.encode('utf-8')) % SEGMENT_CUT_DIVISOR == 0):
+            spans.append((start, line_start))
+            start = line_start
+    if start < len(text) or not spans:
+        spans.append((start, len(text)))
+    return spans
+
+
+class ExtractionPipeline:
+    """
+    The pieces lx.extract composes (schema-constrained provider, JSON format
+    handler, resolver, annotator), built once per request.
+    
+    Prompts are rendered from PROMPT_PREFIX_CACHE; example alignment was
+    already checked when the example set was converted. `annotate` can be
+    called repeatedly (extract_from_file feeds one window of a file at a
+    time); the monitor's counters accumulate across calls. Blocking, so
+    meant to run on EXTRACTION_EXECUTOR.
+    """
+    
+    def __init__(
+        self,
+        prompt_description: str,
+        example_set: "ExampleSet",
+        model_id: str,
+        api_key: str,
+        extraction_passes: int,
+        max_workers: int,
+        max_char_buffer: int,
+        monitor: Optional[ExtractionMonitor] = None,
+        batch_length: Optional[int] = None,
+        use_chunk_cache: bool = True,
+        timer: PhaseTimer = NULL_TIMER,
+        adaptive_passes: bool = False,
+        min_pass_yield: int = 1
+    ):
+        self.monitor = monitor or ExtractionMonitor()
+        self.extraction_passes = extraction_passes
+        self.max_char_buffer = max_char_buffer
+        self.adaptive = adaptive_passes and extraction_passes > 1
+        self.min_pass_yield = min_pass_yield
+        self.timer = timer
+        
+        started = time.perf_counter()
+        examples = example_set.lx_examples
+        config = lx.factory.ModelConfig(
+            model_id=model_id,
+            provider_kwargs={'api_key': api_key, 'max_workers': max_workers}
+        )
+        model = lx.factory.create_model(config=config, examples=examples, use_schema_constraints=True)
+        
+        format_handler = lx.core.format_handler.FormatHandler(
+            format_type=lx.data.FormatType.JSON,
+            use_wrapper=True,
+            wrapper_key=lx.data.EXTRACTIONS_KEY,
+            use_fences=model.requires_fence_output,
+            attribute_suffix=lx.data.ATTRIBUTE_SUFFIX
+        )
+        if model.schema is not None:
+            model.schema.validate_format(format_handler)
+        resolver = lx.resolver.Resolver(format_handler=format_handler)
+        self.monitor.resolver = resolver  # for per-chunk streaming
+        
+        prompt_template = lx.prompting.PromptTemplateStructured(description=prompt_description)
+        prompt_template.examples.extend(examples)
+        self.model = TrackedModel(
+            model, self.monitor, use_chunk_cache=use_chunk_cache, timer=timer, max_in_flight=max_workers
+        )
+        self.annotator = PrefixCachedAnnotator(
+            language_model=self.model,
+            prompt_template=prompt_template,
+            format_handler=format_handler,
+            prefix_key=(prompt_description, example_set.digest, model_id, model.requires_fence_output)
+        )
+        timer.add('model_setup', time.perf_counter() - started)
+        
+        self.annotate_kwargs = dict(
+            resolver=resolver,
+            max_char_buffer=max_char_buffer,
+            # A batch is the most calls the annotator hands the scheduler at once
+            batch_length=batch_length or max(10, max_workers),
+            debug=False,
+            extraction_passes=1 if self.adaptive else extraction_passes,
+            show_progress=False,
+            max_workers=max_workers,
+            suppress_parse_errors=True
+        )
+    
+    def annotate(self, documents: List[lx.data.Document]) -> Dict[Optional[str], List[lx.data.Extraction]]:
+        """
+        Extractions per document id, with offsets into each document's text.
+        
+        Documents are chunked as lx.extract does, or annotated as
+        content-defined segments with LANGEXTRACT_CONTENT_SEGMENTS; with
+        adaptive passes, passes after the first run per chunk (see
+        run_adaptive_passes).
+        """
+        timer = self.timer
+        with timer.phase('chunking'):
+            segments = []  # (document, offset, segment document)
+            for doc in documents:
+                if not CONTENT_SEGMENTS:
+                    segments.append((doc, 0, doc))
+                    continue
+                for index, (start, end) in enumerate(content_segments(doc.text, self.max_char_buffer)):
+                    segments.append((doc, start, lx.data.Document(
+                        text=doc.text[start:end],
+                        document_id=f"{doc.document_id}#{index}",
+                        additional_context=doc.additional_context
+                    )))
+            
+            chunks = [
+                (doc.document_id, offset + start, offset + end)
+                for doc, offset, segment in segments
+                for start, end in chunk_spans(segment.text, self.max_char_buffer)
+            ]
+        self.monitor.start(
+            chunks, {doc.document_id: doc.text for doc in documents}, self.extraction_passes,
+            adaptive=self.adaptive
+        )
+        
+        with timer.phase('annotate'):  # prompting, model calls, parsing and alignment
+            annotated = {
+                result.document_id: result
+                for result in self.annotator.annotate_documents(
+                    documents=[segment for _, _, segment in segments], **self.annotate_kwargs
+                )
+            }
+        
+        # Stitch segments back together, re-basing offsets onto the full document
+        extractions = {doc.document_id: [] for doc in documents}
+        for doc, offset, segment in segments:
+            if segment is doc:
+                extractions[doc.document_id].extend(annotated[doc.document_id].extractions or [])
+                continue
+            for e in annotated[segment.document_id].extractions or []:
+                interval = e.char_interval
+                if interval is not None and interval.start_pos is not None:
+                    e.char_interval = lx.data.CharInterval(
+                        start_pos=interval.start_pos + offset,
+                        end_pos=interval.end_pos + offset
+                    )
+                e.token_interval = None  # Segment-relative, meaningless in the full document
+                extractions[doc.document_id].append(e)
+        
+        if self.adaptive:
+            with timer.phase('adaptive_passes'):
+                run_adaptive_passes(
+                    self.annotator, self.annotate_kwargs, documents, chunks, extractions,
+                    self.extraction_passes, self.min_pass_yield, self.monitor
+                )
+        return extractions
+
+
+def run_lx_extract(
+    text_or_documents: Union[str, List[lx.data.Document]],
+    prompt_description: str,
+    example_set: "ExampleSet",
+    model_id: str,
+    api_key: str,
+    extraction_passes: int,
+    max_workers: int,
+    max_char_buffer: int,
+    monitor: Optional[ExtractionMonitor] = None,
+    batch_length: Optional[int] = None,
+    use_chunk_cache: bool = True,
+    timer: PhaseTimer = NULL_TIMER,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1
+):
+    """
+    Blocking extraction through an ExtractionPipeline, returning what
+    lx.extract would: one AnnotatedDocument for a string, else a list.
+    
+    With `use_chunk_cache`, chunks whose prompt was seen before reuse the
+    cached model output. Model calls go through MODEL_SCHEDULER, with
+    `max_workers` capping this request's share. Meant to run on
+    EXTRACTION_EXECUTOR.
+    """
+    if isinstance(text_or_documents, str):
+        documents = [lx.data.Document(text=text_or_documents)]
+    else:
+        documents = list(text_or_documents)
+    
+    pipeline = ExtractionPipeline(
+        prompt_description, example_set, model_id, api_key, extraction_passes, max_workers,
+        max_char_buffer, monitor=monitor, batch_length=batch_length, use_chunk_cache=use_chunk_cache,
+        timer=timer, adaptive_passes=adaptive_passes, min_pass_yield=min_pass_yield
+    )
+    extractions = pipeline.annotate(documents)
+    results = [
+        lx.data.AnnotatedDocument(
+            document_id=doc.document_id, extractions=extractions[doc.document_id], text=doc.text
+        )
+        for doc in documents
+    ]
+    return results[0] if isinstance(text_or_documents, str) else results
+
+
+def run_adaptive_passes(
+    annotator: lx.annotation.Annotator,
+    annotate_kwargs: Dict[str, Any],
+    documents: List[lx.data.Document],
+    chunks: List[tuple],
+    extractions: Dict[Optional[str], List[lx.data.Extraction]],
+    extraction_passes: int,
+    min_pass_yield: int,
+    monitor: ExtractionMonitor
+):
+    """
+    Run passes 2..extraction_passes, each only over the chunks whose previous
+    pass added at least `min_pass_yield` new extractions.
+    
+    `extractions` holds each document's first-pass extractions (absolute
+    offsets) and is extended in place. As in LangExtract's multi-pass merge
+    the earlier pass wins: a later extraction overlapping an existing one is
+    dropped, and only aligned, non-overlapping ones count as a chunk's yield.
+    Each chunk is re-annotated as its own document, which yields the same
+    prompt as the chunk had in the first pass.
+    """
+    texts = {doc.document_id: doc for doc in documents}
+    chunk_starts: Dict[Optional[str], List[int]] = {}
+    chunk_ids: Dict[Optional[str], List[int]] = {}
+    for index, (document_id, start, _) in enumerate(chunks):
+        chunk_starts.setdefault(document_id, []).append(start)
+        chunk_ids.setdefault(document_id, []).append(index)
+    
+    # Aligned spans found so far per chunk; the first pass's yield is all of them
+    spans: List[List[tuple]] = [[] for _ in chunks]
+    for document_id, doc_extractions in extractions.items():
+        for e in doc_extractions:
+            if e.char_interval is None or e.char_interval.start_pos is None:
+                continue
+            position = bisect.bisect_right(chunk_starts[document_id], e.char_interval.start_pos) - 1
+            spans[chunk_ids[document_id][max(0, position)]].append(
+                (e.char_interval.start_pos, e.char_interval.end_pos)
+            )
+    yields = [len(chunk_spans_found) for chunk_spans_found in spans]
+    
+    for pass_index in range(1, extraction_passes):
+        active = [index for index, found in enumerate(yields) if found >= min_pass_yield]
+        if not active:
+            break
+        monitor.plan_pass(pass_index, active)
+        chunk_docs = {}
+        for index in active:
+            document_id, start, end = chunks[index]
+            doc = texts[document_id]
+            chunk_docs[f"{document_id}@{index}"] = (index, lx.data.Document(
+                text=doc.text[start:end],
+                document_id=f"{document_id}@{index}",
+                additional_context=doc.additional_context
+            ))
+        
+        yields = [0] * len(chunks)
+        for result in annotator.annotate_documents(
+            documents=[doc for _, doc in chunk_docs.values()], **{**annotate_kwargs, 'extraction_passes': 1}
+        ):
+            index, _ = chunk_docs[result.document_id]
+            document_id, offset, _ = chunks[index]
+            for e in result.extractions or []:
+                e.token_interval = None
+                interval = e.char_interval
+                if interval is not None and interval.start_pos is not None:
+                    start, end = interval.start_pos + offset, interval.end_pos + offset
+                    if any(start < found_end and found_start < end for found_start, found_end in spans[index]):
+                        continue
+                    e.char_interval = lx.data.CharInterval(start_pos=start, end_pos=end)
+                    spans[index].append((start, end))
+                    yields[index] += 1
+                extractions[document_id].append(e)
+
+
+# ============================================================================
+# FILE INGESTION
+# ============================================================================
+
+# extract_from_file decodes and annotates a file one window at a time, so
+# memory holds a window, the unfinished segment carried into the next one
+# and the records of the extractions found so far, never the whole text.
+FILE_WINDOW_MB = float(os.environ.get('LANGEXTRACT_FILE_WINDOW_MB', '4'))
+# Only files under FILE_ROOT can be read; unset, extract_from_file is
+# disabled, as it would otherwise expose any file the server can open.
+FILE_ROOT = os.environ.get('LANGEXTRACT_FILE_ROOT')
+
+
+def resolve_source_file(path: str) -> Path:
+    """Absolute path of a readable regular file under FILE_ROOT."""
+    if not FILE_ROOT:
+        raise ValueError('extract_from_file is disabled: set LANGEXTRACT_FILE_ROOT to the directory it may read')
+    root = Path(FILE_ROOT).expanduser().resolve()
+    resolved = (root / Path(path).expanduser()).resolve()
+    if not resolved.is_relative_to(root):
+        raise ValueError(f'File is outside LANGEXTRACT_FILE_ROOT: {path}')
+    if not resolved.is_file():
+        raise ValueError(f'File not found: {path}')
+    return resolved
+
+
+def text_windows(pieces: Iterable[str], max_char_buffer: int, window_chars: int):
+    """
+    Yield (char_offset, text) windows of a text arriving in `pieces`, each
+    ending at a segment cut.
+    
+    Text after the last content_segments cut of a piece is carried into the
+    next one, which keeps segments (and so chunks and chunk-cache keys) the
+    same as for the whole text. If a window has no cut, one is forced at its
+    last line break or space.
+    """
+    offset = 0
+    carry = ''
+    for piece in pieces:
+        text = carry + piece
+        cut = content_segments(text, max_char_buffer)[-1][0]  # start of the unfinished segment
+        if not cut and len(text) >= window_chars:
+            cut = max(text.rfind('\n'), text.rfind(' ')) + 1 or len(text)
+        if cut:
+            yield offset, text[:cut]
+            offset += cut
+            carry = text[cut:]
+        else:
+            carry = text
+    if carry:
+        yield offset, carry
+
+
+def file_windows(path: Path, encoding: str, max_char_buffer: int, window_bytes: int):
+    """
+    Yield (char_offset, text) windows of a file (see text_windows).
+    
+    The file is read in `window_bytes` blocks and decoded incrementally, so
+    multi-byte characters split between blocks decode correctly.
+    """
+    def pieces():
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(window_bytes)
+                yield decoder.decode(block, final=not block)
+                if not block:
+                    return
+    
+    yield from text_windows(pieces(), max_char_buffer, window_bytes)
+
+
+def extract_windows(pipeline: "ExtractionPipeline", windows: Iterable[tuple], document_id: str) -> tuple:
+    """
+    Annotate (char_offset, text) windows one after another, returning the
+    ExtractionRecords (offsets into the whole text) and a summary of the
+    windows and passes run.
+    """
+    records = ExtractionRecords()
+    count = 0
+    chars = 0
+    passes_run = 0
+    chunks_by_passes: Dict[int, int] = {}
+    chunk_calls = 0
+    fixed_calls = 0
+    
+    for offset, text in windows:
+        # Chunk prompts only repeat within a window; don't remember them all
+        pipeline.model.reset_occurrences()
+        extractions = pipeline.annotate([lx.data.Document(text=text, document_id=document_id)])[document_id]
+        for e in extractions:
+            interval = e.char_interval
+            if interval is not None and interval.start_pos is not None:
+                e.char_interval = lx.data.CharInterval(
+                    start_pos=interval.start_pos + offset, end_pos=interval.end_pos + offset
+                )
+        records.extend(extractions)
+        
+        summary = pipeline.monitor.pass_summary()
+        passes_run = max(passes_run, summary['passes_run'])
+        for passes in summary['passes_per_chunk']:
+            chunks_by_passes[passes] = chunks_by_passes.get(passes, 0) + 1
+        chunk_calls += summary['chunk_calls']
+        fixed_calls += summary['fixed_pass_chunk_calls']
+        count += 1
+        chars = offset + len(text)
+    
+    summary = {
+        'windows': count,
+        'chars': chars,
+        'passes': {
+            'mode': 'adaptive' if pipeline.adaptive else 'fixed',
+            'max_passes': pipeline.extraction_passes,
+            'passes_run': passes_run,
+            'chunks_by_passes': {str(k): v for k, v in sorted(chunks_by_passes.items())},
+            'chunk_calls': chunk_calls,
+            'fixed_pass_chunk_calls': fixed_calls,
+            'chunk_calls_saved': max(0, fixed_calls - chunk_calls)
+        }
+    }
+    return records, summary
+
+
+def run_file_extract(
+    path: Path,
+    encoding: str,
+    prompt_description: str,
+    example_set: "ExampleSet",
+    model_id: str,
+    api_key: str,
+    extraction_passes: int,
+    max_workers: int,
+    max_char_buffer: int,
+    monitor: Optional[ExtractionMonitor] = None,
+    use_chunk_cache: bool = True,
+    timer: PhaseTimer = NULL_TIMER,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1
+):
+    """
+    Blocking extraction over a file, window by window (see file_windows).
+    
+    Returns a StoredResult (records with offsets into the decoded file, and a
+    source reference instead of the text) and a summary of the windows and
+    passes run.
+    """
+    stat = path.stat()
+    pipeline = ExtractionPipeline(
+        prompt_description, example_set, model_id, api_key, extraction_passes, max_workers,
+        max_char_buffer, monitor=monitor, use_chunk_cache=use_chunk_cache, timer=timer,
+        adaptive_passes=adaptive_passes, min_pass_yield=min_pass_yield
+    )
+    window_bytes = max(1, int(FILE_WINDOW_MB * 1024 * 1024))
+    records, summary = extract_windows(
+        pipeline, file_windows(path, encoding, max_char_buffer, window_bytes), path.name
+    )
+    
+    after = path.stat()
+    if (after.st_size, after.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+        raise ValueError(f'File changed while it was being read: {path}')
+    
+    source = {'path': str(path), 'encoding': encoding, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    result = StoredResult(path.name, records, source=source)
+    return result, summary
+
+
+# ============================================================================
+# URL FETCHING
+# ============================================================================
+
+# URLs are fetched by the server through one pooled HTTP client, so
+# keep-alive connections are reused across requests. Bodies are cached on
+# disk with their ETag/Last-Modified: fetching a URL again within
+# FETCH_FRESH_SECONDS reuses the body, later it is a conditional request that
+# usually returns 304. Text is decoded (and HTML reduced to text) as it
+# streams in and handed to extraction a window at a time, so the first
+# chunks are annotated while the rest is still downloading.
+FETCH_CACHE_DIR = os.environ.get(
+    'LANGEXTRACT_FETCH_CACHE_DIR',
+    os.path.join(CACHE_DIR, 'fetch') if CACHE_DIR else os.path.join(tempfile.gettempdir(), 'langextract-fetch')
+)
+FETCH_CACHE_MAX_MB = float(os.environ.get('LANGEXTRACT_FETCH_CACHE_MAX_MB', '256'))
+FETCH_FRESH_SECONDS = float(os.environ.get('LANGEXTRACT_FETCH_FRESH_SECONDS', '300'))
+FETCH_MAX_MB = float(os.environ.get('LANGEXTRACT_FETCH_MAX_MB', '32'))
+FETCH_TIMEOUT_SECONDS = float(os.environ.get('LANGEXTRACT_FETCH_TIMEOUT_SECONDS', '30'))
+FETCH_MAX_CONNECTIONS = int(os.environ.get('LANGEXTRACT_FETCH_MAX_CONNECTIONS', '20'))
+
+FETCH_BLOCK_BYTES = 64 * 1024
+FETCH_TEXT_TYPES = ('text/', 'application/xhtml+xml', 'application/xml', 'application/json')
+_HTML_TYPES = ('text/html', 'application/xhtml+xml')
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+_WHITESPACE_RUNS = re.compile(r'(\s+)')
+
+
+class FetchError(RuntimeError):
+    """A URL could not be fetched as text (HTTP error, content type, size)."""
+    pass
+
+
+class HtmlText(html.parser.HTMLParser):
+    """
+    Incremental HTML to text: `feed` markup as it arrives, `take` the text
+    produced so far.
+    
+    Script and style content is dropped, runs of whitespace become one
+    space and block elements become line breaks. The output doesn't depend
+    on where the markup was split, so a cached body and a streamed one give
+    the same text (and the same offsets).
+    """
+    
+    SKIP = frozenset({'script', 'style', 'noscript', 'template', 'svg'})
+    BREAKS = {
+        **dict.fromkeys(('br', 'li', 'tr', 'dt', 'dd', 'div', 'nav', 'header', 'footer',
+                         'aside', 'main', 'form', 'figcaption', 'caption', 'hr'), 1),
+        **dict.fromkeys(('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'title', 'section', 'article',
+                         'blockquote', 'pre', 'table', 'ul', 'ol', 'dl', 'figure'), 2)
+    }
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip = 0
+        self._out: List[str] = []
+        self._started = False
+        self._space = False
+        self._breaks = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        else:
+            self._breaks = max(self._breaks, self.BREAKS.get(tag, 0))
+    
+    def handle_startendtag(self, tag, attrs):
+        self._breaks = max(self._breaks, self.BREAKS.get(tag, 0))
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        else:
+            self._breaks = max(self._breaks, self.BREAKS.get(tag, 0))
+    
+    def handle_data(self, data):
+        if self._skip:
+            return
+        for part in _WHITESPACE_RUNS.split(data):
+            if not part:
+                continue
+            if part.isspace():
+                self._space = True
+                continue
+            if self._started:
+                if self._breaks:
+                    self._out.append('\n' * self._breaks)
+                elif self._space:
+                    self._out.append(' ')
+            self._out.append(part)
+            self._started = True
+            self._space = False
+            self._breaks = 0
+    
+    def take(self) -> str:
+        text = ''.join(self._out)
+        self._out.clear()
+        return text
+
+
+class BodyDecoder:
+    """Incremental bytes -> text for one response body (HTML reduced to text)."""
+    
+    def __init__(self, content_type: str, charset: Optional[str], first_block: bytes):
+        self.html = content_type in _HTML_TYPES or (
+            not content_type and first_block.lstrip()[:1] == b'<'
+        )
+        if not charset and self.html:
+            match = _META_CHARSET.search(first_block[:2048])
+            charset = match.group(1).decode('ascii') if match else None
+        try:
+            charset = codecs.lookup(charset or 'utf-8').name
+        except LookupError:
+            charset = 'utf-8'
+        self.charset = 'utf-8-sig' if charset == 'utf-8' else charset  # drop a BOM
+        self._decoder = codecs.getincrementaldecoder(self.charset)(errors='replace')
+        self._parser = HtmlText() if self.html else None
+    
+    def decode(self, block: bytes, final: bool = False) -> str:
+        text = self._decoder.decode(block, final=final)
+        if self._parser is None:
+            return text
+        self._parser.feed(text)
+        if final:
+            self._parser.close()
+        return self._parser.take()
+
+
+class UrlFetcher:
+    """
+    Pooled HTTP fetcher with an on-disk response cache.
+    
+    Cache entries are `<sha256 of url>.body` (the body as received) and
+    `.json` (content type, charset, ETag, Last-Modified, fetch time), and
+    are evicted oldest first beyond `cache_max_bytes`. Bodies over
+    `max_bytes` and non-text content types are refused.
+    """
+    
+    def __init__(self, cache_dir: str, cache_max_bytes: int, max_bytes: int,
+                 timeout: float, max_connections: int, fresh_seconds: float):
+        self.cache_dir = Path(cache_dir)
+        self.cache_max_bytes = cache_max_bytes
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self.fresh_seconds = fresh_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self._lock = threading.Lock()
+        self._counts = {'fetched': 0, 'revalidated': 0, 'fresh': 0, 'failed': 0}
+        self._bytes_downloaded = 0
+        self._bytes_from_cache = 0
+    
+    def client(self) -> httpx.AsyncClient:
+        """The shared client (one per event loop; connections are loop-bound)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                ),
+                headers={'User-Agent': 'langextract-mcp-server'}
+            )
+            self._client_loop = loop
+        return self._client
+    
+    def _paths(self, url: str) -> tuple:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+    
+    @staticmethod
+    def _read_meta(meta_path: Path, body_path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta if body_path.stat().st_size == meta['size'] else None
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _count(self, outcome: str, downloaded: int = 0, from_cache: int = 0):
+        with self._lock:
+            self._counts[outcome] += 1
+            self._bytes_downloaded += downloaded
+            self._bytes_from_cache += from_cache
+    
+    async def stream(self, url: str, info: Dict[str, Any]):
+        """
+        Async iterator over the decoded text of `url`, in pieces.
+        
+        Fills `info` with cache (fresh/revalidated/miss), status,
+        content_type, final_url, bytes, chars and fetch_ms.
+        """
+        started = time.perf_counter()
+        meta_path, body_path = self._paths(url)
+        meta = self._read_meta(meta_path, body_path)
+        chars = 0
+        try:
+            if meta is not None and time.time() - meta['fetched_at'] < self.fresh_seconds:
+                info['cache'] = 'fresh'
+                async for piece in self._cached(meta, body_path, info):
+                    chars += len(piece)
+                    yield piece
+                self._count('fresh', from_cache=meta['size'])
+                return
+            
+            headers = {}
+            if meta is not None and meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta is not None and meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+            
+            async with self.client().stream('GET', url, headers=headers) as response:
+                if response.status_code == 304 and meta is not None:
+                    meta['fetched_at'] = time.time()
+                    await asyncio.to_thread(self._write_meta, meta_path, meta)
+                    info['cache'] = 'revalidated'
+                    async for piece in self._cached(meta, body_path, info):
+                        chars += len(piece)
+                        yield piece
+                    self._count('revalidated', from_cache=meta['size'])
+                    return
+                
+                if response.status_code >= 400:
+                    raise FetchError(f'HTTP {response.status_code} fetching {url}')
+                content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+                if content_type and not content_type.startswith(FETCH_TEXT_TYPES):
+                    raise FetchError(f'Unsupported content type {content_type}: only text and HTML can be extracted')
+                length = response.headers.get('content-length')
+                if length and length.isdigit() and int(length) > self.max_bytes:
+                    raise FetchError(f'Response is {int(length)} bytes, over the {self.max_bytes} byte limit')
+                info.update(
+                    cache='miss', status=response.status_code,
+                    content_type=content_type or None, final_url=str(response.url)
+                )
+                
+                # Stream to a temporary file; it becomes the cache entry once complete
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                temp_path = body_path.with_name(f"{body_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                received = 0
+                decoder = None
+                try:
+                    with open(temp_path, 'wb') as f:
+                        async for block in response.aiter_bytes(FETCH_BLOCK_BYTES):
+                            received += len(block)
+                            if received > self.max_bytes:
+                                raise FetchError(f'Response exceeds the {self.max_bytes} byte limit')
+                            f.write(block)
+                            if decoder is None:
+                                decoder = BodyDecoder(content_type, response.charset_encoding, block)
+                            piece = decoder.decode(block)
+                            if piece:
+                                chars += len(piece)
+                                yield piece
+                    if decoder is not None:
+                        piece = decoder.decode(b'', final=True)
+                        if piece:
+                            chars += len(piece)
+                            yield piece
+                    meta = {
+                        'url': url,
+                        'content_type': content_type,
+                        'charset': response.charset_encoding,
+                        'etag': response.headers.get('etag'),
+                        'last_modified': response.headers.get('last-modified'),
+                        'fetched_at': time.time(),
+                        'size': received
+                    }
+                    await asyncio.to_thread(self._store, temp_path, body_path, meta_path, meta)
+                finally:
+                    with contextlib.suppress(OSError):
+                        temp_path.unlink()
+                info['bytes'] = received
+                self._count('fetched', downloaded=received)
+        except Exception:
+            self._count('failed')
+            raise
+        finally:
+            info['chars'] = chars
+            info['fetch_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    
+    async def _cached(self, meta: Dict[str, Any], body_path: Path, info: Dict[str, Any]):
+        body = await asyncio.to_thread(body_path.read_bytes)
+        info.update(status=200, content_type=meta['content_type'] or None, final_url=meta['url'], bytes=len(body))
+        decoder = BodyDecoder(meta['content_type'], meta['charset'], body[:FETCH_BLOCK_BYTES])
+        for start in range(0, len(body), FETCH_BLOCK_BYTES):
+            piece = decoder.decode(body[start:start + FETCH_BLOCK_BYTES])
+            if piece:
+                yield piece
+        piece = decoder.decode(b'', final=True)
+        if piece:
+            yield piece
+    
+    @staticmethod
+    def _write_meta(meta_path: Path, meta: Dict[str, Any]):
+        temp_path = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+    
+    def _store(self, temp_path: Path, body_path: Path, meta_path: Path, meta: Dict[str, Any]):
+        os.replace(temp_path, body_path)
+        self._write_meta(meta_path, meta)
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*.json'):
+            with contextlib.suppress(OSError):
+                size = path.with_suffix('.body').stat().st_size
+                entries.append((path.stat().st_mtime, path, size))
+                total += size
+        for _, path, size in sorted(entries):
+            if total <= self.cache_max_bytes:
+                break
+            for stale in (path, path.with_suffix('.body')):
+                with contextlib.suppress(OSError):
+                    stale.unlink()
+            total -= size
+    
+    async def fetch_text(self, url: str, info: Dict[str, Any]) -> str:
+        """The whole decoded text of `url` (see stream)."""
+        return ''.join([piece async for piece in self.stream(url, info)])
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counts,
+                'downloaded_mb': round(self._bytes_downloaded / (1024 * 1024), 3),
+                'from_cache_mb': round(self._bytes_from_cache / (1024 * 1024), 3),
+                'cache_dir': str(self.cache_dir.absolute())
+            }
+
+
+URL_FETCHER = UrlFetcher(
+    FETCH_CACHE_DIR,
+    cache_max_bytes=int(FETCH_CACHE_MAX_MB * 1024 * 1024),
+    max_bytes=int(FETCH_MAX_MB * 1024 * 1024),
+    timeout=FETCH_TIMEOUT_SECONDS,
+    max_connections=FETCH_MAX_CONNECTIONS,
+    fresh_seconds=FETCH_FRESH_SECONDS
+)
+
+
+class TextPipe:
+    """
+    Bounded hand-off of text windows from a coroutine on the event loop to
+    a blocking consumer on an extraction thread. When `maxsize` windows are
+    waiting, the producer waits too, so a fast download can't outrun
+    extraction by more than that.
+    """
+    
+    _END = object()
+    
+    def __init__(self, maxsize: int = 2):
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+    
+    async def feed(self, pieces, window_chars: int):
+        """Put `pieces` (an async iterator) regrouped into windows of at least `window_chars`."""
+        try:
+            buffered, size = [], 0
+            async for piece in pieces:
+                buffered.append(piece)
+                size += len(piece)
+                if size >= window_chars:
+                    await self._queue.put(''.join(buffered))
+                    buffered, size = [], 0
+            if buffered:
+                await self._queue.put(''.join(buffered))
+            await self._queue.put(self._END)
+        except Exception as e:
+            await self._queue.put(e)
+    
+    def close(self):
+        """Unblock the consumer once the producer is gone (e.g. request cancelled)."""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(ExtractionCancelled('Fetch stopped'))
+    
+    def __iter__(self):
+        # Runs on the consumer thread
+        while True:
+            item = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if item is self._END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+def run_stream_extract(
+    pieces: Iterable[str],
+    document_id: str,
+    prompt_description: str,
+    example_set: "ExampleSet",
+    model_id: str,
+    api_key: str,
+    extraction_passes: int,
+    max_workers: int,
+    max_char_buffer: int,
+    monitor: Optional[ExtractionMonitor] = None,
+    timer: PhaseTimer = NULL_TIMER
+):
+    """
+    Blocking extraction over a text arriving in pieces (e.g. a TextPipe),
+    window by window as with files. Returns a StoredResult with the full
+    text and the extract_windows summary.
+    """
+    pipeline = ExtractionPipeline(
+        prompt_description, example_set, model_id, api_key, extraction_passes, max_workers,
+        max_char_buffer, monitor=monitor, timer=timer
+    )
+    received = []
+    
+    def kept(pieces):
+        for piece in pieces:
+            received.append(piece)
+            yield piece
+    
+    # Window size only bounds what is forced into one window; pieces are already windows
+    records, summary = extract_windows(
+        pipeline, text_windows(kept(pieces), max_char_buffer, sys.maxsize), document_id
+    )
+    return StoredResult(document_id, records, text=''.join(received)), summary
+
+
+# ============================================================================
+# URL BATCHES
+# ============================================================================
+
+# extract_from_urls runs a list of URLs through four stages joined by
+# bounded queues: fetch (several at once, through URL_FETCHER), normalize,
+# extract (on EXTRACTION_EXECUTOR, whose model calls all share
+# MODEL_SCHEDULER) and store. A full queue makes the stage before it wait,
+# so downloads never run more than a few documents ahead of extraction.
+# A URL that fails at any stage only fails its own entry.
+URL_BATCH_FETCH_CONCURRENCY = int(os.environ.get('LANGEXTRACT_URL_BATCH_FETCH_CONCURRENCY', '8'))
+URL_BATCH_EXTRACT_CONCURRENCY = int(os.environ.get('LANGEXTRACT_URL_BATCH_EXTRACT_CONCURRENCY', '2'))
+
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize, unify line breaks, drop trailing spaces and extra blank lines."""
+    text = unicodedata.normalize('NFC', text.replace('\r\n', '\n').replace('\r', '\n'))
+    text = re.sub(r'[ \t]+\n', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+class StageStats:
+    """Items, time and throughput of one pipeline stage."""
+    
+    def __init__(self, unit: Optional[str] = None):
+        self.unit = unit
+        self.items = 0
+        self.failed = 0
+        self.units = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+    
+    def add(self, started: float, units: int = 0, failed: bool = False):
+        now = time.perf_counter()
+        self.first = started if self.first is None else min(self.first, started)
+        self.last = now
+        self.busy += now - started
+        if failed:
+            self.failed += 1
+        else:
+            self.items += 1
+            self.units += units
+    
+    def as_dict(self) -> Dict[str, Any]:
+        span = (self.last - self.first) if self.first is not None else 0.0
+        stats = {
+            'items': self.items,
+            'failed': self.failed,
+            'busy_ms': round(self.busy * 1000, 3),
+            'blocked_ms': round(self.blocked * 1000, 3),  # waiting for the next stage
+            'items_per_second': round(self.items / span, 3) if span else None
+        }
+        if self.unit:
+            stats[self.unit] = self.units
+            stats[f'{self.unit}_per_second'] = round(self.units / span, 1) if span else None
+        return stats
+
+
+class UrlBatch:
+    """
+    One extract_from_urls run. `entries` holds one dict per URL, in input
+    order, filled in as the URL moves through the stages.
+    """
+    
+    QUEUE_SIZE = 2  # documents waiting between two stages, per downstream worker
+    
+    def __init__(self, urls: List[str], extract: Dict[str, Any], fetch_concurrency: int,
+                 extract_concurrency: int, use_cache: bool = True, on_done=None):
+        self.entries = [{'url': url, 'success': False} for url in urls]
+        self.extract = extract
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.extract_concurrency = max(1, extract_concurrency)
+        self.use_cache = use_cache
+        self.on_done = on_done
+        self.stages = {
+            'fetch': StageStats('bytes'),
+            'normalize': StageStats('chars'),
+            'extract': StageStats('chars'),
+            'store': StageStats('extractions')
+        }
+        self.done = 0
+        self._urls = deque(enumerate(urls))
+        size = self.QUEUE_SIZE * self.extract_concurrency
+        self._fetched: asyncio.Queue = asyncio.Queue(size)
+        self._normalized: asyncio.Queue = asyncio.Queue(size)
+        self._extracted: asyncio.Queue = asyncio.Queue(size)
+    
+    async def run(self):
+        async def fetch_stage():
+            await asyncio.gather(*(self._fetch_worker() for _ in range(self.fetch_concurrency)))
+            await self._fetched.put(None)
+        
+        async def extract_stage():
+            await asyncio.gather(*(self._extract_worker() for _ in range(self.extract_concurrency)))
+            await self._extracted.put(None)
+        
+        await asyncio.gather(fetch_stage(), self._normalize_worker(), extract_stage(), self._store_worker())
+    
+    async def _put(self, queue: asyncio.Queue, item: Any, stage: StageStats):
+        started = time.perf_counter()
+        await queue.put(item)
+        stage.blocked += time.perf_counter() - started
+    
+    async def _fail(self, entry: Dict[str, Any], stage: str, error: Exception):
+        entry.update(stage=stage, error=str(error) or type(error).__name__)
+        await self._finish(entry)
+    
+    async def _finish(self, entry: Dict[str, Any]):
+        self.done += 1
+        if self.on_done is not None:
+            await self.on_done(self, entry)
+    
+    async def _fetch_worker(self):
+        stage = self.stages['fetch']
+        while self._urls:
+            index, url = self._urls.popleft()
+            entry = self.entries[index]
+            entry['fetch'] = info = {}
+            started = time.perf_counter()
+            try:
+                if not url.startswith(('http://', 'https://')):
+                    raise FetchError('Invalid URL')
+                text = await URL_FETCHER.fetch_text(url, info)
+            except Exception as e:
+                stage.add(started, failed=True)
+                await self._fail(entry, 'fetch', e)
+                continue
+            stage.add(started, info.get('bytes', 0))
+            await self._put(self._fetched, (entry, text), stage)
+    
+    async def _normalize_worker(self):
+        stage = self.stages['normalize']
+        while True:
+            item = await self._fetched.get()
+            if item is None:
+                break
+            entry, text = item
+            started = time.perf_counter()
+            try:
+                text = await asyncio.to_thread(normalize_text, text)
+                if not text:
+                    raise ValueError('No text found at URL')
+            except Exception as e:
+                stage.add(started, failed=True)
+                await self._fail(entry, 'normalize', e)
+                continue
+            stage.add(started, len(text))
+            await self._put(self._normalized, (entry, text), stage)
+        for _ in range(self.extract_concurrency):
+            await self._normalized.put(None)
+    
+    async def _extract_worker(self):
+        stage = self.stages['extract']
+        while True:
+            item = await self._normalized.get()
+            if item is None:
+                break
+            entry, text = item
+            started = time.perf_counter()
+            try:
+                result_id, result, cached = await self._extract(entry['url'], text)
+            except Exception as e:
+                stage.add(started, failed=True)
+                await self._fail(entry, 'extract', e)
+                continue
+            entry['cached'] = cached
+            stage.add(started, len(text))
+            await self._put(self._extracted, (entry, result_id, result), stage)
+    
+    async def _extract(self, url: str, text: str) -> tuple:
+        extract = self.extract
+        example_set = extract['example_set']
+        # Same key as extract_structured_data: an unchanged page reuses its result
+        cache_key = extraction_cache_key(
+            text, extract['prompt_description'], example_set.digest, extract['model_id'],
+            extract['extraction_passes'], extract['max_char_buffer']
+        )
+        result = await asyncio.to_thread(EXTRACTION_CACHE.get, cache_key) if self.use_cache else None
+        if result is not None:
+            return cache_key[:32], result, True
+        # Other requests may hold the executor; wait our turn rather than fail the URL
+        documents = await EXTRACTION_EXECUTOR.run_waiting(
+            run_lx_extract,
+            text_or_documents=[lx.data.Document(text=text, document_id=url)],
+            use_chunk_cache=self.use_cache,
+            **extract
+        )
+        result = await asyncio.to_thread(StoredResult.from_document, documents[0])
+        await asyncio.to_thread(EXTRACTION_CACHE.put, cache_key, result)
+        return cache_key[:32], result, False
+    
+    async def _store_worker(self):
+        stage = self.stages['store']
+        while True:
+            item = await self._extracted.get()
+            if item is None:
+                break
+            entry, result_id, result = item
+            started = time.perf_counter()
+            try:
+                await store_result(result_id, result)
+            except Exception as e:
+                stage.add(started, failed=True)
+                await self._fail(entry, 'store', e)
+                continue
+            stage.add(started, len(result.records))
+            entry.update(success=True, result_id=result_id, total_extractions=len(result.records))
+            await self._finish(entry)
+    
+    def stage_stats(self) -> Dict[str, Any]:
+        return {name: stage.as_dict() for name, stage in self.stages.items()}
+
+
+# ============================================================================
+# EXAMPLE REGISTRY
+# ============================================================================
+
+# Example sets are validated and converted to lx.data objects once, memoized
+# by content hash. Clients can register a set and pass its id afterwards
+# instead of resending the examples with every call.
+EXAMPLE_CACHE_MAX_SETS = int(os.environ.get('LANGEXTRACT_EXAMPLE_CACHE_MAX_SETS', '64'))
+
+
+def build_lx_examples(examples: List[Dict[str, Any]]) -> List[lx.data.ExampleData]:
+    """Validate example dicts and convert them to LangExtract ExampleData."""
+    lx_examples = []
+    for idx, ex in enumerate(examples):
+        if 'text' not in ex or 'extractions' not in ex:
+            raise ValueError(f'Example {idx} missing text or extractions')
+        
+        try:
+            extractions = []
+            for e in ex['extractions']:
+                if 'extraction_class' not in e or 'extraction_text' not in e:
+                    raise ValueError(f'Example {idx} extraction missing required fields')
+                
+                extractions.append(
+                    lx.data.Extraction(
+                        extraction_class=e['extraction_class'],
+                        extraction_text=e['extraction_text'],
+                        attributes=e.get('attributes', {})
+                    )
+                )
+            
+            lx_examples.append(lx.data.ExampleData(text=ex['text'], extractions=extractions))
+            
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f'Error parsing example {idx}: {str(e)}') from e
+    
+    return lx_examples
+
+
+class ExampleSet:
+    """A validated example set with its LangExtract conversion."""
+    
+    def __init__(self, digest: str, examples: List[Dict[str, Any]],
+                 lx_examples: List[lx.data.ExampleData]):
+        self.digest = digest
+        self.example_set_id = digest[:16]
+        self.examples = examples
+        self.lx_examples = lx_examples
+        self.name: Optional[str] = None
+        self.pinned = False
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'example_set_id': self.example_set_id,
+            'name': self.name,
+            'total_examples': len(self.lx_examples),
+            'total_extractions': sum(len(ex.extractions) for ex in self.lx_examples)
+        }
+
+
+class ExampleRegistry:
+    """
+    Content-addressed store of converted example sets.
+    
+    Sets seen inline are kept in an LRU of `max_sets` entries. Registered
+    sets are pinned and addressable by id for the life of the process.
+    """
+    
+    def __init__(self, max_sets: int):
+        self.max_sets = max(1, max_sets)
+        self._sets: "OrderedDict[str, ExampleSet]" = OrderedDict()  # digest -> set
+        self._ids: Dict[str, str] = {}  # example_set_id -> digest, registered sets only
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    @staticmethod
+    def digest(examples: List[Dict[str, Any]]) -> str:
+        payload = json.dumps(examples, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def resolve(self, examples: Union[str, List[Dict[str, Any]]]) -> ExampleSet:
+        """
+        Return the ExampleSet for inline examples or a registered id.
+        
+        Raises ValueError for invalid examples or an unknown id.
+        """
+        if isinstance(examples, str):
+            with self._lock:
+                digest = self._ids.get(examples)
+                if digest is None:
+                    raise ValueError(f'Unknown example set: {examples} (register it with register_examples)')
+                self._hits += 1
+                return self._sets[digest]
+        
+        digest = self.digest(examples)
+        with self._lock:
+            example_set = self._sets.get(digest)
+            if example_set is not None:
+                self._sets.move_to_end(digest)
+                self._hits += 1
+                return example_set
+            self._misses += 1
+        
+        lx_examples = build_lx_examples(examples)
+        # Same alignment check lx.extract runs on every call, once per set
+        lx.prompt_validation.handle_alignment_report(
+            lx.prompt_validation.validate_prompt_alignment(
+                examples=lx_examples, aligner=lx.resolver.WordAligner()
+            ),
+            level=lx.prompt_validation.PromptValidationLevel.WARNING
+        )
+        example_set = ExampleSet(digest, examples, lx_examples)
+        with self._lock:
+            example_set = self._sets.setdefault(digest, example_set)
+            self._evict()
+        return example_set
+    
+    def register(self, examples: List[Dict[str, Any]], name: Optional[str] = None) -> ExampleSet:
+        example_set = self.resolve(examples)
+        with self._lock:
+            example_set.pinned = True
+            example_set.name = name or example_set.name
+            self._sets[example_set.digest] = example_set
+            self._ids[example_set.example_set_id] = example_set.digest
+        return example_set
+    
+    def registered(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._sets[digest].summary() for digest in self._ids.values()]
+    
+    def _evict(self):
+        unpinned = [digest for digest, example_set in self._sets.items() if not example_set.pinned]
+        for digest in unpinned[:max(0, len(unpinned) - self.max_sets)]:
+            del self._sets[digest]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'cached_sets': len(self._sets),
+                'registered_sets': len(self._ids),
+                'max_sets': self.max_sets
+            }
+
+
+EXAMPLE_REGISTRY = ExampleRegistry(EXAMPLE_CACHE_MAX_SETS)
+
+
+@functools.lru_cache(maxsize=None)
+def research_example_set() -> "ExampleSet":
+    """
+    The built-in research examples, converted (and alignment-checked) on
+    first use rather than at import, so server startup stays quiet and fast.
+    Blocking.
+    """
+    return EXAMPLE_REGISTRY.register(RESEARCH_CONTEXT_EXAMPLES, name='research_context')
+
+
+# ============================================================================
+# TOOL RESPONSES
+# ============================================================================
+
+# Large responses are encoded once with orjson when it is installed; the
+# structured copy is handed to fastmcp as-is instead of being walked value
+# by value. Tools keep their Dict annotations, so output schemas don't change.
+try:
+    import orjson
+except ImportError:  # Optional; the json module is used instead
+    orjson = None
+
+EXTRACTION_FIELDS = ['extraction_class', 'extraction_text', 'attributes', 'char_start', 'char_end']
+
+
+def dumps_json(data: Any) -> str:
+    """Compact JSON text; values that aren't JSON types are written with str()."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def encoded_response(response: Dict[str, Any]) -> ToolResult:
+    """
+    Tool result for a response built only from JSON types (dicts with str
+    keys, lists, str, numbers, bool, None), skipping fastmcp's conversion.
+    
+    model_construct skips validation, so check the payload at least matches
+    the tools' declared Dict output schema.
+    """
+    if not isinstance(response, dict):
+        raise TypeError(f'Tool response must be a dict, not {type(response).__name__}')
+    return ToolResult.model_construct(
+        content=[TextContent(type='text', text=dumps_json(response))],
+        structured_content=response,
+        meta=None,
+        is_error=False
+    )
+
+
+def check_fields(fields: Optional[List[str]]) -> Optional[str]:
+    """Error message for unknown extraction fields, or None."""
+    unknown = [f for f in fields or [] if f not in EXTRACTION_FIELDS]
+    if unknown:
+        return f'Unknown fields: {unknown} (available: {EXTRACTION_FIELDS})'
+    return None
+
+
+def project_extractions(extractions: List[Dict[str, Any]],
+                        fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if not fields:
+        return extractions
+    return [{f: e[f] for f in fields if f in e} for e in extractions]
+
+
+def class_statistics(extractions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    counts = {}
+    for e in extractions:
+        counts[e['extraction_class']] = counts.get(e['extraction_class'], 0) + 1
+    return {'classes': list(counts), 'count_per_class': counts}
+
+
+def shape_extraction_response(response: Dict[str, Any], summary_only: bool = False,
+                              fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Apply summary_only / fields to an extraction tool's response.
+    
+    summary_only replaces `extractions` with per-class counts; fields keeps
+    only those keys of each extraction.
+    """
+    if not response.get('success') or 'extractions' not in response:
+        return response
+    response = dict(response)
+    if summary_only:
+        response['statistics'] = class_statistics(response.pop('extractions'))
+    elif fields:
+        response['extractions'] = project_extractions(response['extractions'], fields)
+    return response
+
+
+# ============================================================================
+# RESEARCH EXPORT
+# ============================================================================
+
+# Columns of the research context schema, in file order. Every column but
+# `id` comes from the extraction attribute of the same name.
+RESEARCH_COLUMNS = [
+    'id', 'category', 'subcategory', 'element_name', 'relationship_type', 'relationship_target',
+    'attribute_key', 'attribute_value', 'evidence_type', 'confidence_level', 'temporal_marker',
+    'impact_score', 'citation_key', 'citation_url', 'citation_authors', 'citation_year',
+    'citation_type', 'resource_name', 'resource_url', 'resource_type', 'domain_hierarchy',
+    'domain_level', 'parent_domain', 'child_domains', 'cross_domain_refs', 'constraint_type',
+    'constraint_source', 'constraint_enforcement', 'constraint_dependencies', 'source_context',
+    'related_to', 'notes'
+]
+
+EXPORT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Rows per batch when a research export is streamed to disk
+EXPORT_STREAM_BATCH_ROWS = 10000
+
+
+def element_id_index(records: ExtractionRecords) -> Dict[Any, int]:
+    """element_name -> row id (1-based); a repeated name maps to its last row."""
+    index = {}
+    for idx, attrs in enumerate(records.attributes, start=1):
+        index[(attrs or {}).get('element_name', f"element_{idx}")] = idx
+    return index
+
+
+def research_columns(records: ExtractionRecords, start: int, stop: int,
+                     id_index: Dict[Any, int]) -> Dict[str, list]:
+    """
+    Research schema columns for rows start:stop of `records` (ids start at
+    start + 1). `related_to` names are resolved to ids through `id_index`
+    and appended to `relationship_target`.
+    """
+    attrs = [a or {} for a in records.attributes[start:stop]]
+    ids = range(start + 1, start + 1 + len(attrs))
+    columns = {'id': list(ids)}
+    for name in RESEARCH_COLUMNS[1:]:
+        columns[name] = [a.get(name, '') for a in attrs]
+    columns['element_name'] = [a.get('element_name', f"element_{i}") for a, i in zip(attrs, ids)]
+    columns['source_context'] = [
+        a.get('source_context', text) for a, text in zip(attrs, records.texts[start:stop])
+    ]
+    
+    targets = columns['relationship_target']
+    for row, related in enumerate(columns['related_to']):
+        if not related:
+            continue
+        names = related if isinstance(related, list) else str(related).split(',')
+        related_ids = [str(id_index[n]) for n in (str(n).strip() for n in names) if n in id_index]
+        if related_ids:
+            joined = ','.join(related_ids)
+            targets[row] = f"{targets[row]},{joined}" if targets[row] else joined
+    return columns
+
+
+class ResearchExportStats:
+    """Validation counts accumulated over the batches of one export."""
+    
+    def __init__(self):
+        self.total = 0
+        self.with_source_context = 0
+        self.with_relationships = 0
+        self.with_citations = 0
+        self.categories: Dict[str, int] = {}
+    
+    def add(self, columns: Dict[str, list]):
+        self.total += len(columns['id'])
+        self.with_source_context += sum(1 for v in columns['source_context'] if isinstance(v, str) and v)
+        self.with_relationships += sum(1 for v in columns['relationship_target'] if isinstance(v, str) and v)
+        self.with_citations += sum(1 for v in columns['citation_key'] if isinstance(v, str) and v)
+        for category in columns['category']:
+            category = str(category)
+            self.categories[category] = self.categories.get(category, 0) + 1
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total_extractions': self.total,
+            'with_source_context': self.with_source_context,
+            'with_relationships': self.with_relationships,
+            'with_citations': self.with_citations,
+            'categories_covered': len(self.categories),
+            'category_breakdown': dict(sorted(self.categories.items(), key=lambda item: -item[1]))
+        }
+
+
+def _arrow_table(columns: Dict[str, list]):
+    import pyarrow as pa
+    
+    # Attributes may hold numbers or lists; columnar files store them as text
+    schema = pa.schema([('id', pa.int64())] + [(name, pa.string()) for name in RESEARCH_COLUMNS[1:]])
+    data = {'id': columns['id']}
+    for name in RESEARCH_COLUMNS[1:]:
+        data[name] = [v if isinstance(v, str) else '' if v is None else str(v) for v in columns[name]]
+    return pa.Table.from_pydict(data, schema=schema)
+
+
+def write_research_export(records: ExtractionRecords, output_path: Path, fmt: str,
+                          stream: bool = False) -> Dict[str, Any]:
+    """
+    Write the research schema as CSV, Parquet or Arrow IPC and return stats.
+    
+    With `stream`, rows are built and written EXPORT_STREAM_BATCH_ROWS at a
+    time, so only one batch of columns is held in memory. Blocking.
+    """
+    id_index = element_id_index(records)
+    batch_rows = EXPORT_STREAM_BATCH_ROWS if stream else max(1, len(records))
+    stats = ResearchExportStats()
+    
+    def batches():
+        for start in range(0, len(records), batch_rows):
+            columns = research_columns(records, start, start + batch_rows, id_index)
+            stats.add(columns)
+            yield columns
+    
+    if fmt == 'csv':
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(RESEARCH_COLUMNS)
+            for columns in batches():
+                writer.writerows(zip(*(columns[name] for name in RESEARCH_COLUMNS)))
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        writer = None
+        try:
+            for columns in batches():
+                table = _arrow_table(columns)
+                if writer is None:
+                    writer = (pq.ParquetWriter(output_path, table.schema) if fmt == 'parquet'
+                              else pa.ipc.new_file(str(output_path), table.schema))
+                writer.write_table(table)
+            if writer is None:  # No extractions: still write the schema
+                table = _arrow_table({name: [] for name in RESEARCH_COLUMNS})
+                writer = (pq.ParquetWriter(output_path, table.schema) if fmt == 'parquet'
+                          else pa.ipc.new_file(str(output_path), table.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    
+    return stats.as_dict()
+
+
+# ============================================================================
+# VISUALIZATION
+# ============================================================================
+
+# Documents longer than this are visualized one window of text at a time, so
+# a single page stays small enough for a browser to open (0 = never split)
+VISUALIZATION_WINDOW_CHARS = int(os.environ.get('LANGEXTRACT_VISUALIZATION_WINDOW_CHARS', '200000'))
+VISUALIZATION_CACHE_MAX_MB = float(os.environ.get('LANGEXTRACT_VISUALIZATION_CACHE_MAX_MB', '64'))
+
+
+def visualization_windows(text_length: int, window_chars: int) -> int:
+    if window_chars <= 0:
+        return 1
+    return max(1, -(-text_length // window_chars))
+
+
+def window_rows(records: ExtractionRecords, text_length: int, window: int, window_chars: int) -> tuple:
+    """
+    (start, stop, rows) of one window: the extractions starting in
+    [window * window_chars, (window + 1) * window_chars), with the text
+    running on to the end of the last of them, so an extraction crossing
+    the boundary is shown whole and only once.
+    """
+    start = window * window_chars
+    rows = records.index().start_rows(start, start + window_chars)
+    stop = max([min(start + window_chars, text_length)] + [records.ends[row] for row in rows])
+    return start, stop, rows
+
+
+def render_visualization(document: lx.data.AnnotatedDocument) -> str:
+    """langextract's HTML for an in-memory document (no JSONL round trip)."""
+    html = lx.visualize(document)
+    return html.data if hasattr(html, 'data') else html
+
+
+# Rendered pages keyed by the content they show (text and records digests,
+# plus the window), so a result id stored again with new content never
+# serves the old page.
+VISUALIZATION_CACHE = ChunkCache(int(VISUALIZATION_CACHE_MAX_MB * 1024 * 1024), 0)
+
+
+# ============================================================================
+# JSONL SINK
+# ============================================================================
+
+try:
+    import zstandard
+except ImportError:  # Optional; only needed for .zst files
+    zstandard = None
+
+# If set, every stored result is also appended to this JSONL file (.gz or
+# .zst for compression) as soon as its extraction completes
+JSONL_SINK_PATH = os.environ.get('LANGEXTRACT_JSONL_SINK')
+
+JSONL_COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+class JsonlSink:
+    """
+    Results appended to one JSONL file, with an offset index beside it.
+    
+    Each result is one line in langextract's AnnotatedDocument layout plus
+    its `result_id`. A compressed file holds one gzip member or zstd frame
+    per line, which is still one valid stream for zcat/zstdcat but lets a
+    single result be read back by seeking to it. `<file>.idx` has one JSON
+    line per result (result_id, offset, length, document_id, extractions).
+    
+    A result already in the file is not appended again. Lines found past
+    the index when the file is opened (from other writers, or a file with
+    no index) are indexed; only an append cut off by a crash is dropped.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + '.idx')
+        self.compression = JSONL_COMPRESSIONS.get(self.path.suffix)
+        if self.compression == 'zstd' and zstandard is None:
+            raise ValueError('.zst output needs the zstandard package (pip install zstandard)')
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._end = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._failed = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+    
+    def _load_index(self):
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if not size:
+            self.index_path.unlink(missing_ok=True)
+            return
+        if self.index_path.exists():
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                entry = json.loads(line)
+                if entry['offset'] + entry['length'] <= size:
+                    self._entries[entry['result_id']] = entry
+                    self._end = max(self._end, entry['offset'] + entry['length'])
+            # Drop the index line an interrupted append left behind
+            if len(complete) < len(data):
+                with open(self.index_path, 'r+b') as f:
+                    f.truncate(len(complete))
+        if self._end < size:
+            self._index_tail()
+    
+    def _frames(self, data: bytes) -> tuple:
+        """
+        Split `data` into lines (gzip members / zstd frames when compressed).
+        
+        Returns ([(offset, length, line)], end of the last complete one).
+        """
+        frames, position = [], 0
+        if not self.compression:
+            while True:
+                newline = data.find(b'\n', position)
+                if newline == -1:
+                    return frames, position
+                frames.append((position, newline + 1 - position, data[position:newline + 1]))
+                position = newline + 1
+        while position < len(data):
+            if self.compression == 'gzip':
+                decompressor = zlib.decompressobj(31)
+            else:
+                decompressor = zstandard.ZstdDecompressor().decompressobj()
+            try:
+                line = decompressor.decompress(data[position:])
+            except Exception as e:
+                raise ValueError(f'{self.path}: unreadable data at offset {self._end + position}: {e}')
+            if not decompressor.eof:
+                break
+            length = len(data) - position - len(decompressor.unused_data)
+            frames.append((position, length, line))
+            position += length
+        return frames, position
+    
+    def _index_tail(self):
+        """
+        Index lines past the indexed end of the file: a file written without
+        an index (e.g. by langextract) or lines appended by another writer.
+        
+        Only a final line that is provably cut off (no newline and not valid
+        JSON, or an unfinished gzip member / zstd frame) is dropped, as that
+        is what an interrupted append leaves; anything else unreadable
+        refuses the file rather than deleting data.
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(self._end)
+            tail = f.read()
+        frames, complete = self._frames(tail)
+        if not self.compression and complete < len(tail):
+            try:
+                json.loads(tail[complete:])
+            except ValueError:
+                pass
+            else:  # a whole last line missing its newline
+                with open(self.path, 'ab') as f:
+                    f.write(b'\n')
+                tail += b'\n'
+                frames.append((complete, len(tail) - complete, tail[complete:]))
+                complete = len(tail)
+        entries: Dict[str, Dict[str, Any]] = {}
+        for offset, length, line in frames:
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                raise ValueError(f'{self.path}: line at offset {self._end + offset} is not JSON')
+            result_id = data.get('result_id') or data.get('document_id') or str(len(self._entries) + len(entries))
+            if result_id not in self._entries and result_id not in entries:
+                entries[result_id] = self._entry(
+                    result_id, data.get('document_id'), len(data.get('extractions') or []),
+                    self._end + offset, length
+                )
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry) + '\n')
+                self._entries[entry['result_id']] = entry
+        self._end += complete
+        if complete < len(tail):
+            with open(self.path, 'r+b') as f:
+                f.truncate(self._end)
+    
+    @staticmethod
+    def _entry(result_id: str, document_id: Optional[str], extractions: int, offset: int, length: int):
+        return {
+            'result_id': result_id, 'offset': offset, 'length': length,
+            'document_id': document_id, 'extractions': extractions
+        }
+    
+    def _encode(self, result_id: str, result: StoredResult) -> bytes:
+        line = dumps_json({
+            'extractions': result.records.to_lx_dicts(),
+            'text': result.text,
+            'document_id': result.document_id,
+            'result_id': result_id
+        }).encode('utf-8') + b'\n'
+        if self.compression == 'gzip':
+            return gzip.compress(line, compresslevel=6, mtime=0)
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(line)
+        return line
+    
+    def _decode(self, data: bytes) -> Dict[str, Any]:
+        if self.compression == 'gzip':
+            data = gzip.decompress(data)
+        elif self.compression == 'zstd':
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return json.loads(data)
+    
+    def __contains__(self, result_id: str) -> bool:
+        return result_id in self._entries
+    
+    def append(self, result_id: str, result: StoredResult) -> bool:
+        """Append one result; False if it is already in the file. Blocking."""
+        if result_id in self._entries:
+            return False
+        data = self._encode(result_id, result)  # Encoded outside the lock
+        with self._lock:
+            if result_id in self._entries:
+                return False
+            with open(self.path, 'ab') as f:
+                f.write(data)
+            entry = self._entry(result_id, result.document_id, len(result.records), self._end, len(data))
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._entries[result_id] = entry
+            self._end += len(data)
+        return True
+    
+    def submit(self, result_id: str, result: StoredResult):
+        """Queue an append on the sink's writer thread (returns immediately)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lx-jsonl')
+            self._pending += 1
+        self._executor.submit(self._append_queued, result_id, result)
+    
+    def _append_queued(self, result_id: str, result: StoredResult):
+        try:
+            self.append(result_id, result)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            print(f"JSONL sink append failed for {result_id}: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    def flush(self):
+        """Block until every queued append is written."""
+        if self._executor is not None:
+            self._executor.submit(lambda: None).result()
+    
+    def read(self, result_id: str) -> StoredResult:
+        """One result, read by seeking to its line. Blocking."""
+        entry = self._entries.get(result_id)
+        if entry is None:
+            raise KeyError(result_id)
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            data = f.read(entry['length'])
+        return StoredResult.from_dict(self._decode(data))
+    
+    def clear(self):
+        """Empty the file and its index."""
+        with self._lock:
+            self.path.write_bytes(b'')
+            self.index_path.unlink(missing_ok=True)
+            self._entries.clear()
+            self._end = 0
+    
+    def entries(self) -> List[Dict[str, Any]]:
+        return [dict(entry) for entry in self._entries.values()]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'file_path': str(self.path.absolute()),
+                'compression': self.compression,
+                'results': len(self._entries),
+                'file_mb': round(self._end / (1024 * 1024), 3),
+                'pending_results': self._pending,
+                'failed_results': self._failed
+            }
+
+
+_JSONL_SINKS: Dict[Path, JsonlSink] = {}
+_JSONL_SINKS_LOCK = threading.Lock()
+
+
+def jsonl_sink(path: Union[str, Path]) -> JsonlSink:
+    """The sink of a file; one per path, so the tools and the automatic sink share it."""
+    key = Path(path).resolve()
+    with _JSONL_SINKS_LOCK:
+        sink = _JSONL_SINKS.get(key)
+        if sink is None:
+            sink = _JSONL_SINKS[key] = JsonlSink(key)
+        return sink
+
+
+def create_jsonl_sink() -> Optional[JsonlSink]:
+    """The LANGEXTRACT_JSONL_SINK sink, or None (with the reason on stderr) if unset or unusable."""
+    if not JSONL_SINK_PATH:
+        return None
+    try:
+        return jsonl_sink(JSONL_SINK_PATH)
+    except (ValueError, OSError) as e:
+        print(f"LANGEXTRACT_JSONL_SINK disabled: {e}", file=sys.stderr)
+        return None
+
+
+JSONL_SINK = create_jsonl_sink()
+
+
+# ============================================================================
+# CORE EXTRACTION TOOLS
+# ============================================================================
+
+async def run_structured_extraction(
+    ctx: Context,
+    text: str,
+    prompt_description: str,
+    examples: Union[str, List[Dict[str, Any]]],
+    model_id: str,
+    extraction_passes: int,
+    max_workers: int,
+    max_char_buffer: int,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    stream_chunks: bool = False,
+    debug: bool = False,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1,
+    monitor: Optional[ExtractionMonitor] = None,
+    tool_name: str = 'extract_structured_data'
+) -> Dict[str, Any]:
+    """
+    Shared implementation of extract_structured_data.
+    
+    `monitor` lets background jobs observe progress and cancel the run.
+    Phase timings go to SERVER_METRICS under `tool_name`.
+    """
+    
+    timer = request_timer(debug)
+    try:
+        await ctx.info(f"🔍 Starting extraction with {model_id}")
+        
+        # Validate inputs
+        if not text or not text.strip():
+            return {'success': False, 'error': 'Text cannot be empty'}
+        
+        if not prompt_description or not prompt_description.strip():
+            return {'success': False, 'error': 'Prompt description required'}
+        
+        if not examples or len(examples) == 0:
+            return {
+                'success': False, 
+                'error': 'At least one example required',
+                'hint': 'Use create_example_template or get_research_examples for examples'
+            }
+        
+        # Convert examples to LangExtract format (memoized by content)
+        try:
+            with timer.phase('examples'):
+                example_set = EXAMPLE_REGISTRY.resolve(examples)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        
+        await ctx.info(f"✅ Parsed {len(example_set.lx_examples)} examples")
+        
+        # Identical requests share a result_id and reuse the cached result
+        with timer.phase('hashing'):
+            cache_key = extraction_cache_key(
+                text, prompt_description, example_set.digest, model_id, extraction_passes, max_char_buffer,
+                min_pass_yield=min_pass_yield if adaptive_passes and extraction_passes > 1 else None
+            )
+        result_id = cache_key[:32]
+        with timer.phase('cache_lookup'):
+            result = await asyncio.to_thread(EXTRACTION_CACHE.get, cache_key) if use_cache else None
+        cache_hit = result is not None
+        
+        if cache_hit:
+            await ctx.info(f"♻️ Cache hit, reusing result {result_id}")
+        else:
+            # Get API key
+            final_api_key = api_key or os.environ.get('LANGEXTRACT_API_KEY')
+            if not final_api_key:
+                return {
+                    'success': False, 
+                    'error': 'LANGEXTRACT_API_KEY not set',
+                    'hint': 'Set environment variable or pass api_key parameter'
+                }
+            
+            await ctx.info("🚀 Calling LangExtract API...")
+            
+            # Run extraction off the event loop, reporting chunks as they finish
+            monitor = monitor or ExtractionMonitor()
+            reporter = ProgressReporter(ctx, monitor, stream_chunks=stream_chunks)
+            with timer.phase('extraction'):  # includes waiting for an executor slot
+                document = await EXTRACTION_EXECUTOR.run(
+                    run_lx_extract,
+                    text_or_documents=text,
+                    prompt_description=prompt_description,
+                    example_set=example_set,
+                    model_id=model_id,
+                    api_key=final_api_key,
+                    extraction_passes=extraction_passes,
+                    max_workers=max_workers,
+                    max_char_buffer=max_char_buffer,
+                    monitor=monitor,
+                    use_chunk_cache=use_cache,
+                    timer=timer,
+                    adaptive_passes=adaptive_passes,
+                    min_pass_yield=min_pass_yield
+                )
+            await reporter.flush()
+            # Converted once; the cache, the store and every tool serve the records
+            with timer.phase('convert'):
+                result = await asyncio.to_thread(StoredResult.from_document, document)
+            with timer.phase('cache_store'):
+                await asyncio.to_thread(EXTRACTION_CACHE.put, cache_key, result)
+            chunk_cache = monitor.chunk_cache_summary()
+            if chunk_cache['chunks_reused']:
+                await ctx.info(
+                    f"♻️ Reused {chunk_cache['chunks_reused']}/{chunk_cache['chunk_outputs']} chunk outputs"
+                )
+            passes = monitor.pass_summary()
+            if passes['chunk_calls_saved']:
+                await ctx.info(
+                    f"⏭️ Adaptive passes skipped {passes['chunk_calls_saved']}/"
+                    f"{passes['fixed_pass_chunk_calls']} chunk calls"
+                )
+        
+        with timer.phase('convert'):
+            extractions_list = result.records.records()
+        
+        # Store result
+        with timer.phase('store'):
+            await store_result(result_id, result)
+        
+        await ctx.info(f"✨ Found {len(extractions_list)} entities")
+        
+        SERVER_METRICS.observe(tool_name, timer)
+        response = {
+            'success': True,
+            'result_id': result_id,
+            'total_extractions': len(extractions_list),
+            'extractions': extractions_list,
+            'metadata': {
+                'model_id': model_id,
+                'extraction_passes': extraction_passes,
+                'text_length': len(text),
+                'cache_hit': cache_hit,
+                'chunk_cache': None if cache_hit else chunk_cache,
+                'passes': None if cache_hit else passes
+            }
+        }
+        if debug:
+            response['metadata']['timings'] = timer.as_dict()
+        return response
+        
+    except Exception as e:
+        SERVER_METRICS.observe(tool_name, timer, success=False)
+        await ctx.error(f"Extraction failed: {str(e)}")
+        return {'success': False, 'error': str(e), 'error_type': type(e).__name__}
+
+
+@mcp.tool
+async def extract_structured_data(
+    ctx: Context,
+    text: str,
+    prompt_description: str,
+    examples: Union[str, List[Dict[str, Any]]],
+    model_id: str = "gemini-2.5-flash",
+    extraction_passes: int = 1,
+    max_workers: int = 10,
+    max_char_buffer: int = 8000,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    stream_chunks: bool = False,
+    debug: bool = False,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1,
+    summary_only: bool = False,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Extract structured information from text using LangExtract.
+    
+    Args:
+        text: The input text to extract from
+        prompt_description: Clear instructions for what to extract
+        examples: List of example extractions (few-shot learning), or an
+            example_set_id returned by register_examples
+        model_id: Model to use (gemini-2.5-flash recommended)
+        extraction_passes: Number of passes (1-5, more = higher recall)
+        max_workers: Parallel workers (1-50, more = faster)
+        max_char_buffer: Chunk size (1000-10000, smaller = more accurate)
+        api_key: Optional API key (defaults to LANGEXTRACT_API_KEY env var)
+        use_cache: Reuse the result of an identical earlier request, or the
+            model outputs of unchanged chunks of an edited one (False forces
+            a fresh extraction, which then replaces the cached result)
+        stream_chunks: Also send each chunk's extractions as a
+            "langextract.chunks" log message as soon as the chunk finishes
+        debug: Add per-phase timings and model-call counts to `metadata`
+        adaptive_passes: Give a chunk another pass only while its last pass
+            added at least `min_pass_yield` new, non-overlapping extractions
+        min_pass_yield: New extractions a pass must add to a chunk for it to
+            get the next pass (adaptive_passes only)
+        summary_only: Return per-class counts instead of the extractions
+            (page through them later with get_extraction_details)
+        fields: Keep only these keys of each extraction (extraction_class,
+            extraction_text, attributes, char_start, char_end)
+    
+    A progress notification is sent as each chunk finishes. `metadata.passes`
+    reports the passes run per chunk.
+    
+    Example format:
+    {
+        "text": "Dr. Smith prescribed 50mg aspirin.",
+        "extractions": [{
+            "extraction_class": "medication",
+            "extraction_text": "aspirin",
+            "attributes": {"dosage": "50mg"}
+        }]
+    }
+    """
+    
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    
+    response = await run_structured_extraction(
+        ctx=ctx,
+        text=text,
+        prompt_description=prompt_description,
+        examples=examples,
+        model_id=model_id,
+        extraction_passes=extraction_passes,
+        max_workers=max_workers,
+        max_char_buffer=max_char_buffer,
+        api_key=api_key,
+        use_cache=use_cache,
+        stream_chunks=stream_chunks,
+        debug=debug,
+        adaptive_passes=adaptive_passes,
+        min_pass_yield=min_pass_yield
+    )
+    return encoded_response(shape_extraction_response(response, summary_only, fields))
+
+
+async def run_research_extraction(
+    ctx: Context,
+    text: str,
+    model_id: str,
+    extraction_passes: int,
+    max_workers: int,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    stream_chunks: bool = False,
+    debug: bool = False,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1,
+    monitor: Optional[ExtractionMonitor] = None
+) -> Dict[str, Any]:
+    """Shared implementation of extract_research_context."""
+    
+    await ctx.info("🔬 Starting comprehensive research context extraction...")
+    await ctx.info(f"📝 Text length: {len(text)} characters")
+    await ctx.info(f"🎯 Using {len(RESEARCH_CONTEXT_EXAMPLES)} specialized examples")
+    
+    # Call the main extraction function
+    result = await run_structured_extraction(
+        ctx=ctx,
+        text=text,
+        prompt_description=RESEARCH_CONTEXT_PROMPT,
+        examples=(await asyncio.to_thread(research_example_set)).example_set_id,
+        model_id=model_id,
+        extraction_passes=extraction_passes,
+        max_workers=max_workers,
+        max_char_buffer=10000,  # Large buffer to preserve context
+        api_key=api_key,
+        use_cache=use_cache,
+        stream_chunks=stream_chunks,
+        debug=debug,
+        adaptive_passes=adaptive_passes,
+        min_pass_yield=min_pass_yield,
+        monitor=monitor,
+        tool_name='extract_research_context'
+    )
+    
+    if result.get('success'):
+        await ctx.info("✅ Research context extraction complete")
+        await ctx.info(f"📊 Total extractions: {result['total_extractions']}")
+        
+        # Count by category
+        categories = {}
+        for ext in result['extractions']:
+            cat = ext.get('attributes', {}).get('category', 'Unknown')
+            categories[cat] = categories.get(cat, 0) + 1
+        
+        await ctx.info(f"📁 Categories found: {list(categories.keys())}")
+        result['category_breakdown'] = categories
+    
+    return result
+
+
+@mcp.tool
+async def extract_research_context(
+    ctx: Context,
+    text: str,
+    model_id: str = "gemini-2.5-pro",
+    extraction_passes: int = 5,
+    max_workers: int = 30,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    stream_chunks: bool = False,
+    debug: bool = False,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1,
+    summary_only: bool = False,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Extract comprehensive research context with full preservation of nuances and relationships.
+    
+    This is a specialized tool for research papers/documentation that:
+    - Extracts all 10 categories (domains, methods, constraints, citations, etc.)
+    - Preserves source context and relationships
+    - Surfaces implicit assumptions
+    - Maintains semantic connections
+    
+    Args:
+        text: Research text to extract from
+        model_id: Model to use (gemini-2.5-pro recommended for accuracy)
+        extraction_passes: Number of passes (5 recommended)
+        max_workers: Parallel workers (30 recommended)
+        api_key: Optional API key
+        use_cache: Reuse the result of an identical earlier request, or the
+            outputs of unchanged chunks
+        stream_chunks: Also send each chunk's extractions as a
+            "langextract.chunks" log message as soon as the chunk finishes
+        debug: Add per-phase timings and model-call counts to `metadata`
+        adaptive_passes: Stop re-extracting a chunk once a pass adds fewer
+            than `min_pass_yield` new, non-overlapping extractions to it
+        min_pass_yield: New extractions a pass must add to a chunk for it to
+            get the next pass (adaptive_passes only)
+        summary_only: Return per-class counts instead of the extractions
+            (page through them later with get_extraction_details)
+        fields: Keep only these keys of each extraction (extraction_class,
+            extraction_text, attributes, char_start, char_end)
+    """
+    
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    
+    response = await run_research_extraction(
+        ctx=ctx,
+        text=text,
+        model_id=model_id,
+        extraction_passes=extraction_passes,
+        max_workers=max_workers,
+        api_key=api_key,
+        use_cache=use_cache,
+        stream_chunks=stream_chunks,
+        debug=debug,
+        adaptive_passes=adaptive_passes,
+        min_pass_yield=min_pass_yield
+    )
+    return encoded_response(shape_extraction_response(response, summary_only, fields))
+
+
+@mcp.tool
+async def export_to_research_csv(
+    ctx: Context,
+    result_id: str,
+    output_name: str = "research_context.csv",
+    format: str = "csv",
+    stream: bool = False,
+    deduplicate: bool = False
+) -> Dict[str, Any]:
+    """
+    Export extractions to 30-column research context CSV schema.
+    
+    This converts LangExtract results to the comprehensive research CSV format with:
+    - All 30 columns (id, category, subcategory, element_name, etc.)
+    - Source context preservation
+    - Relationship linking (converts names to IDs)
+    - Full bibliographic information
+    - Constraint metadata
+    
+    Args:
+        result_id: The extraction result ID
+        output_name: Output filename (a .csv suffix follows the chosen format)
+        format: "csv", "parquet" or "arrow" (Arrow IPC file); the columnar formats need pyarrow
+        stream: Build and write rows in batches instead of all at once (for very large results)
+        deduplicate: Merge overlapping duplicate extractions first (see
+            deduplicate_extractions, with its default policy)
+    """
+    
+    try:
+        if format not in EXPORT_FORMATS:
+            return {
+                'success': False,
+                'error': f'Unknown format: {format}',
+                'available_formats': list(EXPORT_FORMATS)
+            }
+        if format != 'csv':
+            try:
+                import pyarrow  # noqa: F401
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                return {
+                    'success': False,
+                    'error': f'{format} export requires pyarrow',
+                    'hint': 'pip install pyarrow'
+                }
+        
+        result = await load_result(result_id)
+        if result is None:
+            return {
+                'success': False, 
+                'error': f'Result not found: {result_id}',
+                'available_ids': list(RESULTS_STORE.keys())
+            }
+        
+        await ctx.info(f"📊 Converting {len(result.records)} extractions to {format}...")
+        
+        output_dir = Path("output")
+        output_dir.mkdir(exist_ok=True)
+        output_path = output_dir / output_name
+        if output_path.suffix == '.csv':
+            output_path = output_path.with_suffix(EXPORT_FORMATS[format])
+        
+        records, dedup_stats = result.records, None
+        if deduplicate:
+            records, dedup_stats = await asyncio.to_thread(merge_overlapping_extractions, records)
+            await ctx.info(f"🧹 Merged {dedup_stats['removed']} duplicate extractions")
+        
+        stats = await asyncio.to_thread(
+            write_research_export, records, output_path, format, stream
+        )
+        
+        await ctx.info(f"✅ Saved to {output_path}")
+        
+        share = stats['with_source_context'] / stats['total_extractions'] * 100 if stats['total_extractions'] else 0.0
+        await ctx.info(f"📊 Context preserved: {stats['with_source_context']} ({share:.1f}%)")
+        await ctx.info(f"🔗 Relationships linked: {stats['with_relationships']}")
+        
+        response = {
+            'success': True,
+            'file_path': str(output_path.absolute()),
+            'format': format,
+            'statistics': stats
+        }
+        if dedup_stats is not None:
+            response['deduplication'] = dedup_stats
+        return response
+        
     except Exception as e:
         await ctx.error(f"CSV export failed: {str(e)}")
         return {'success': False, 'error': str(e)}
@@ -670,6 +5231,7 @@ async def get_research_examples(ctx: Context) -> Dict[str, Any]:
     
     return {
         'total_examples': len(RESEARCH_CONTEXT_EXAMPLES),
+        'example_set_id': (await asyncio.to_thread(research_example_set)).example_set_id,
         'examples': RESEARCH_CONTEXT_EXAMPLES,
         'categories_covered': [
             'CITATIONS_AND_REFERENCES',
@@ -681,7 +5243,8 @@ async def get_research_examples(ctx: Context) -> Dict[str, Any]:
             'PROBLEM_DEFINITION',
             'REQUIREMENTS'
         ],
-        'usage': 'Use these examples with extract_research_context or extract_structured_data'
+        'usage': 'Use these examples with extract_research_context, or pass example_set_id '
+                 'as examples to extract_structured_data'
     }
 
 
@@ -690,129 +5253,654 @@ async def extract_from_url(
     ctx: Context,
     url: str,
     prompt_description: str,
-    examples: List[Dict[str, Any]],
+    examples: Union[str, List[Dict[str, Any]]],
     model_id: str = "gemini-2.5-flash",
     extraction_passes: int = 2,
-    max_workers: int = 20
+    max_workers: int = 20,
+    debug: bool = False,
+    summary_only: bool = False,
+    fields: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Extract structured information directly from a URL.
     
+    The server fetches the page (HTML is reduced to text) through a pooled
+    HTTP client and a conditional-request cache, and extraction starts on
+    the first windows while the rest downloads. `fetch` in the response
+    says whether the cache was used.
+    
     Args:
         url: URL to fetch and extract from
         prompt_description: Extraction instructions
-        examples: Few-shot examples
+        examples: Few-shot examples, or an example_set_id from register_examples
         model_id: Model to use
         extraction_passes: Number of passes (default 2 for URLs)
         max_workers: Parallel workers (default 20)
+        debug: Add per-phase timings and model-call counts to `metadata`
+        summary_only: Return per-class counts instead of the extractions
+            (page through them later with get_extraction_details)
+        fields: Keep only these keys of each extraction (extraction_class,
+            extraction_text, attributes, char_start, char_end)
     """
     
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    
+    timer = request_timer(debug)
     try:
         await ctx.info(f"🌐 Fetching: {url}")
         
         if not url.startswith(('http://', 'https://')):
-            return {'success': False, 'error': 'Invalid URL'}
-        
-        # Convert examples
-        lx_examples = []
-        for ex in examples:
-            extractions = [
-                lx.data.Extraction(
-                    extraction_class=e['extraction_class'],
-                    extraction_text=e['extraction_text'],
-                    attributes=e.get('attributes', {})
-                )
-                for e in ex.get('extractions', [])
-            ]
-            lx_examples.append(lx.data.ExampleData(text=ex['text'], extractions=extractions))
+            return encoded_response({'success': False, 'error': 'Invalid URL'})
+        
+        # Convert examples (memoized by content)
+        try:
+            with timer.phase('examples'):
+                example_set = EXAMPLE_REGISTRY.resolve(examples)
+        except ValueError as e:
+            return encoded_response({'success': False, 'error': str(e)})
         
         # Get API key
         api_key = os.environ.get('LANGEXTRACT_API_KEY')
         if not api_key:
-            return {'success': False, 'error': 'LANGEXTRACT_API_KEY not set'}
+            return encoded_response({'success': False, 'error': 'LANGEXTRACT_API_KEY not set'})
         
         await ctx.info(f"🚀 Processing URL with {extraction_passes} passes...")
         
-        # Extract from URL
-        result = lx.extract(
-            text_or_documents=url,
-            prompt_description=prompt_description,
-            examples=lx_examples,
-            model_id=model_id,
-            api_key=api_key,
-            extraction_passes=extraction_passes,
-            max_workers=max_workers
-        )
+        # Fetch and extract concurrently: windows of about one chunk per
+        # worker go to the extraction thread as they are downloaded
+        max_char_buffer = 1000  # lx.extract default
+        fetch = {'url': url}
+        pipe = TextPipe()
+        feeder = asyncio.create_task(pipe.feed(URL_FETCHER.stream(url, fetch), max_char_buffer * max(1, max_workers)))
+        monitor = ExtractionMonitor()
+        reporter = ProgressReporter(ctx, monitor)
+        try:
+            with timer.phase('extraction'):
+                result, _ = await EXTRACTION_EXECUTOR.run(
+                    run_stream_extract,
+                    pieces=pipe,
+                    document_id=url,
+                    prompt_description=prompt_description,
+                    example_set=example_set,
+                    model_id=model_id,
+                    api_key=api_key,
+                    extraction_passes=extraction_passes,
+                    max_workers=max_workers,
+                    max_char_buffer=max_char_buffer,
+                    monitor=monitor,
+                    timer=timer
+                )
+        finally:
+            feeder.cancel()
+            pipe.close()
+        await reporter.flush()
+        timer.add('fetch', fetch.get('fetch_ms', 0) / 1000)
         
         # Process results
-        extractions_list = []
-        for e in result.extractions:
-            extraction_dict = {
-                'extraction_class': e.extraction_class,
-                'extraction_text': e.extraction_text,
-                'attributes': e.attributes if hasattr(e, 'attributes') else {}
-            }
-            
-            if hasattr(e, 'char_interval') and e.char_interval is not None:
-                try:
-                    if hasattr(e.char_interval, '__iter__'):
-                        interval_list = list(e.char_interval)
-                        extraction_dict['char_start'] = interval_list[0]
-                        extraction_dict['char_end'] = interval_list[1]
-                    elif hasattr(e.char_interval, 'start') and hasattr(e.char_interval, 'end'):
-                        extraction_dict['char_start'] = e.char_interval.start
-                        extraction_dict['char_end'] = e.char_interval.end
-                except:
-                    pass
-            
-            extractions_list.append(extraction_dict)
+        with timer.phase('convert'):
+            extractions_list = result.records.records()
         
         result_id = hashlib.md5(f"{url}{datetime.now().isoformat()}".encode()).hexdigest()
-        RESULTS_STORE[result_id] = result
+        with timer.phase('store'):
+            await store_result(result_id, result)
         
         await ctx.info(f"✨ Found {len(extractions_list)} entities from URL")
         
-        return {
+        SERVER_METRICS.observe('extract_from_url', timer)
+        response = {
             'success': True,
             'result_id': result_id,
             'url': url,
+            'fetch': fetch,
             'total_extractions': len(extractions_list),
             'extractions': extractions_list
         }
+        if debug:
+            response['metadata'] = {'timings': timer.as_dict()}
+        return encoded_response(shape_extraction_response(response, summary_only, fields))
         
     except Exception as e:
+        SERVER_METRICS.observe('extract_from_url', timer, success=False)
         await ctx.error(f"URL extraction failed: {str(e)}")
-        return {'success': False, 'error': str(e)}
+        return encoded_response({'success': False, 'error': str(e)})
 
 
 @mcp.tool
-async def save_results_to_jsonl(
+async def extract_from_urls(
     ctx: Context,
-    result_id: str,
-    output_name: str = "extraction_results.jsonl"
+    urls: List[str],
+    prompt_description: str,
+    examples: Union[str, List[Dict[str, Any]]],
+    model_id: str = "gemini-2.5-flash",
+    extraction_passes: int = 2,
+    max_workers: int = 20,
+    fetch_concurrency: Optional[int] = None,
+    extract_concurrency: Optional[int] = None,
+    use_cache: bool = True
 ) -> Dict[str, Any]:
-    """Save extraction results to JSONL file."""
+    """
+    Extract from a list of URLs in one call.
+    
+    URLs are fetched several at a time while earlier ones are extracted, and
+    each document is stored as soon as it is done. A URL that fails (HTTP
+    error, unsupported content, extraction error) is reported in its own
+    entry and doesn't stop the others.
+    
+    Args:
+        urls: URLs to fetch and extract from
+        prompt_description: Extraction instructions
+        examples: Few-shot examples, or an example_set_id from register_examples
+        model_id: Model to use
+        extraction_passes: Number of passes (default 2 for URLs)
+        max_workers: Parallel model calls per document
+        fetch_concurrency: Downloads at once (default
+            LANGEXTRACT_URL_BATCH_FETCH_CONCURRENCY)
+        extract_concurrency: Documents extracted at once (default
+            LANGEXTRACT_URL_BATCH_EXTRACT_CONCURRENCY)
+        use_cache: Reuse results for pages whose text is unchanged
+    
+    Returns one entry per URL (result_id and total_extractions, or the
+    failing stage and error) and per-stage throughput under `stages`. Use
+    get_extraction_details, query_extractions or search_extractions to read
+    the results.
+    """
     
+    timer = request_timer()
+    started = time.perf_counter()
     try:
-        if result_id not in RESULTS_STORE:
-            return {'success': False, 'error': 'Result not found'}
+        urls = list(dict.fromkeys(urls))  # Each URL once, in order
+        if not urls:
+            return encoded_response({'success': False, 'error': 'No URLs given'})
         
-        result = RESULTS_STORE[result_id]
+        try:
+            example_set = EXAMPLE_REGISTRY.resolve(examples)
+        except ValueError as e:
+            return encoded_response({'success': False, 'error': str(e)})
         
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
-        output_path = output_dir / output_name
+        api_key = os.environ.get('LANGEXTRACT_API_KEY')
+        if not api_key:
+            return encoded_response({'success': False, 'error': 'LANGEXTRACT_API_KEY not set'})
+        
+        await ctx.info(f"🌐 Extracting from {len(urls)} URLs...")
+        
+        async def report(batch: UrlBatch, entry: Dict[str, Any]):
+            try:
+                await ctx.report_progress(
+                    progress=batch.done, total=len(batch.entries),
+                    message=f"{entry['url']}: " + (
+                        f"{entry['total_extractions']} extractions" if entry['success'] else f"failed ({entry['stage']})"
+                    )
+                )
+            except Exception:
+                pass  # The client may have gone away; the batch carries on
+        
+        batch = UrlBatch(
+            urls,
+            extract={
+                'prompt_description': prompt_description,
+                'example_set': example_set,
+                'model_id': model_id,
+                'api_key': api_key,
+                'extraction_passes': extraction_passes,
+                'max_workers': max_workers,
+                'max_char_buffer': 1000  # lx.extract default
+            },
+            fetch_concurrency=fetch_concurrency or URL_BATCH_FETCH_CONCURRENCY,
+            extract_concurrency=extract_concurrency or URL_BATCH_EXTRACT_CONCURRENCY,
+            use_cache=use_cache,
+            on_done=report
+        )
+        with timer.phase('extraction'):
+            await batch.run()
+        
+        succeeded = sum(1 for entry in batch.entries if entry['success'])
+        await ctx.info(f"✨ {succeeded}/{len(urls)} URLs extracted")
+        
+        SERVER_METRICS.observe('extract_from_urls', timer)
+        return encoded_response({
+            'success': True,
+            'total_urls': len(urls),
+            'succeeded': succeeded,
+            'failed': len(urls) - succeeded,
+            'total_extractions': sum(entry.get('total_extractions', 0) for entry in batch.entries),
+            'results': batch.entries,
+            'stages': batch.stage_stats(),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+        
+    except Exception as e:
+        SERVER_METRICS.observe('extract_from_urls', timer, success=False)
+        await ctx.error(f"URL batch extraction failed: {str(e)}")
+        return encoded_response({'success': False, 'error': str(e)})
+
+
+@mcp.tool
+async def extract_from_file(
+    ctx: Context,
+    path: str,
+    prompt_description: str,
+    examples: Union[str, List[Dict[str, Any]]],
+    model_id: str = "gemini-2.5-flash",
+    extraction_passes: int = 1,
+    max_workers: int = 10,
+    max_char_buffer: int = 8000,
+    encoding: str = "utf-8",
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1,
+    debug: bool = False,
+    summary_only: bool = False,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Extract structured information from a local text file of any size.
+    
+    The file is read and annotated window by window instead of being passed
+    as one string, so memory use does not grow with the file. The stored
+    result keeps only extractions and a reference to the file; exports and
+    visualizations re-read the text, and fail if the file has changed.
+    
+    Args:
+        path: Path of the file on the server, absolute or relative to
+            LANGEXTRACT_FILE_ROOT (files outside it are refused)
+        prompt_description: Extraction instructions
+        examples: Few-shot examples, or an example_set_id from register_examples
+        model_id: Model to use
+        extraction_passes: Number of passes
+        max_workers: Parallel workers
+        max_char_buffer: Chunk size
+        encoding: Text encoding of the file (undecodable bytes are replaced)
+        api_key: Optional API key (defaults to LANGEXTRACT_API_KEY env var)
+        use_cache: Reuse model outputs of chunks seen before
+        adaptive_passes: Stop re-extracting a chunk once a pass adds fewer
+            than `min_pass_yield` new extractions to it
+        min_pass_yield: New extractions a pass must add to a chunk for it to
+            get the next pass (adaptive_passes only)
+        debug: Add per-phase timings and model-call counts to `metadata`
+        summary_only: Return per-class counts instead of the extractions
+            (page through them later with get_extraction_details)
+        fields: Keep only these keys of each extraction (extraction_class,
+            extraction_text, attributes, char_start, char_end)
+    
+    char_start/char_end are offsets into the decoded file text.
+    """
+    
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    
+    timer = request_timer(debug)
+    try:
+        try:
+            source = resolve_source_file(path)
+            codecs.lookup(encoding)
+        except LookupError:
+            return encoded_response({'success': False, 'error': f'Unknown encoding: {encoding}'})
+        except (ValueError, OSError) as e:
+            return encoded_response({'success': False, 'error': str(e)})
         
-        await ctx.info(f"💾 Saving to {output_path}...")
+        size = source.stat().st_size
+        if not size:
+            return encoded_response({'success': False, 'error': 'File is empty'})
         
-        lx.io.save_annotated_documents([result], output_name=output_name, output_dir=str(output_dir))
+        if not prompt_description or not prompt_description.strip():
+            return encoded_response({'success': False, 'error': 'Prompt description required'})
+        
+        try:
+            with timer.phase('examples'):
+                example_set = EXAMPLE_REGISTRY.resolve(examples)
+        except ValueError as e:
+            return encoded_response({'success': False, 'error': str(e)})
+        
+        final_api_key = api_key or os.environ.get('LANGEXTRACT_API_KEY')
+        if not final_api_key:
+            return encoded_response({
+                'success': False,
+                'error': 'LANGEXTRACT_API_KEY not set',
+                'hint': 'Set environment variable or pass api_key parameter'
+            })
+        
+        await ctx.info(f"📂 Extracting from {source.name} ({size / (1024 * 1024):.1f} MB) with {model_id}")
+        
+        monitor = ExtractionMonitor()
+        reporter = ProgressReporter(ctx, monitor)
+        with timer.phase('extraction'):
+            result, summary = await EXTRACTION_EXECUTOR.run(
+                run_file_extract,
+                path=source,
+                encoding=encoding,
+                prompt_description=prompt_description,
+                example_set=example_set,
+                model_id=model_id,
+                api_key=final_api_key,
+                extraction_passes=extraction_passes,
+                max_workers=max_workers,
+                max_char_buffer=max_char_buffer,
+                monitor=monitor,
+                use_chunk_cache=use_cache,
+                timer=timer,
+                adaptive_passes=adaptive_passes,
+                min_pass_yield=min_pass_yield
+            )
+        await reporter.flush()
+        
+        with timer.phase('convert'):
+            extractions_list = result.records.records()
+        
+        # Same file contents (by size and mtime) and parameters share a result_id
+        result_id = hashlib.sha256(json.dumps({
+            'source': result.source,
+            'prompt_description': prompt_description,
+            'examples': example_set.digest,
+            'model_id': model_id,
+            'extraction_passes': extraction_passes,
+            'max_char_buffer': max_char_buffer,
+            'min_pass_yield': min_pass_yield if summary['passes']['mode'] == 'adaptive' else None
+        }, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+        with timer.phase('store'):
+            await store_result(result_id, result)
+        
+        await ctx.info(
+            f"✨ Found {len(extractions_list)} entities in {summary['windows']} windows of {source.name}"
+        )
+        
+        SERVER_METRICS.observe('extract_from_file', timer)
+        response = {
+            'success': True,
+            'result_id': result_id,
+            'total_extractions': len(extractions_list),
+            'extractions': extractions_list,
+            'metadata': {
+                'model_id': model_id,
+                'extraction_passes': extraction_passes,
+                'file': {
+                    'path': str(source),
+                    'size_bytes': size,
+                    'chars': summary['chars'],
+                    'encoding': encoding,
+                    'windows': summary['windows']
+                },
+                'chunk_cache': monitor.chunk_cache_summary(),
+                'passes': summary['passes']
+            }
+        }
+        if debug:
+            response['metadata']['timings'] = timer.as_dict()
+        return encoded_response(shape_extraction_response(response, summary_only, fields))
+    
+    except Exception as e:
+        SERVER_METRICS.observe('extract_from_file', timer, success=False)
+        await ctx.error(f"File extraction failed: {str(e)}")
+        return encoded_response({'success': False, 'error': str(e), 'error_type': type(e).__name__})
+
+
+@mcp.tool
+async def extract_batch(
+    ctx: Context,
+    documents: List[Union[str, Dict[str, Any]]],
+    prompt_description: str,
+    examples: Union[str, List[Dict[str, Any]]],
+    model_id: str = "gemini-2.5-flash",
+    extraction_passes: int = 1,
+    max_workers: int = 20,
+    max_char_buffer: int = 8000,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    stream_chunks: bool = False,
+    debug: bool = False
+) -> Dict[str, Any]:
+    """
+    Extract structured information from many documents in one call.
+    
+    Examples are converted once and all uncached documents go through a
+    single lx.extract run, so chunks from different documents share one
+    pool of `max_workers` model calls.
+    
+    Args:
+        documents: Texts, or dicts with "text" and optional "document_id"
+        prompt_description: Clear instructions for what to extract
+        examples: List of example extractions (few-shot learning), or an
+            example_set_id returned by register_examples
+        model_id: Model to use
+        extraction_passes: Number of passes (1-5, more = higher recall)
+        max_workers: Parallel model calls shared by the whole batch
+        max_char_buffer: Chunk size (1000-10000, smaller = more accurate)
+        api_key: Optional API key (defaults to LANGEXTRACT_API_KEY env var)
+        use_cache: Reuse results of identical earlier requests per document,
+            and outputs of unchanged chunks
+        stream_chunks: Also send each chunk's extractions (tagged with its
+            document_id) as a "langextract.chunks" log message
+        debug: Add per-phase timings and model-call counts to `metadata`
+    
+    Returns per-document result_ids (use get_extraction_details for the
+    extractions) plus aggregate timing.
+    """
+    
+    timer = request_timer(debug)
+    try:
+        started = time.perf_counter()
+        
+        if not documents:
+            return {'success': False, 'error': 'At least one document required'}
+        
+        if not prompt_description or not prompt_description.strip():
+            return {'success': False, 'error': 'Prompt description required'}
+        
+        if not examples:
+            return {
+                'success': False,
+                'error': 'At least one example required',
+                'hint': 'Use create_example_template or get_research_examples for examples'
+            }
+        
+        # Normalize input to (document_id, text)
+        docs = []
+        for idx, doc in enumerate(documents):
+            if isinstance(doc, str):
+                doc = {'text': doc}
+            text = doc.get('text')
+            if not text or not text.strip():
+                return {'success': False, 'error': f'Document {idx} has empty text'}
+            docs.append((str(doc.get('document_id') or f'doc_{idx}'), text))
+        
+        if len(set(doc_id for doc_id, _ in docs)) != len(docs):
+            return {'success': False, 'error': 'document_id values must be unique'}
+        
+        try:
+            with timer.phase('examples'):
+                example_set = EXAMPLE_REGISTRY.resolve(examples)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        
+        await ctx.info(f"📚 Batch of {len(docs)} documents, {len(example_set.lx_examples)} examples")
+        
+        # Resolve cache hits first; only misses are sent to the model
+        with timer.phase('hashing'):
+            cache_keys = {
+                doc_id: extraction_cache_key(
+                    text, prompt_description, example_set.digest, model_id, extraction_passes, max_char_buffer
+                )
+                for doc_id, text in docs
+            }
+        results = {}
+        if use_cache:
+            with timer.phase('cache_lookup'):
+                for doc_id, _ in docs:
+                    cached = await asyncio.to_thread(EXTRACTION_CACHE.get, cache_keys[doc_id])
+                    if cached is not None:
+                        results[doc_id] = cached
+        cache_hits = set(results)
+        pending = [(doc_id, text) for doc_id, text in docs if doc_id not in results]
+        
+        extract_seconds = 0.0
+        chunk_cache = None
+        if pending:
+            final_api_key = api_key or os.environ.get('LANGEXTRACT_API_KEY')
+            if not final_api_key:
+                return {
+                    'success': False,
+                    'error': 'LANGEXTRACT_API_KEY not set',
+                    'hint': 'Set environment variable or pass api_key parameter'
+                }
+            
+            await ctx.info(f"🚀 Extracting {len(pending)} documents ({len(cache_hits)} cached)...")
+            
+            extract_started = time.perf_counter()
+            monitor = ExtractionMonitor()
+            reporter = ProgressReporter(ctx, monitor, stream_chunks=stream_chunks)
+            annotated = await EXTRACTION_EXECUTOR.run(
+                run_lx_extract,
+                text_or_documents=[
+                    lx.data.Document(text=text, document_id=doc_id) for doc_id, text in pending
+                ],
+                prompt_description=prompt_description,
+                example_set=example_set,
+                model_id=model_id,
+                api_key=final_api_key,
+                extraction_passes=extraction_passes,
+                max_workers=max_workers,
+                batch_length=max_workers,
+                max_char_buffer=max_char_buffer,
+                monitor=monitor,
+                use_chunk_cache=use_cache,
+                timer=timer
+            )
+            await reporter.flush()
+            extract_seconds = time.perf_counter() - extract_started
+            timer.add('extraction', extract_seconds)
+            chunk_cache = monitor.chunk_cache_summary()
+            
+            with timer.phase('convert'):
+                converted = await asyncio.to_thread(list, map(StoredResult.from_document, annotated))
+            with timer.phase('cache_store'):
+                for result in converted:
+                    results[result.document_id] = result
+                    await asyncio.to_thread(EXTRACTION_CACHE.put, cache_keys[result.document_id], result)
+        
+        per_document = []
+        total_extractions = 0
+        total_chars = 0
+        store_started = time.perf_counter()
+        for doc_id, text in docs:
+            result = results[doc_id]
+            result_id = cache_keys[doc_id][:32]
+            await store_result(result_id, result)
+            count = len(result.records)
+            total_extractions += count
+            total_chars += len(text)
+            per_document.append({
+                'document_id': doc_id,
+                'result_id': result_id,
+                'total_extractions': count,
+                'text_length': len(text),
+                'cache_hit': doc_id in cache_hits
+            })
+        
+        timer.add('store', time.perf_counter() - store_started)
+        total_seconds = time.perf_counter() - started
+        
+        await ctx.info(f"✨ Batch done: {total_extractions} entities in {total_seconds:.1f}s")
+        
+        SERVER_METRICS.observe('extract_batch', timer)
+        response = {
+            'success': True,
+            'total_documents': len(docs),
+            'total_extractions': total_extractions,
+            'documents': per_document,
+            'timing': {
+                'total_seconds': round(total_seconds, 3),
+                'extraction_seconds': round(extract_seconds, 3),
+                'documents_per_second': round(len(docs) / total_seconds, 3) if total_seconds else None,
+                'chars_per_second': round(total_chars / total_seconds, 1) if total_seconds else None
+            },
+            'metadata': {
+                'model_id': model_id,
+                'extraction_passes': extraction_passes,
+                'max_workers': max_workers,
+                'cache_hits': len(cache_hits),
+                'extracted': len(pending),
+                'chunk_cache': chunk_cache
+            }
+        }
+        if debug:
+            response['metadata']['timings'] = timer.as_dict()
+        return response
+        
+    except Exception as e:
+        SERVER_METRICS.observe('extract_batch', timer, success=False)
+        await ctx.error(f"Batch extraction failed: {str(e)}")
+        return {'success': False, 'error': str(e), 'error_type': type(e).__name__}
+
+
+@mcp.tool
+async def save_results_to_jsonl(
+    ctx: Context,
+    result_id: Optional[str] = None,
+    output_name: str = "extraction_results.jsonl",
+    result_ids: Optional[List[str]] = None,
+    append: bool = False
+) -> Dict[str, Any]:
+    """
+    Save extraction results to JSONL file.
+    
+    Each result is one line in langextract's format plus its result_id, and
+    `<output_name>.idx` records where each line starts, so
+    load_results_from_jsonl can read one result without scanning the file.
+    Names ending in .gz or .zst are compressed per line.
+    
+    Args:
+        result_id: The extraction result ID
+        output_name: JSONL file name under output/
+        result_ids: Several results to save in one file
+        append: Add to an existing file instead of replacing it (results
+            already in it are skipped); required for the LANGEXTRACT_JSONL_SINK
+            file, which is never replaced
+    """
+    
+    try:
+        ids = ([result_id] if result_id else []) + list(result_ids or [])
+        if not ids:
+            return {'success': False, 'error': 'Pass result_id or result_ids'}
+        results = {}
+        for rid in ids:
+            result = await load_result(rid)
+            if result is None:
+                return {'success': False, 'error': f'Result not found: {rid}'}
+            results[rid] = result
         
-        await ctx.info(f"✅ Saved {len(result.extractions)} extractions")
+        sink = jsonl_sink(Path("output") / output_name)
+        if sink is JSONL_SINK and not append:
+            return {
+                'success': False,
+                'error': f'{output_name} is the LANGEXTRACT_JSONL_SINK file; replacing it would drop the results it collected',
+                'hint': 'Pass append=True or choose another output_name'
+            }
+        
+        await ctx.info(f"💾 Saving to {sink.path}...")
+        
+        if not append:
+            await asyncio.to_thread(sink.clear)
+        saved = skipped = 0
+        for rid, result in results.items():
+            if await asyncio.to_thread(sink.append, rid, result):
+                saved += 1
+            else:
+                skipped += 1
+        total_extractions = sum(len(result.records) for result in results.values())
+        
+        await ctx.info(f"✅ Saved {saved} results ({total_extractions} extractions)")
         
         return {
             'success': True,
-            'file_path': str(output_path.absolute()),
-            'total_extractions': len(result.extractions)
+            'file_path': str(sink.path.absolute()),
+            'index_path': str(sink.index_path.absolute()),
+            'saved_results': saved,
+            'skipped_results': skipped,
+            'total_extractions': total_extractions,
+            'file': sink.stats()
         }
         
     except Exception as e:
@@ -820,47 +5908,131 @@ async def save_results_to_jsonl(
         return {'success': False, 'error': str(e)}
 
 
+@mcp.tool
+async def load_results_from_jsonl(
+    ctx: Context,
+    output_name: str = "extraction_results.jsonl",
+    result_ids: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    List or load results saved by save_results_to_jsonl (or the
+    LANGEXTRACT_JSONL_SINK file).
+    
+    Args:
+        output_name: JSONL file name under output/
+        result_ids: Results to load back into the session, so the other
+            tools can use them; omit to only list the file's results
+    """
+    
+    try:
+        path = Path("output") / output_name
+        if not path.exists():
+            return {'success': False, 'error': f'File not found: {path}'}
+        sink = await asyncio.to_thread(jsonl_sink, path)
+        if not result_ids:
+            return {'success': True, 'results': sink.entries(), 'file': sink.stats()}
+        
+        missing = [rid for rid in result_ids if rid not in sink]
+        if missing:
+            return {'success': False, 'error': f'Not in {output_name}: {missing}'}
+        loaded = []
+        for rid in result_ids:
+            result = await asyncio.to_thread(sink.read, rid)
+            await store_result(rid, result)
+            loaded.append({'result_id': rid, 'total_extractions': len(result.records)})
+        
+        await ctx.info(f"📂 Loaded {len(loaded)} results from {path}")
+        
+        return {'success': True, 'loaded': loaded}
+        
+    except Exception as e:
+        await ctx.error(f"Load failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
 @mcp.tool
 async def generate_visualization(
     ctx: Context,
     result_id: str,
-    output_name: str = "visualization.html"
+    output_name: str = "visualization.html",
+    window: int = 0,
+    window_chars: Optional[int] = None
 ) -> Dict[str, Any]:
-    """Generate interactive HTML visualization of extractions."""
+    """
+    Generate interactive HTML visualization of extractions.
+    
+    Documents longer than `window_chars` are split into windows and one
+    window is rendered per call, to `<output_name>_window<N>.html`. Rendered
+    pages are cached, so asking for the same window again only rewrites it.
+    
+    Args:
+        result_id: The extraction result ID
+        output_name: HTML file name under output/
+        window: Window to render; follow `next_window` for the rest
+        window_chars: Characters of text per window (default
+            LANGEXTRACT_VISUALIZATION_WINDOW_CHARS; 0 renders the whole
+            document in one page)
+    """
     
     try:
-        if result_id not in RESULTS_STORE:
+        result = await load_result(result_id)
+        if result is None:
             return {'success': False, 'error': 'Result not found'}
-        
-        result = RESULTS_STORE[result_id]
+        if window_chars is None:
+            window_chars = VISUALIZATION_WINDOW_CHARS
         
         await ctx.info("🎨 Generating visualization...")
         
-        # Save to temp JSONL
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.jsonl') as f:
-            lx.io.save_annotated_documents([result], output_name=os.path.basename(f.name), output_dir=os.path.dirname(f.name))
-            jsonl_path = f.name
+        records = result.records
+        text = await asyncio.to_thread(lambda: result.text)
+        content_key = await asyncio.to_thread(
+            lambda: f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}:{records.fingerprint()}"
+        )
+        windows = visualization_windows(len(text), window_chars)
+        if not 0 <= window < windows:
+            return {'success': False, 'error': f'window must be between 0 and {windows - 1}'}
         
-        # Generate HTML
-        html_content = lx.visualize(jsonl_path)
-        os.unlink(jsonl_path)
+        if windows == 1:
+            key = content_key
+            start, stop, rows = 0, len(text), None
+            shown = len(records)
+        else:
+            key = f"{content_key}:{window_chars}:{window}"
+            start, stop, rows = await asyncio.to_thread(window_rows, records, len(text), window, window_chars)
+            shown = len(rows)
         
-        html = html_content.data if hasattr(html_content, 'data') else html_content
+        html = VISUALIZATION_CACHE.get(key)
+        cached = html is not None
+        if html is None:
+            document = lx.data.AnnotatedDocument(
+                document_id=result.document_id,
+                extractions=records.to_extractions(rows, shift=start),
+                text=text[start:stop]
+            )
+            html = await asyncio.to_thread(render_visualization, document)
+            VISUALIZATION_CACHE.put(key, html)
         
         # Save HTML
         output_dir = Path("output")
         output_dir.mkdir(exist_ok=True)
         output_path = output_dir / output_name
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        if windows > 1:
+            output_path = output_path.with_name(f"{output_path.stem}_window{window}{output_path.suffix}")
+        await asyncio.to_thread(output_path.write_text, html, encoding='utf-8')
         
         await ctx.info(f"✨ Visualization saved to {output_path}")
         
         return {
             'success': True,
             'file_path': str(output_path.absolute()),
-            'total_extractions': len(result.extractions),
+            'total_extractions': len(records),
+            'shown_extractions': shown,
+            'window': window,
+            'windows': windows,
+            'char_range': [start, stop],
+            'next_window': window + 1 if window + 1 < windows else None,
+            'cached': cached,
+            'html_mb': round(len(html) / (1024 * 1024), 3),
             'instructions': 'Open HTML file in browser'
         }
         
@@ -873,80 +6045,382 @@ async def generate_visualization(
 async def list_stored_results(ctx: Context) -> Dict[str, Any]:
     """List all extraction results in current session."""
     
+    summaries = await asyncio.to_thread(RESULTS_STORE.summaries)
     results_summary = [
-        {
-            'result_id': rid,
-            'total_extractions': len(result.extractions),
-            'classes': list(set(e.extraction_class for e in result.extractions))
-        }
-        for rid, result in RESULTS_STORE.items()
+        {'result_id': rid, **summary}
+        for rid, summary in summaries.items()
     ]
     
+    response = {
+        'total_results': len(results_summary),
+        'results': results_summary,
+        'memory_usage': RESULTS_STORE.memory_usage()
+    }
+    if JSONL_SINK is not None:
+        response['jsonl_sink'] = JSONL_SINK.stats()
+    return response
+
+
+@mcp.tool
+async def get_extraction_queue_stats(ctx: Context) -> Dict[str, Any]:
+    """
+    Get extraction executor load (running, queued and rejected extractions)
+    and the model call scheduler's concurrency window, rate budgets and
+    throttling counters under `model_calls`.
+    """
+    
+    return {**EXTRACTION_EXECUTOR.stats(), 'model_calls': MODEL_SCHEDULER.stats()}
+
+
+@mcp.tool
+async def get_cache_stats(ctx: Context) -> Dict[str, Any]:
+    """Get extraction result cache hit/miss counters and occupancy."""
+    
+    return {
+        **EXTRACTION_CACHE.stats(),
+        'example_sets': EXAMPLE_REGISTRY.stats(),
+        'prompt_prefixes': PROMPT_PREFIX_CACHE.stats(),
+        'chunk_outputs': CHUNK_CACHE.stats(),
+        'visualizations': VISUALIZATION_CACHE.stats(),
+        'url_fetches': URL_FETCHER.stats()
+    }
+
+
+@mcp.tool
+async def get_server_metrics(ctx: Context, format: str = "json") -> Dict[str, Any]:
+    """
+    Get latency histograms per extraction tool and per phase, plus counters.
+    
+    Phases: examples, hashing, cache_lookup, extraction (includes executor
+    queueing), chunking, model_setup, annotate, model_call, cache_store,
+    convert, store. Histogram quantiles are bucket upper bounds.
+    
+    Args:
+        format: "json", or "prometheus" for the text exposition format
+    """
+    
+    if format not in ('json', 'prometheus'):
+        return {'success': False, 'error': 'format must be "json" or "prometheus"'}
+    
+    executor = EXTRACTION_EXECUTOR.stats()
+    cache = EXTRACTION_CACHE.stats()
+    chunks = CHUNK_CACHE.stats()
+    scheduler = MODEL_SCHEDULER.stats()
+    gauges = {
+        'executor_running': executor['running'],
+        'executor_queue_depth': executor['queue_depth'],
+        'executor_rejected': executor['rejected'],
+        'result_cache_hits': cache['hits'],
+        'result_cache_misses': cache['misses'],
+        'chunk_cache_hits': chunks['hits'],
+        'chunk_cache_misses': chunks['misses'],
+        'model_concurrency_limit': scheduler['concurrency_limit'],
+        'model_calls_in_flight': scheduler['in_flight'],
+        'model_calls_queued': scheduler['queued'],
+        'model_calls_throttled': scheduler['throttled'],
+        'model_call_retries': scheduler['retries'],
+        'stored_results': len(RESULTS_STORE)
+    }
+    
+    if format == 'prometheus':
+        return {'success': True, 'format': 'prometheus', 'text': SERVER_METRICS.prometheus(gauges)}
+    
     return {
-        'total_results': len(RESULTS_STORE),
-        'results': results_summary
+        'success': True,
+        'metrics_enabled': METRICS_ENABLED,
+        **SERVER_METRICS.snapshot(),
+        'gauges': gauges
     }
 
 
 @mcp.tool
 async def get_extraction_details(
     ctx: Context,
-    result_id: str
+    result_id: str,
+    summary_only: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    compact: bool = False
 ) -> Dict[str, Any]:
-    """Get full details of a specific extraction result."""
+    """
+    Get full details of a specific extraction result.
     
-    if result_id not in RESULTS_STORE:
-        return {
+    Args:
+        result_id: The extraction result ID
+        summary_only: Only the per-class statistics, no extractions
+        offset: Index of the first extraction to return
+        limit: Maximum extractions to return (all by default); follow
+            `next_offset` for the next page
+        fields: Keep only these keys of each extraction (extraction_class,
+            extraction_text, attributes, char_start, char_end)
+        compact: grouped_by_class lists extraction indexes (positions in
+            the result, as used by offset) instead of repeating extractions
+    
+    `statistics` always covers the whole result; `extractions` and
+    `grouped_by_class` cover the requested page.
+    """
+    
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    if offset < 0 or (limit is not None and limit < 0):
+        return encoded_response({'success': False, 'error': 'offset and limit must be >= 0'})
+    
+    result = await load_result(result_id)
+    if result is None:
+        return encoded_response({
             'success': False,
             'error': f'Result not found: {result_id}',
             'available_ids': list(RESULTS_STORE.keys())
+        })
+    
+    records = result.records
+    total = len(records)
+    counts = [0] * len(records.classes)
+    for class_id in records.class_ids:
+        counts[class_id] += 1
+    response = {
+        'success': True,
+        'result_id': result_id,
+        'total_extractions': total,
+        'statistics': {
+            'classes': list(records.classes),
+            'count_per_class': dict(zip(records.classes, counts))
         }
+    }
     
-    result = RESULTS_STORE[result_id]
+    if summary_only:
+        await ctx.info(f"📊 Summarized {total} extractions")
+        return encoded_response(response)
     
-    extractions = []
-    for e in result.extractions:
-        extraction_dict = {
-            'extraction_class': e.extraction_class,
-            'extraction_text': e.extraction_text,
-            'attributes': e.attributes if hasattr(e, 'attributes') else {}
-        }
-        
-        if hasattr(e, 'char_interval') and e.char_interval is not None:
-            try:
-                if hasattr(e.char_interval, '__iter__'):
-                    interval_list = list(e.char_interval)
-                    extraction_dict['char_start'] = interval_list[0]
-                    extraction_dict['char_end'] = interval_list[1]
-                elif hasattr(e.char_interval, 'start') and hasattr(e.char_interval, 'end'):
-                    extraction_dict['char_start'] = e.char_interval.start
-                    extraction_dict['char_end'] = e.char_interval.end
-            except:
-                pass
-        
-        extractions.append(extraction_dict)
+    stop = total if limit is None else min(total, offset + limit)
+    page = records.records(offset, stop)
     
     # Group by class
     by_class = {}
-    for e in extractions:
-        cls = e['extraction_class']
-        if cls not in by_class:
-            by_class[cls] = []
-        by_class[cls].append(e)
+    for index, e in enumerate(page, start=offset):
+        by_class.setdefault(e['extraction_class'], []).append(index if compact else e)
+    if fields and not compact:
+        by_class = {cls: project_extractions(items, fields) for cls, items in by_class.items()}
     
-    await ctx.info(f"📊 Retrieved {len(extractions)} extractions")
+    await ctx.info(f"📊 Retrieved {len(page)} extractions")
     
-    return {
+    response.update({
+        'offset': offset,
+        'next_offset': stop if stop < total else None,
+        'extractions': project_extractions(page, fields),
+        'grouped_by_class': by_class
+    })
+    return encoded_response(response)
+
+
+@mcp.tool
+async def query_extractions(
+    ctx: Context,
+    result_id: str,
+    extraction_class: Optional[str] = None,
+    attributes: Optional[Dict[str, Optional[str]]] = None,
+    char_start: Optional[int] = None,
+    char_end: Optional[int] = None,
+    text_contains: Optional[str] = None,
+    cursor: int = 0,
+    limit: int = 50,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Find extractions in a stored result without fetching all of them.
+    
+    All given filters must match. Indexes over the result are built on the
+    first query that needs them and reused afterwards.
+    
+    Args:
+        result_id: The extraction result ID
+        extraction_class: Only this class
+        attributes: Attribute filters, e.g. {"category": "CONSTRAINTS"}; a
+            null value only requires the attribute to be present. List
+            attributes match if any item equals the value.
+        char_start: Only extractions whose span ends after this offset
+        char_end: Only extractions whose span starts before this offset
+        text_contains: Case-insensitive substring of extraction_text
+        cursor: Pass the previous page's `next_cursor` to continue
+        limit: Maximum extractions per page
+        fields: Keep only these keys of each extraction
+    
+    Each extraction carries its `index` in the result (the offset used by
+    get_extraction_details). `next_cursor` is null after the last page.
+    """
+    
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    if cursor < 0 or limit < 1:
+        return encoded_response({'success': False, 'error': 'cursor must be >= 0 and limit >= 1'})
+    
+    result = await load_result(result_id)
+    if result is None:
+        return encoded_response({
+            'success': False,
+            'error': f'Result not found: {result_id}',
+            'available_ids': list(RESULTS_STORE.keys())
+        })
+    
+    span = None
+    if char_start is not None or char_end is not None:
+        span = (char_start if char_start is not None else 0,
+                char_end if char_end is not None else sys.maxsize)
+    
+    records = result.records
+    started = time.perf_counter()
+    # The first query on a result may build indexes; keep that off the event loop
+    rows, next_cursor = await asyncio.to_thread(
+        records.index().query, extraction_class, attributes, span, text_contains, cursor, limit
+    )
+    query_ms = (time.perf_counter() - started) * 1000
+    
+    extractions = []
+    for row in rows:
+        extraction = records.record(row)
+        if fields:
+            extraction = {f: extraction[f] for f in fields if f in extraction}
+        extraction['index'] = row
+        extractions.append(extraction)
+    
+    await ctx.info(f"🔎 {len(extractions)} matching extractions")
+    
+    return encoded_response({
         'success': True,
         'result_id': result_id,
-        'total_extractions': len(extractions),
+        'total_extractions': len(records),
+        'returned': len(extractions),
         'extractions': extractions,
-        'grouped_by_class': by_class,
-        'statistics': {
-            'classes': list(by_class.keys()),
-            'count_per_class': {k: len(v) for k, v in by_class.items()}
+        'next_cursor': next_cursor,
+        'query_ms': round(query_ms, 3)
+    })
+
+
+@mcp.tool
+async def search_extractions(
+    ctx: Context,
+    query: str = "",
+    extraction_class: Optional[str] = None,
+    attributes: Optional[Dict[str, Optional[str]]] = None,
+    result_ids: Optional[List[str]] = None,
+    match_all: bool = True,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """
+    Search the extractions of all stored results at once.
+    
+    Words of `query` are matched against extraction_text (weighted highest),
+    attribute values and source_context, and hits are ranked by BM25 score.
+    Results are indexed in the background as they are stored, so a result
+    stored moments ago may not be searchable yet (see `index.pending_results`).
+    
+    Args:
+        query: Words to search for; empty to only apply the filters
+        extraction_class: Only this class
+        attributes: Attribute filters, e.g. {"category": "CONSTRAINTS"}; a
+            null value only requires the attribute to be present
+        result_ids: Only search these results
+        match_all: Require every word (default) instead of any word
+        limit: Maximum hits per page
+        offset: Pass the previous page's `next_offset` to continue
+    
+    Each hit carries `result_id` and `index`, which locate the extraction
+    for get_extraction_details and query_extractions.
+    """
+    
+    if not SEARCH_ENABLED:
+        return encoded_response({'success': False, 'error': 'Search index disabled (LANGEXTRACT_SEARCH=0)'})
+    if offset < 0 or limit < 1:
+        return encoded_response({'success': False, 'error': 'offset must be >= 0 and limit >= 1'})
+    
+    index = await asyncio.to_thread(search_index)
+    started = time.perf_counter()
+    try:
+        hits = await asyncio.to_thread(
+            index.search, query, extraction_class, attributes, result_ids, match_all, limit + 1, offset
+        )
+    except sqlite3.Error as e:
+        return encoded_response({'success': False, 'error': f'Search failed: {e}'})
+    query_ms = (time.perf_counter() - started) * 1000
+    
+    more = len(hits) > limit
+    hits = hits[:limit]
+    await ctx.info(f"🔎 {len(hits)} search hits")
+    
+    return encoded_response({
+        'success': True,
+        'query': query,
+        'returned': len(hits),
+        'hits': hits,
+        'next_offset': offset + limit if more else None,
+        'query_ms': round(query_ms, 3),
+        'index': await asyncio.to_thread(index.stats)
+    })
+
+
+@mcp.tool
+async def deduplicate_extractions(
+    ctx: Context,
+    result_id: str,
+    min_overlap: Optional[float] = None,
+    match_class: bool = True,
+    merge_unaligned: bool = True
+) -> Dict[str, Any]:
+    """
+    Merge duplicate extractions of a result (e.g. the same span found by
+    several passes with slightly different boundaries) into a new result.
+    
+    Extractions whose spans overlap by at least `min_overlap` (intersection
+    over union) are merged into the earliest, longest one, which takes the
+    attribute keys it lacks from the others. The original result is kept.
+    
+    Args:
+        result_id: The extraction result ID
+        min_overlap: Overlap ratio from 0 (exclusive) to 1 that makes two
+            spans duplicates (default LANGEXTRACT_DEDUP_MIN_OVERLAP)
+        match_class: Only merge extractions of the same class
+        merge_unaligned: Also merge extractions without offsets whose class
+            and text are equal
+    """
+    
+    if min_overlap is None:
+        min_overlap = DEDUP_MIN_OVERLAP
+    if not 0 < min_overlap <= 1:
+        return {'success': False, 'error': 'min_overlap must be > 0 and <= 1'}
+    
+    try:
+        result = await load_result(result_id)
+        if result is None:
+            return {'success': False, 'error': f'Result not found: {result_id}'}
+        
+        records, stats = await asyncio.to_thread(
+            merge_overlapping_extractions, result.records, min_overlap, match_class, merge_unaligned
+        )
+        policy = f"{result_id}:dedup:{min_overlap}:{int(match_class)}:{int(merge_unaligned)}"
+        merged_id = hashlib.sha256(policy.encode()).hexdigest()[:32]
+        await store_result(merged_id, StoredResult(
+            result.document_id, records, text=result._text, source=result.source
+        ))
+        
+        await ctx.info(
+            f"🧹 Merged {stats['removed']} duplicates: "
+            f"{stats['input_extractions']} → {stats['output_extractions']} extractions"
+        )
+        
+        return {
+            'success': True,
+            'result_id': merged_id,
+            'source_result_id': result_id,
+            'statistics': stats
         }
-    }
+    
+    except Exception as e:
+        await ctx.error(f"Deduplication failed: {str(e)}")
+        return {'success': False, 'error': str(e)}
 
 
 @mcp.tool
@@ -986,6 +6460,42 @@ Example:
     }
 
 
+@mcp.tool
+async def register_examples(
+    ctx: Context,
+    examples: List[Dict[str, Any]],
+    name: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Register a few-shot example set and get an id to pass as `examples`.
+    
+    The set is validated and converted once; later calls send only the id
+    instead of the full example payload. Ids are content hashes, so
+    registering the same examples again returns the same id. Registrations
+    last for the life of the server process.
+    
+    Args:
+        examples: List of example extractions (same format as extract_structured_data)
+        name: Optional label shown with the set
+    """
+    
+    if not examples:
+        return {'success': False, 'error': 'At least one example required'}
+    
+    try:
+        example_set = EXAMPLE_REGISTRY.register(examples, name=name)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    
+    await ctx.info(f"📚 Registered example set {example_set.example_set_id}")
+    
+    return {
+        'success': True,
+        **example_set.summary(),
+        'registered_sets': EXAMPLE_REGISTRY.registered()
+    }
+
+
 @mcp.tool
 async def get_supported_models(ctx: Context) -> Dict[str, Any]:
     """Get list of supported models and recommendations."""
@@ -1012,6 +6522,421 @@ async def get_supported_models(ctx: Context) -> Dict[str, Any]:
         }
     }
 
+# ============================================================================
+# BACKGROUND EXTRACTION JOBS
+# ============================================================================
+
+# Long extractions can outlive MCP client timeouts; jobs run them detached
+# from the request and are polled for status and results
+JOB_CONCURRENCY = int(os.environ.get('LANGEXTRACT_JOB_CONCURRENCY', '2'))
+JOB_HISTORY_LIMIT = int(os.environ.get('LANGEXTRACT_JOB_HISTORY_LIMIT', '200'))
+
+JOB_FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+
+class JobContext:
+    """Stands in for the MCP Context while a job runs after its request ended."""
+    
+    def __init__(self, job: "ExtractionJob"):
+        self._job = job
+    
+    async def info(self, message: str):
+        self._job.log.append(message)
+    
+    async def error(self, message: str):
+        self._job.log.append(message)
+    
+    async def report_progress(self, progress: float, total: Optional[float] = None,
+                              message: Optional[str] = None):
+        pass  # get_job_status reads progress straight from the monitor
+    
+    async def log(self, message: str, level: Optional[str] = None,
+                  logger_name: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        if logger_name == 'langextract.chunks' and extra is not None:
+            self._job.chunk_events.append(extra)
+            self._job.chunk_count += 1
+        else:
+            self._job.log.append(message)
+
+
+class ExtractionJob:
+    """State of one submitted extraction."""
+    
+    def __init__(self, job_id: str, kind: str, params: Dict[str, Any], priority: int,
+                 collect_partial_results: bool = False):
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.priority = priority
+        self.collect_partial_results = collect_partial_results
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.monitor = ExtractionMonitor()
+        self.response: Optional[Dict[str, Any]] = None  # without `extractions`; they stay in RESULTS_STORE
+        self.error: Optional[str] = None
+        self.log: List[str] = []
+        self.chunk_events: List[Dict[str, Any]] = []
+        self.chunk_count = 0  # chunk events seen, including released ones
+        self.task: Optional[asyncio.Task] = None
+    
+    def release_chunk_events(self):
+        """Drop the chunk events once the final result is stored; it holds the same extractions."""
+        result_id = (self.response or {}).get('result_id')
+        if self.status == 'succeeded' and result_id and result_id in RESULTS_STORE:
+            self.chunk_events = []
+    
+    def status_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'priority': self.priority,
+            'submitted_at': datetime.fromtimestamp(self.submitted_at).isoformat(),
+            'queued_seconds': round((self.started_at or end) - self.submitted_at, 3),
+            'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else 0.0,
+            'progress': self.monitor.progress(),
+            'result_id': (self.response or {}).get('result_id'),
+            'partial_chunks': self.chunk_count,
+            'error': self.error,
+            'recent_log': self.log[-5:]
+        }
+
+
+class JobScheduler:
+    """
+    Priority queue of extraction jobs drained by `concurrency` worker tasks.
+    
+    Higher priority runs first, ties run in submission order. Workers start
+    lazily on the first submit so they live on the server's event loop.
+    """
+    
+    def __init__(self, concurrency: int, history_limit: int):
+        self.concurrency = max(1, concurrency)
+        self.history_limit = history_limit
+        self._jobs: "OrderedDict[str, ExtractionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._seq = 0
+    
+    def submit(self, kind: str, params: Dict[str, Any], priority: int = 0,
+               collect_partial_results: bool = False) -> ExtractionJob:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._seq += 1
+        job_id = hashlib.md5(f"{kind}{self._seq}{time.time()}".encode()).hexdigest()[:16]
+        job = ExtractionJob(job_id, kind, params, priority, collect_partial_results)
+        self._jobs[job_id] = job
+        self._queue.put_nowait((-priority, self._seq, job_id))
+        self._prune()
+        return job
+    
+    def get(self, job_id: str) -> Optional[ExtractionJob]:
+        return self._jobs.get(job_id)
+    
+    def queue_position(self, job: ExtractionJob) -> Optional[int]:
+        if job.status != 'queued':
+            return None
+        ahead = [
+            j for j in self._jobs.values()
+            if j.status == 'queued' and (-j.priority, j.submitted_at) < (-job.priority, job.submitted_at)
+        ]
+        return len(ahead)
+    
+    def cancel(self, job_id: str) -> Optional[ExtractionJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in JOB_FINISHED_STATES:
+            return job
+        job.monitor.cancel()
+        if job.status == 'queued':
+            # Workers skip cancelled jobs when they reach the front of the queue
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+            self._prune()
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+    
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != 'queued':
+                continue
+            job.status = 'running'
+            job.started_at = time.time()
+            job.task = asyncio.create_task(self._run(job))
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                job.error = str(e)
+            job.finished_at = time.time()
+            if job.monitor.cancelled:
+                job.status = 'cancelled'
+            elif job.response and job.response.get('success'):
+                job.status = 'succeeded'
+            else:
+                job.status = 'failed'
+                job.error = job.error or (job.response or {}).get('error')
+            job.release_chunk_events()
+            self._prune()
+    
+    async def _run(self, job: ExtractionJob):
+        # Chunks are only parsed and kept for get_job_partial_results when asked for
+        ctx = JobContext(job)
+        stream_chunks = job.collect_partial_results
+        if job.kind == 'research':
+            response = await run_research_extraction(
+                ctx=ctx, monitor=job.monitor, stream_chunks=stream_chunks, **job.params
+            )
+        else:
+            response = await run_structured_extraction(
+                ctx=ctx, monitor=job.monitor, stream_chunks=stream_chunks, **job.params
+            )
+        # The extractions are served from RESULTS_STORE, which bounds their memory
+        response.pop('extractions', None)
+        job.response = response
+    
+    def _prune(self):
+        finished = [jid for jid, j in self._jobs.items() if j.status in JOB_FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+
+JOB_SCHEDULER = JobScheduler(JOB_CONCURRENCY, JOB_HISTORY_LIMIT)
+
+
+@mcp.tool
+async def submit_extraction(
+    ctx: Context,
+    text: str,
+    prompt_description: Optional[str] = None,
+    examples: Optional[Union[str, List[Dict[str, Any]]]] = None,
+    model_id: Optional[str] = None,
+    extraction_passes: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    max_char_buffer: Optional[int] = None,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    priority: int = 0,
+    adaptive_passes: bool = False,
+    min_pass_yield: int = 1,
+    collect_partial_results: bool = False
+) -> Dict[str, Any]:
+    """
+    Submit an extraction to run in the background and return a job id at once.
+    
+    With prompt_description and examples this runs extract_structured_data;
+    without them it runs extract_research_context. Unset parameters take
+    that tool's defaults. Poll get_job_status, then call get_job_result.
+    
+    Args:
+        text: The input text to extract from
+        prompt_description: Extraction instructions (omit for research context)
+        examples: Few-shot examples or a registered example_set_id (omit for
+            research context)
+        model_id: Model to use
+        extraction_passes: Number of passes
+        max_workers: Parallel workers
+        max_char_buffer: Chunk size (structured extraction only)
+        api_key: Optional API key (defaults to LANGEXTRACT_API_KEY env var)
+        use_cache: Reuse the result of an identical earlier request
+        priority: Higher runs first when jobs are queued
+        adaptive_passes: Stop re-extracting a chunk once a pass adds fewer
+            than `min_pass_yield` new extractions to it
+        min_pass_yield: New extractions a pass must add to a chunk for it to
+            get the next pass (adaptive_passes only)
+        collect_partial_results: Keep each chunk's extractions while the job
+            runs, for get_job_partial_results (they are dropped once the
+            job succeeds and its result is stored)
+    """
+    
+    if not text or not text.strip():
+        return {'success': False, 'error': 'Text cannot be empty'}
+    
+    if bool(prompt_description) != bool(examples):
+        return {
+            'success': False,
+            'error': 'Pass both prompt_description and examples, or neither for research context'
+        }
+    
+    if prompt_description:
+        kind = 'structured'
+        params = {
+            'text': text,
+            'prompt_description': prompt_description,
+            'examples': examples,
+            'model_id': model_id or "gemini-2.5-flash",
+            'extraction_passes': extraction_passes or 1,
+            'max_workers': max_workers or 10,
+            'max_char_buffer': max_char_buffer or 8000,
+            'api_key': api_key,
+            'use_cache': use_cache,
+            'adaptive_passes': adaptive_passes,
+            'min_pass_yield': min_pass_yield
+        }
+    else:
+        kind = 'research'
+        params = {
+            'text': text,
+            'model_id': model_id or "gemini-2.5-pro",
+            'extraction_passes': extraction_passes or 5,
+            'max_workers': max_workers or 30,
+            'api_key': api_key,
+            'use_cache': use_cache,
+            'adaptive_passes': adaptive_passes,
+            'min_pass_yield': min_pass_yield
+        }
+    
+    job = JOB_SCHEDULER.submit(kind, params, priority=priority,
+                               collect_partial_results=collect_partial_results)
+    
+    await ctx.info(f"📥 Submitted {kind} extraction job {job.job_id}")
+    
+    return {
+        'success': True,
+        'job_id': job.job_id,
+        'kind': kind,
+        'status': job.status,
+        'queue_position': JOB_SCHEDULER.queue_position(job)
+    }
+
+
+@mcp.tool
+async def get_job_status(ctx: Context, job_id: str) -> Dict[str, Any]:
+    """Get a job's status and progress (chunks done, current pass, elapsed time)."""
+    
+    job = JOB_SCHEDULER.get(job_id)
+    if job is None:
+        return {'success': False, 'error': f'Job not found: {job_id}'}
+    
+    return {
+        'success': True,
+        **job.status_dict(),
+        'queue_position': JOB_SCHEDULER.queue_position(job)
+    }
+
+
+@mcp.tool
+async def get_job_result(
+    ctx: Context,
+    job_id: str,
+    summary_only: bool = False,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Get the result of a finished job (same payload as the extraction tool).
+    
+    The extractions are read from the stored result, so they are available
+    for as long as the result is (see list_stored_results).
+    
+    Args:
+        job_id: Job ID from submit_extraction
+        summary_only: Return per-class counts instead of the extractions
+        fields: Keep only these keys of each extraction
+    """
+    
+    error = check_fields(fields)
+    if error:
+        return encoded_response({'success': False, 'error': error})
+    
+    job = JOB_SCHEDULER.get(job_id)
+    if job is None:
+        return encoded_response({'success': False, 'error': f'Job not found: {job_id}'})
+    
+    if job.status != 'succeeded':
+        return encoded_response({
+            'success': False,
+            'job_id': job_id,
+            'status': job.status,
+            'error': job.error or f'Job is {job.status}'
+        })
+    
+    result = await load_result(job.response['result_id'])
+    if result is None:
+        return encoded_response({
+            'success': False,
+            'job_id': job_id,
+            'status': job.status,
+            'error': f"Result no longer stored: {job.response['result_id']}"
+        })
+    response = {'job_id': job_id, 'status': job.status, **job.response}
+    response['extractions'] = await asyncio.to_thread(result.records.records)
+    return encoded_response(shape_extraction_response(response, summary_only, fields))
+
+
+@mcp.tool
+async def get_job_partial_results(
+    ctx: Context,
+    job_id: str,
+    cursor: int = 0,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """
+    Page through per-chunk extractions of a job while it is still running.
+    
+    Only jobs submitted with collect_partial_results keep them. Each event
+    carries the chunk's document_id, chunk_index, pass and char span, plus
+    the extractions aligned to the source text. Pass the returned
+    next_cursor to fetch newer chunks; `done` turns true once the job has
+    finished. Cache hits produce no chunks, and once a job succeeds its
+    chunks are released in favour of get_job_result.
+    
+    Args:
+        job_id: Job returned by submit_extraction
+        cursor: Index of the first chunk event to return
+        limit: Maximum chunk events to return
+    """
+    
+    job = JOB_SCHEDULER.get(job_id)
+    if job is None:
+        return {'success': False, 'error': f'Job not found: {job_id}'}
+    if not job.collect_partial_results:
+        return {
+            'success': False,
+            'error': 'Job was submitted without collect_partial_results',
+            'hint': 'Use get_job_result once the job has finished'
+        }
+    
+    cursor = max(0, cursor)
+    events = job.chunk_events[cursor:cursor + max(1, limit)]
+    next_cursor = cursor + len(events)
+    finished = job.status in JOB_FINISHED_STATES
+    response = {
+        'success': True,
+        'job_id': job_id,
+        'status': job.status,
+        'chunks': events,
+        'next_cursor': next_cursor,
+        'done': finished and next_cursor >= len(job.chunk_events)
+    }
+    if finished and len(job.chunk_events) < job.chunk_count:
+        response['result_id'] = job.response['result_id']
+        response['hint'] = 'Chunks were released once the result was stored; use get_job_result'
+    return response
+
+
+@mcp.tool
+async def cancel_job(ctx: Context, job_id: str) -> Dict[str, Any]:
+    """Cancel a queued or running job."""
+    
+    job = JOB_SCHEDULER.cancel(job_id)
+    if job is None:
+        return {'success': False, 'error': f'Job not found: {job_id}'}
+    
+    # A running extraction stops at its next model batch
+    status = 'cancelling' if job.status == 'running' else job.status
+    
+    await ctx.info(f"🛑 Job {job_id} is {status}")
+    
+    return {'success': True, 'job_id': job_id, 'status': status}
+
+
 # ============================================================================
 # SERVER METADATA
 # ============================================================================
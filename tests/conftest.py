@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the server tests.
+
+Tests drive the real tools through the FastMCP in-process client, with the
+benchmark's deterministic fake model standing in for the provider.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('LANGEXTRACT_API_KEY', 'test')
+
+import benchmark  # noqa: E402
+
+benchmark.register_fake_model()
+
+
+@pytest.fixture
+def fake_model():
+    """The benchmark fake model's settings, restored after the test."""
+    saved = dict(benchmark.FAKE_MODEL_SETTINGS)
+    benchmark.FAKE_RATE_LIMITER.reset(0)
+    yield benchmark.FAKE_MODEL_SETTINGS
+    benchmark.FAKE_MODEL_SETTINGS.clear()
+    benchmark.FAKE_MODEL_SETTINGS.update(saved)
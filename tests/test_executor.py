@@ -0,0 +1,71 @@
+"""Extractions run on EXTRACTION_EXECUTOR, so concurrent tool calls overlap."""
+
+import asyncio
+import time
+
+from fastmcp import Client
+
+import benchmark
+import server
+
+LATENCY_MS = 500
+
+
+def extract_args(salt: int):
+    # A single short chunk and one pass: one model call of LATENCY_MS per call
+    return {
+        'text': benchmark.make_document(300, salt),
+        'prompt_description': 'Extract methods and approaches',
+        'examples': benchmark.BENCH_EXAMPLES,
+        'model_id': benchmark.FAKE_MODEL_ID,
+        'extraction_passes': 1,
+        'use_cache': False
+    }
+
+
+async def timed_call(client, tool, args):
+    started = time.perf_counter()
+    result = await client.call_tool(tool, args)
+    return time.perf_counter() - started, result.structured_content
+
+
+def test_concurrent_extractions_overlap(fake_model):
+    fake_model['latency_ms'] = LATENCY_MS
+    
+    async def main():
+        async with Client(server.mcp) as client:
+            # Warm up imports and the model registry outside the timing
+            _, response = await timed_call(client, 'extract_structured_data', extract_args(1))
+            assert response['success'], response
+            
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                timed_call(client, 'extract_structured_data', extract_args(2)),
+                timed_call(client, 'extract_structured_data', extract_args(3))
+            )
+            return time.perf_counter() - started, results
+    
+    total, results = asyncio.run(main())
+    assert all(response['success'] for _, response in results), results
+    latency = LATENCY_MS / 1000
+    assert all(seconds >= latency for seconds, _ in results), results
+    # Serialized calls would take at least twice the model latency
+    assert total < 1.5 * latency, total
+
+
+def test_cheap_tools_answer_during_extraction(fake_model):
+    fake_model['latency_ms'] = LATENCY_MS
+    
+    async def main():
+        async with Client(server.mcp) as client:
+            extraction = asyncio.create_task(
+                timed_call(client, 'extract_structured_data', extract_args(4))
+            )
+            await asyncio.sleep(0.1)
+            listed = await timed_call(client, 'list_stored_results', {})
+            return listed, await extraction
+    
+    (list_seconds, listed), (extract_seconds, response) = asyncio.run(main())
+    assert response['success'], response
+    assert 'total_results' in listed, listed
+    assert list_seconds < extract_seconds / 2, (list_seconds, extract_seconds)
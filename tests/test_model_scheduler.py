@@ -0,0 +1,86 @@
+"""ModelCallScheduler backs off and retries provider 429s."""
+
+import asyncio
+import time
+
+import pytest
+from fastmcp import Client
+
+import benchmark
+import server
+
+
+class Throttling:
+    """A model call that answers 429 `failures` times, then succeeds."""
+    
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = []
+    
+    def __call__(self):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise benchmark.FakeRateLimitError('429 Too Many Requests')
+        return 'ok'
+
+
+def test_throttled_call_is_retried_with_backoff():
+    scheduler = server.ModelCallScheduler(4, 1, 4, 0, 0, max_retries=3)
+    call = Throttling(failures=2)
+    
+    assert scheduler.submit('client', call).result(timeout=30) == 'ok'
+    assert len(call.calls) == 3
+    # Backoff is 0.5 * 2**attempt seconds, jittered down to half of that
+    gaps = [later - earlier for earlier, later in zip(call.calls, call.calls[1:])]
+    assert gaps[0] >= 0.5 and gaps[1] >= 1.0, gaps
+    stats = scheduler.stats()
+    assert stats['throttled'] == 2 and stats['retries'] == 2
+    assert stats['completed'] == 1 and stats['failed'] == 0
+    assert stats['concurrency_limit'] < 4
+
+
+def test_throttling_beyond_retries_reaches_the_caller():
+    scheduler = server.ModelCallScheduler(4, 1, 4, 0, 0, max_retries=0)
+    
+    with pytest.raises(benchmark.FakeRateLimitError):
+        scheduler.submit('client', Throttling(failures=1)).result(timeout=30)
+    assert scheduler.stats()['failed'] == 1
+
+
+def test_other_errors_are_not_retried():
+    scheduler = server.ModelCallScheduler(4, 1, 4, 0, 0, max_retries=3)
+    
+    with pytest.raises(ZeroDivisionError):
+        scheduler.submit('client', lambda: 1 / 0).result(timeout=30)
+    stats = scheduler.stats()
+    assert stats['retries'] == 0 and stats['failed'] == 1
+
+
+def test_extraction_survives_provider_429s(fake_model):
+    args = {
+        'text': benchmark.make_document(20000, 7),
+        'prompt_description': 'Extract methods and approaches',
+        'examples': benchmark.BENCH_EXAMPLES,
+        'model_id': benchmark.FAKE_MODEL_ID,
+        'extraction_passes': 1,
+        'max_char_buffer': 1000,
+        'use_cache': False
+    }
+    fake_model['latency_ms'] = 20
+    
+    async def extract():
+        async with Client(server.mcp) as client:
+            return (await client.call_tool('extract_structured_data', args)).structured_content
+    
+    expected = asyncio.run(extract())
+    # Quota of 2 calls in flight: the rest of each wave answers 429
+    fake_model['capacity'] = 2
+    before = server.MODEL_SCHEDULER.stats()
+    throttled = asyncio.run(extract())
+    after = server.MODEL_SCHEDULER.stats()
+    
+    assert throttled['success'], throttled
+    assert benchmark.FAKE_RATE_LIMITER.stats()['throttled'] > 0
+    assert after['retries'] > before['retries']
+    assert after['failed'] == before['failed']
+    assert throttled['extractions'] == expected['extractions']
@@ -0,0 +1,167 @@
+"""UrlFetcher and extract_from_url against a local HTTP server."""
+
+import asyncio
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastmcp import Client
+
+import benchmark
+import server
+
+PARAGRAPHS = [' '.join(benchmark.make_document(2000, salt).split()) for salt in range(3)]
+PAGE = (
+    '<html><head><meta charset="utf-8"><title>Paper</title>'
+    '<style>p { color: red }</style><script>var hidden = "<p>script</p>";</script></head><body>'
+    + ''.join(f'<p>{paragraph} caf&eacute;</p>\n' for paragraph in PARAGRAPHS)
+    + '</body></html>'
+).encode('utf-8')
+ETAG = '"' + hashlib.sha256(PAGE).hexdigest()[:16] + '"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, *args):
+        pass
+    
+    def send(self, status: int, body: bytes = b'', content_type: str = 'text/plain', **headers):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name.replace('_', '-'), value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        site = self.server.site
+        site['connections'].add(self.client_address)
+        if self.path == '/paper':
+            if self.headers.get('If-None-Match') == ETAG:
+                site['hits']['304'] += 1
+                self.send(304, ETag=ETAG)
+            else:
+                site['hits']['200'] += 1
+                self.send(200, PAGE, 'text/html; charset=utf-8', ETag=ETAG)
+        elif self.path == '/pdf':
+            self.send(200, b'%PDF-1.4', 'application/pdf')
+        elif self.path == '/unsized':
+            # No Content-Length: the size limit must apply while streaming
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.end_headers()
+            self.close_connection = True
+            for _ in range(100):
+                self.wfile.write(b'x' * 10000)
+        else:
+            self.send(404)
+
+
+@pytest.fixture
+def site():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.site = {
+        'url': f'http://127.0.0.1:{httpd.server_port}',
+        'hits': {'200': 0, '304': 0},
+        'connections': set()
+    }
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.site
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_fetcher(cache_dir, fresh_seconds: float = 0, max_bytes: int = 1024 * 1024):
+    return server.UrlFetcher(
+        str(cache_dir), cache_max_bytes=8 * 1024 * 1024, max_bytes=max_bytes,
+        timeout=10, max_connections=4, fresh_seconds=fresh_seconds
+    )
+
+
+def fetch_all(fetcher, urls):
+    """Fetch `urls` in turn on one event loop; (text, info) per url."""
+    async def main():
+        results = []
+        try:
+            for url in urls:
+                info = {}
+                results.append((await fetcher.fetch_text(url, info), info))
+        finally:
+            await fetcher.client().aclose()
+        return results
+    return asyncio.run(main())
+
+
+def test_html_is_cached_and_revalidated(site, tmp_path):
+    fetcher = make_fetcher(tmp_path)
+    url = site['url'] + '/paper'
+    (first, first_info), (second, second_info) = fetch_all(fetcher, [url, url])
+    
+    assert first.startswith('Paper\n\n')
+    assert 'café' in first and 'color' not in first and 'script' not in first
+    assert all(paragraph in first for paragraph in PARAGRAPHS)
+    assert first_info['cache'] == 'miss' and first_info['bytes'] == len(PAGE)
+    assert second_info['cache'] == 'revalidated' and second == first
+    assert site['hits'] == {'200': 1, '304': 1}
+    # Both requests went over one kept-alive connection
+    assert len(site['connections']) == 1
+    stats = fetcher.stats()
+    assert stats['fetched'] == 1 and stats['revalidated'] == 1
+
+
+def test_decoding_does_not_depend_on_block_boundaries(site, tmp_path):
+    [(text, _)] = fetch_all(make_fetcher(tmp_path), [site['url'] + '/paper'])
+    decoder = server.BodyDecoder('text/html', 'utf-8', PAGE[:100])
+    pieces = [decoder.decode(PAGE[start:start + 7]) for start in range(0, len(PAGE), 7)]
+    assert ''.join(pieces) + decoder.decode(b'', final=True) == text
+
+
+def test_fresh_entries_skip_the_network(site, tmp_path):
+    fetcher = make_fetcher(tmp_path, fresh_seconds=300)
+    url = site['url'] + '/paper'
+    (first, _), (second, info) = fetch_all(fetcher, [url, url])
+    
+    assert info['cache'] == 'fresh' and second == first
+    assert site['hits'] == {'200': 1, '304': 0}
+
+
+@pytest.mark.parametrize('path, message', [
+    ('/pdf', 'Unsupported content type'),
+    ('/missing', 'HTTP 404'),
+    ('/unsized', 'byte limit')
+])
+def test_refused_responses(site, tmp_path, path, message):
+    fetcher = make_fetcher(tmp_path, max_bytes=100000)
+    with pytest.raises(server.FetchError, match=message):
+        fetch_all(fetcher, [site['url'] + path])
+    assert fetcher.stats()['failed'] == 1
+    assert not list(tmp_path.glob('*.body'))
+
+
+def test_extract_from_url_uses_fetched_text(site, tmp_path, monkeypatch, fake_model):
+    monkeypatch.setattr(server, 'URL_FETCHER', make_fetcher(tmp_path))
+    
+    async def main():
+        async with Client(server.mcp) as client:
+            result = await client.call_tool('extract_from_url', {
+                'url': site['url'] + '/paper',
+                'prompt_description': 'Extract methods and approaches',
+                'examples': benchmark.BENCH_EXAMPLES,
+                'model_id': benchmark.FAKE_MODEL_ID,
+                'extraction_passes': 1
+            })
+            return result.structured_content
+    
+    response = asyncio.run(main())
+    assert response['success'], response
+    assert response['fetch']['cache'] == 'miss'
+    text = server.RESULTS_STORE[response['result_id']].text
+    [(expected, _)] = fetch_all(make_fetcher(tmp_path / 'check'), [site['url'] + '/paper'])
+    assert text == expected
+    assert response['total_extractions'] > 0
+    for extraction in response['extractions']:
+        if 'char_start' in extraction:
+            assert text[extraction['char_start']:extraction['char_end']] == extraction['extraction_text']